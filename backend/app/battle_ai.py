@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, get_args
+from app.battle_state import BattleSession, OPPONENT, PLAYER
+from app.damage_service import DamageService, Distribution
+from app.models import Difficulty, Pokemon
+from app.rng import SessionRng
+
+DIFFICULTIES: Tuple[str, ...] = get_args(Difficulty)
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+class BattleAI:
+    """Move selection by session difficulty, for the opponent or (on autopilot) the player
+    
+    - ``easy`` picks a uniformly random move from the session's stream
+    - ``normal`` greedily maximizes expected damage, capped at the target's remaining HP
+    - ``hard`` runs expectiminimax over (player HP, opponent HP, side to move): damage rolls
+      and accuracy are chance nodes, the other side is assumed to minimize. Iterative deepening
+      keeps the deepest search that finishes within ``node_budget`` expanded positions. The
+      budget counts work rather than time, so a session's seed reproduces its moves on any
+      machine and under any load; the default takes a few milliseconds.
+    """
+    
+    TABLE_CACHE_SIZE = 4096
+    
+    def __init__(self, damage_service: DamageService, node_budget: int = 200, max_depth: int = 8):
+        self.damage_service = damage_service
+        self.node_budget = node_budget
+        self.max_depth = max_depth
+        # Depth of the last completed hard search, for benchmarks and tests
+        self.last_depth = 0
+        # Move distributions per (attacker, defender) species; normalized Pokémon never change
+        self._tables: "OrderedDict[Tuple[str, str], List[Distribution]]" = OrderedDict()
+    
+    def damage_table(self, attacker: Pokemon, defender: Pokemon) -> List[Distribution]:
+        """Distribution of every move of ``attacker`` against ``defender``, memoized per species pair"""
+        key = (attacker.name, defender.name)
+        table = self._tables.get(key)
+        if table is None:
+            table = [self.damage_service.damage_distribution(attacker, defender, move) for move in attacker.moves]
+            self._tables[key] = table
+            if len(self._tables) > self.TABLE_CACHE_SIZE:
+                self._tables.popitem(last=False)
+        else:
+            self._tables.move_to_end(key)
+        return table
+    
+    def choose_move(
+        self,
+        session: BattleSession,
+        side: int = OPPONENT,
+        difficulty: Optional[str] = None,
+        rng: Optional[SessionRng] = None
+    ) -> int:
+        """Move slot for ``side`` to play, at the session's difficulty unless given
+        
+        Random picks draw from ``rng``, by default the session's stream.
+        """
+        moves = session.side(side).pokemon.moves
+        difficulty = difficulty or session.difficulty
+        if difficulty == "easy" or len(moves) == 1:
+            return (rng or session.rng).randrange(len(moves))
+        if difficulty == "hard":
+            return self._search(session, side)
+        return self._greedy(session, side)
+    
+    def _greedy(self, session: BattleSession, side: int = OPPONENT) -> int:
+        target = session.side(1 - side)
+        table = self.damage_table(session.side(side).pokemon, target.pokemon)
+        hp = target.hp
+        expected = [sum(p * min(damage, hp) for damage, p in outcomes) for outcomes in table]
+        return max(range(len(expected)), key=expected.__getitem__)
+    
+    def _search(self, session: BattleSession, me: int = OPPONENT) -> int:
+        tables = (
+            self.damage_table(session.player.pokemon, session.opponent.pokemon),
+            self.damage_table(session.opponent.pokemon, session.player.pokemon),
+        )
+        player_max, opponent_max = session.player.max_hp, session.opponent.max_hp
+        budget = self.node_budget
+        nodes = 0
+        # Keyed on the packed (player HP, opponent HP, side, depth); plain ints keep the
+        # search allocation-light so it doesn't trigger GC pauses
+        transpositions: Dict[int, float] = {}
+        
+        def won(winner: int, depth: int) -> float:
+            # Remaining depth breaks ties in favour of faster wins and slower losses
+            return 1.0 + depth if winner == me else -1.0 - depth
+        
+        def value(player_hp: int, opponent_hp: int, side: int, depth: int) -> float:
+            """Value of ``side`` choosing a move, from the point of view of ``me`` (maximizing)"""
+            nonlocal nodes
+            if depth == 0:
+                score = opponent_hp / opponent_max - player_hp / player_max
+                return score if me == OPPONENT else -score
+            key = ((player_hp << 16 | opponent_hp) << 1 | side) << 5 | depth
+            cached = transpositions.get(key)
+            if cached is not None:
+                return cached
+            nodes += 1
+            if nodes > budget:
+                raise _OutOfBudget
+            
+            values = [expected(player_hp, opponent_hp, side, outcomes, depth) for outcomes in tables[side]]
+            result = max(values) if side == me else min(values)
+            transpositions[key] = result
+            return result
+        
+        def expected(player_hp: int, opponent_hp: int, side: int, outcomes: Distribution, depth: int) -> float:
+            target_hp = opponent_hp if side == PLAYER else player_hp
+            total = 0.0
+            for damage, p in outcomes:
+                if damage >= target_hp:
+                    # Knockouts are terminal whatever the roll
+                    total += p * won(side, depth - 1)
+                elif side == PLAYER:
+                    total += p * value(player_hp, opponent_hp - damage, OPPONENT, depth - 1)
+                else:
+                    total += p * value(player_hp - damage, opponent_hp, PLAYER, depth - 1)
+            return total
+        
+        order = list(range(len(tables[me])))
+        best = self._greedy(session, me)
+        self.last_depth = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                scores = {
+                    slot: expected(session.player.hp, session.opponent.hp, me, tables[me][slot], depth)
+                    for slot in order
+                }
+            except _OutOfBudget:
+                break
+            best = max(order, key=scores.__getitem__)
+            self.last_depth = depth
+            # Search the best move first next iteration so the table fills along the likely line
+            order.sort(key=scores.__getitem__, reverse=True)
+        return best
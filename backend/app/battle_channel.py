@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from app.battle_engine import BattleEngine
+from app.metrics import STAGE_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+# Close codes
+CLOSE_IDLE = 1001
+CLOSE_INTERNAL_ERROR = 1011
+CLOSE_SLOW_CONSUMER = 1013
+CLOSE_SESSION_NOT_FOUND = 4404
+
+_SERIALIZE = STAGE_SECONDS.labels("serialize")
+
+
+class _Closing(Exception):
+    def __init__(self, code: int, reason: str):
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+
+
+class BattleChannel:
+    """WebSocket connection for one battle session
+    
+    Client messages: ``{"type": "move", "move_id": ...}``, ``{"type": "ping"}`` and
+    ``{"type": "pong"}``. On connect the server sends the full ``state``; each move is
+    answered with a ``turn`` message carrying only that turn's events plus both HPs, the
+    side to move and the winner. Failed moves get an ``error`` message.
+    
+    Moves are handled one at a time, so a client can't queue turns faster than they are
+    played. Outgoing messages go through a bounded queue and a client that stops reading
+    is disconnected instead of buffering without limit. The server pings every
+    ``heartbeat_interval`` seconds and drops connections silent for ``idle_timeout``.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        engine: BattleEngine,
+        session_id: str,
+        heartbeat_interval: float = 20.0,
+        idle_timeout: float = 60.0,
+        send_queue_size: int = 16
+    ):
+        self.websocket = websocket
+        self.engine = engine
+        self.session_id = session_id
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+        self._last_seen = time.monotonic()
+    
+    async def run(self):
+        await self.websocket.accept()
+        session = self.engine.sessions.get(self.session_id)
+        if session is None:
+            await self.websocket.close(CLOSE_SESSION_NOT_FOUND, f"Session {self.session_id} not found")
+            return
+        self._send({"type": "state", "state": session.to_state().model_dump(), "log_offset": 0})
+        
+        tasks = [
+            asyncio.ensure_future(self._receive_loop()),
+            asyncio.ensure_future(self._send_loop()),
+            asyncio.ensure_future(self._heartbeat_loop()),
+        ]
+        closing: Optional[_Closing] = None
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if isinstance(error, _Closing):
+                    closing = error
+                elif error is not None and not isinstance(error, WebSocketDisconnect):
+                    logger.exception("Battle channel for session %s failed", self.session_id, exc_info=error)
+                    closing = _Closing(CLOSE_INTERNAL_ERROR, "Internal error")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if closing is not None and self.websocket.application_state == WebSocketState.CONNECTED:
+            await self.websocket.close(closing.code, closing.reason)
+    
+    def _send(self, message: Dict[str, Any]):
+        try:
+            self._outbox.put_nowait(message)
+        except asyncio.QueueFull:
+            raise _Closing(CLOSE_SLOW_CONSUMER, "Client is not reading messages")
+    
+    async def _send_loop(self):
+        while True:
+            await self.websocket.send_json(await self._outbox.get())
+    
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if time.monotonic() - self._last_seen > self.idle_timeout:
+                raise _Closing(CLOSE_IDLE, "Heartbeat timeout")
+            self._send({"type": "ping"})
+    
+    async def _receive_loop(self):
+        try:
+            while True:
+                text = await self.websocket.receive_text()
+                self._last_seen = time.monotonic()
+                try:
+                    message = json.loads(text)
+                except ValueError:
+                    message = None
+                kind = message.get("type") if isinstance(message, dict) else None
+                if kind == "move":
+                    await self._play(str(message.get("move_id", "")))
+                elif kind == "ping":
+                    self._send({"type": "pong"})
+                elif kind != "pong":
+                    self._send({"type": "error", "detail": f"Unknown message type {kind!r}"})
+        except WebSocketDisconnect:
+            return
+    
+    async def _play(self, move_id: str):
+        try:
+            session, started = await self.engine.play_move(self.session_id, move_id)
+        except ValueError as e:
+            self._send({"type": "error", "detail": str(e)})
+            return
+        serialize_started = time.perf_counter()
+        message = {
+            "type": "turn",
+            "log_offset": started,
+            "events": session.describe(started),
+            "player_hp": session.player.hp,
+            "opponent_hp": session.opponent.hp,
+            "turn": session.turn,
+            "winner": session.winner,
+        }
+        _SERIALIZE.observe(time.perf_counter() - serialize_started)
+        self._send(message)
@@ -1,173 +1,489 @@
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from app.models import (
-    Pokemon, BattleState, SessionState, ActionRequest,
-    StartSessionRequest, StartSessionResponse, Move
+    Pokemon, ActionRequest, ActionResponse, BatchSessionEntry, BatchSessionResponse, DamageCalcResponse,
+    DamageOutcome, MultiActionRequest, MultiActionResponse, StartSessionRequest, StartSessionResponse, Move
 )
+from app.battle_ai import BattleAI
+from app.battle_log import BattleLogWriter
+from app.battle_state import BattleSession, FAINT, HIT, MISS, OPPONENT, PLAYER, SIDE_NAMES
 from app.damage_service import DamageService
+from app.fast_json import PokemonJson, encode_action, encode_start_session
+from app.metrics import STAGE_SECONDS, timed
+from app.move_index import MoveIndex, build_move
 from app.type_chart import TypeChartCache
+from app.payloads import extract_sprite
 from app.pokeapi_client import PokeApiClient
-import random
+from app.rng import SessionRng, new_seed
+from app.session_store import MemorySessionStore, SessionStore
+from app.upstream import CircuitOpenError
+from collections import OrderedDict
+import asyncio
+import logging
+import time
 import uuid
 
 
-class BattleSession:
-    def __init__(self, player: Pokemon, opponent: Pokemon):
-        self.player_pokemon = player
-        self.opponent_pokemon = opponent
-        self.state = SessionState(
-            player=BattleState(hp=player.stats.hp, max_hp=player.stats.hp),
-            opponent=BattleState(hp=opponent.stats.hp, max_hp=opponent.stats.hp),
-            turn="player",
-            log=[f"Battle started! {player.name.upper()} vs {opponent.name.upper()}"],
-            winner=None
-        )
-        self.difficulty = "normal"
+logger = logging.getLogger(__name__)
+
+_SERIALIZE = STAGE_SECONDS.labels("serialize")
+_DAMAGE_CALC = STAGE_SECONDS.labels("damage_calc")
+
+# rng.spawn key of the player's autopilot stream, after the PLAYER and OPPONENT setup streams
+_AUTOPILOT = 2
+
+
+class SpeciesCache:
+    """Normalized Pokémon keyed by canonical species name, least recently used evicted
+    
+    Other names a species was requested by (``"25"`` for pikachu) are kept as aliases of
+    the canonical name, under the same cap, rather than as entries of their own.
+    """
+    
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Pokemon]" = OrderedDict()
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[Pokemon]:
+        name = self._aliases.get(key, key)
+        pokemon = self._entries.get(name)
+        if pokemon is not None:
+            self._entries.move_to_end(name)
+        return pokemon
+    
+    def put(self, pokemon: Pokemon, alias: Optional[str] = None):
+        self._entries[pokemon.name] = pokemon
+        self._entries.move_to_end(pokemon.name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        if alias is not None and alias != pokemon.name:
+            self._aliases[alias] = pokemon.name
+            self._aliases.move_to_end(alias)
+            if len(self._aliases) > self.max_entries:
+                self._aliases.popitem(last=False)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+    
+    def __getitem__(self, name: str) -> Pokemon:
+        return self._entries[name]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "aliases": len(self._aliases),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+        }
 
 
 class BattleEngine:
-    def __init__(self, pokeapi_client: PokeApiClient, damage_service: DamageService):
+    MOVE_CANDIDATES = 20
+    MAX_MOVES = 4
+    
+    def __init__(
+        self,
+        pokeapi_client: PokeApiClient,
+        damage_service: DamageService,
+        move_fetch_concurrency: int = 8,
+        session_store: Optional[SessionStore] = None,
+        ai: Optional[BattleAI] = None,
+        battle_log: Optional[BattleLogWriter] = None,
+        move_index: Optional[MoveIndex] = None,
+        species_cache_size: int = 2048
+    ):
         self.pokeapi_client = pokeapi_client
         self.damage_service = damage_service
-        self.sessions: Dict[str, BattleSession] = {}
+        self.sessions: SessionStore = session_store if session_store is not None else MemorySessionStore()
+        self.move_fetch_concurrency = move_fetch_concurrency
+        self.ai = ai if ai is not None else BattleAI(damage_service)
+        # Finished battles are appended here for replay and analysis
+        self.battle_log = battle_log
+        # Species movesets come from here when set, instead of fetching candidate moves
+        self.move_index = move_index
+        # Normalized Pokémon are immutable, so one instance is shared by every session
+        self.pokemon_cache = SpeciesCache(species_cache_size)
+        # Encoded JSON of those same instances, for the HTTP fast path
+        self.pokemon_json = PokemonJson(species_cache_size)
+        self._pokemon_inflight: Dict[str, asyncio.Future] = {}
     
+    @timed(STAGE_SECONDS.labels("start_session"))
     async def start_session(self, request: StartSessionRequest) -> StartSessionResponse:
         """Start a new battle session"""
-        import httpx
-        
-        # Get player pokemon
-        if request.player_pokemon == "random":
-            player_data = await self.pokeapi_client.get_random_pokemon()
-        else:
-            try:
-                player_data = await self.pokeapi_client.get_pokemon(request.player_pokemon)
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    raise ValueError(f"Pokémon '{request.player_pokemon}' not found. Please check the spelling and try again.")
-                raise
-        player = await self._normalize_pokemon(player_data)
-        
-        # Get opponent pokemon
-        if request.opponent == "random":
-            opponent_data = await self.pokeapi_client.get_random_pokemon()
-        else:
-            try:
-                opponent_data = await self.pokeapi_client.get_pokemon(request.opponent)
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    raise ValueError(f"Opponent Pokémon '{request.opponent}' not found.")
-                raise
-        opponent = await self._normalize_pokemon(opponent_data)
-        
-        # Create session
-        session_id = str(uuid.uuid4())
-        session = BattleSession(player, opponent)
-        session.difficulty = request.difficulty or "normal"
+        seed = new_seed() if request.seed is None else request.seed
+        player_key, opponent_key = self._matchup_keys(request, seed)
+        player = self.pokemon_cache.get(player_key)
+        opponent = self.pokemon_cache.get(opponent_key)
+        if player is None or opponent is None:
+            # Resolve both sides concurrently, reporting the player's error first. Cached
+            # species skip this: gathering costs event loop round trips under load.
+            results = await asyncio.gather(
+                self._resolve_pokemon(
+                    player_key,
+                    f"Pokémon '{request.player_pokemon}' not found. Please check the spelling and try again."
+                ),
+                self._resolve_pokemon(opponent_key, f"Opponent Pokémon '{request.opponent}' not found."),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            player, opponent = results
         
-        self.sessions[session_id] = session
+        session_id, session = self._create_session(player, opponent, request.difficulty, seed)
         
         return StartSessionResponse(
             session_id=session_id,
+            seed=session.seed,
             player=player,
             opponent=opponent,
-            turn=session.state.turn,
-            log=session.state.log
+            turn=session.turn,
+            log=session.log()
         )
     
-    async def perform_action(self, session_id: str, request: ActionRequest) -> Dict:
-        """Perform an action in a battle session"""
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
+    async def start_session_json(self, request: StartSessionRequest) -> bytes:
+        """start_session, encoded to JSON with the species' cached bytes"""
+        response = await self.start_session(request)
+        started = time.perf_counter()
+        body = encode_start_session(response, self.pokemon_json)
+        _SERIALIZE.observe(time.perf_counter() - started)
+        return body
+    
+    @timed(STAGE_SECONDS.labels("start_sessions"))
+    async def start_sessions(self, requests: List[StartSessionRequest]) -> BatchSessionResponse:
+        """Start many sessions, resolving each distinct species once; failures are reported per entry"""
+        seeds = [new_seed() if request.seed is None else request.seed for request in requests]
+        matchups = [self._matchup_keys(request, seed) for request, seed in zip(requests, seeds)]
+        resolved: Dict[str, object] = {key: self.pokemon_cache.get(key) for keys in matchups for key in keys}
+        missing = [key for key, pokemon in resolved.items() if pokemon is None]
+        if missing:
+            results = await asyncio.gather(
+                *(self._resolve_pokemon(key, f"Pokémon '{key}' not found.") for key in missing),
+                return_exceptions=True
+            )
+            resolved.update(zip(missing, results))
         
-        session = self.sessions[session_id]
+        entries = []
+        species: Dict[str, Pokemon] = {}
+        for request, seed, keys in zip(requests, seeds, matchups):
+            try:
+                player, opponent = (resolved[key] for key in keys)
+                for result in (player, opponent):
+                    if isinstance(result, BaseException):
+                        raise result
+                session_id, _ = self._create_session(player, opponent, request.difficulty, seed)
+            except Exception as e:
+                entries.append(BatchSessionEntry(error=str(e)))
+                continue
+            species[player.name] = player
+            species[opponent.name] = opponent
+            entries.append(BatchSessionEntry(session_id=session_id, seed=seed, player=player.name, opponent=opponent.name))
+        return BatchSessionResponse(sessions=entries, pokemon=species)
+    
+    def _matchup_keys(self, request: StartSessionRequest, seed: int) -> Tuple[str, str]:
+        """Species keys for both sides
         
-        if session.state.winner:
-            raise ValueError("Battle has already ended")
+        "random" picks draw from per-side substreams, so the seed alone decides the matchup.
+        """
+        setup = SessionRng(seed)
+        return (
+            self._species_key(request.player_pokemon, setup.spawn(PLAYER)),
+            self._species_key(request.opponent, setup.spawn(OPPONENT))
+        )
+    
+    def _create_session(self, player: Pokemon, opponent: Pokemon, difficulty: str, seed: int) -> Tuple[str, BattleSession]:
+        session_id = str(uuid.uuid4())
+        session = BattleSession(player, opponent, difficulty, seed)
+        self.sessions.put(session_id, session)
+        return session_id, session
+    
+    @timed(STAGE_SECONDS.labels("perform_action"))
+    async def perform_action(self, session_id: str, request: ActionRequest) -> ActionResponse:
+        """Perform an action in a battle session"""
+        session, _ = await self.play_move(session_id, request.move_id)
         
-        if session.state.turn != "player":
-            raise ValueError("Not your turn")
+        # Delta mode only renders the log lines the client doesn't have yet
+        since = request.since or 0
+        started = time.perf_counter()
+        response = ActionResponse(state=session.to_state(since), log_offset=since)
+        _SERIALIZE.observe(time.perf_counter() - started)
+        return response
+    
+    @timed(STAGE_SECONDS.labels("perform_action"))
+    async def perform_action_json(self, session_id: str, request: ActionRequest) -> bytes:
+        """perform_action, encoded to JSON straight from the session"""
+        session, _ = await self.play_move(session_id, request.move_id)
+        since = request.since or 0
+        started = time.perf_counter()
+        body = encode_action(session, since)
+        _SERIALIZE.observe(time.perf_counter() - started)
+        return body
+    
+    async def play_move(self, session_id: str, move_id: str) -> Tuple[BattleSession, int]:
+        """Play the player's move and the AI's reply, returning the session and the log index the turn started at"""
+        session = self._playable_session(session_id)
+        slot = self._move_slot(session, move_id)
         
-        # Find the move
-        move = None
-        for m in session.player_pokemon.moves:
-            if m.id == request.move_id:
-                move = m
-                break
+        started = len(session.events)
+        await self._play_turn(session, slot)
+        self._save(session_id, session)
+        return session, started
+    
+    @timed(STAGE_SECONDS.labels("perform_actions"))
+    async def perform_actions(self, session_id: str, request: MultiActionRequest) -> MultiActionResponse:
+        """Play a sequence of moves, then optionally let the AI play the player's side to the end"""
+        session = self._playable_session(session_id)
+        # Check every move before playing any, so a bad id doesn't leave a half-played batch
+        slots = [self._move_slot(session, move_id) for move_id in request.moves]
         
-        if not move:
-            raise ValueError(f"Move {request.move_id} not found")
+        # Autopilot random picks come from their own substream, positioned by the log
+        # length so later requests continue it; the session stream stays replayable
+        autopilot = SessionRng(session.rng.spawn(_AUTOPILOT).seed, len(session.events))
+        turns = 0
+        while not session.winner and turns < request.max_turns:
+            if turns < len(slots):
+                slot = slots[turns]
+            elif request.auto:
+                slot = self.ai.choose_move(session, PLAYER, request.player_difficulty, autopilot)
+            else:
+                break
+            await self._play_turn(session, slot)
+            turns += 1
+        self._save(session_id, session)
         
-        # Process player's attack
-        damage = await self.damage_service.calculate_damage(
-            session.player_pokemon,
-            session.opponent_pokemon,
-            move
+        since = request.since or 0
+        started = time.perf_counter()
+        response = MultiActionResponse(
+            turns_played=turns,
+            turn=session.turn,
+            winner=session.winner,
+            player=session.player.to_state(),
+            opponent=session.opponent.to_state(),
+            log_offset=since,
+            log=session.log(since) if request.since is not None else None
         )
+        _SERIALIZE.observe(time.perf_counter() - started)
+        return response
+    
+    def _playable_session(self, session_id: str) -> BattleSession:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ValueError(f"Session {session_id} not found")
         
-        # Check accuracy
-        hit = self.damage_service.check_accuracy(move)
-        
-        if hit:
-            session.state.opponent.hp = max(0, session.state.opponent.hp - damage)
-            session.state.log.append(
-                f"{session.player_pokemon.name.upper()} used {move.name.upper()}! "
-                f"It dealt {damage} damage!"
-            )
-        else:
-            session.state.log.append(
-                f"{session.player_pokemon.name.upper()} used {move.name.upper()}... "
-                f"But it missed!"
-            )
+        if session.winner:
+            raise ValueError("Battle has already ended")
         
-        # Check if opponent fainted
-        if session.state.opponent.hp <= 0:
-            session.state.winner = "player"
-            session.state.log.append(f"{session.opponent_pokemon.name.upper()} fainted! {session.player_pokemon.name.upper()} wins!")
-            return {"state": session.state}
+        if session.turn != "player":
+            raise ValueError("Not your turn")
+        return session
+    
+    @staticmethod
+    def _move_slot(session: BattleSession, move_id: str) -> int:
+        slot = next((i for i, m in enumerate(session.player.pokemon.moves) if m.id == move_id), None)
+        if slot is None:
+            raise ValueError(f"Move {move_id} not found")
+        return slot
+    
+    def _save(self, session_id: str, session: BattleSession):
+        # Write back so persistent stores see the new state
+        self.sessions.put(session_id, session)
+        if session.winner and self.battle_log is not None:
+            self.battle_log.append(session_id, session)
+    
+    async def _play_turn(self, session: BattleSession, slot: int):
+        """Resolve the player's move and the AI's reply"""
+        if await self._attack(session, PLAYER, slot):
+            return
         
         # Switch to opponent's turn
-        session.state.turn = "opponent"
+        session.turn = "opponent"
         
         # AI plays
         await self._ai_turn(session)
-        
-        # Check if player fainted
-        if session.state.player.hp <= 0:
-            session.state.winner = "opponent"
-            session.state.log.append(f"{session.player_pokemon.name.upper()} fainted! {session.opponent_pokemon.name.upper()} wins!")
-            return {"state": session.state}
+        if session.winner:
+            return
         
         # Switch back to player
-        session.state.turn = "player"
+        session.turn = "player"
+    
+    async def _attack(self, session: BattleSession, side: int, slot: int) -> bool:
+        """Apply one move, returning whether the defender fainted"""
+        attacker = session.side(side)
+        defender = session.side(1 - side)
+        move = attacker.pokemon.moves[slot]
+        # One of the 16 discrete rolls, so the damage calculator's distribution is exact
+        roll = session.rng.randrange(len(self.damage_service.ROLLS))
+        damage = self.damage_service.roll_damage(attacker.pokemon, defender.pokemon, move, roll)
+        
+        if self.damage_service.check_accuracy(move, session.rng):
+            defender.hp = max(0, defender.hp - damage)
+            session.record(HIT, side, slot, damage, roll)
+        else:
+            session.record(MISS, side, slot)
         
-        return {"state": session.state}
+        if defender.hp <= 0:
+            session.winner = SIDE_NAMES[side]
+            session.record(FAINT, 1 - side)
+            return True
+        return False
     
+    @timed(STAGE_SECONDS.labels("ai_turn"))
     async def _ai_turn(self, session: BattleSession):
         """AI opponent's turn"""
-        # Simple AI: pick random move for now
-        if not session.opponent_pokemon.moves:
+        if not session.opponent.pokemon.moves:
             return
         
-        move = random.choice(session.opponent_pokemon.moves)
-        damage = await self.damage_service.calculate_damage(
-            session.opponent_pokemon,
-            session.player_pokemon,
-            move
+        await self._attack(session, OPPONENT, self.ai.choose_move(session))
+    
+    async def damage_calc(
+        self,
+        attacker_name: str,
+        defender_name: str,
+        move_name: str,
+        hits: int = 4,
+        defender_hp: Optional[int] = None
+    ) -> DamageCalcResponse:
+        """Exact damage distribution of a move and the chance to KO within 1..hits uses"""
+        import httpx
+        
+        attacker, defender = await asyncio.gather(
+            self._resolve_pokemon(attacker_name, f"Pokémon '{attacker_name}' not found."),
+            self._resolve_pokemon(defender_name, f"Pokémon '{defender_name}' not found.")
+        )
+        move_key = move_name.lower().strip()
+        move = next((m for m in attacker.moves if m.id == move_key), None)
+        if move is None:
+            try:
+                move = self._build_move(await self.pokeapi_client.get_move(move_key))
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    raise ValueError(f"Move '{move_name}' not found.")
+                raise
+        
+        started = time.perf_counter()
+        hp = defender.stats.hp if defender_hp is None else defender_hp
+        distribution = self.damage_service.damage_distribution(attacker, defender, move)
+        response = DamageCalcResponse(
+            attacker=attacker.name,
+            defender=defender.name,
+            move=move,
+            defender_hp=hp,
+            hit_chance=self.damage_service.hit_chance(move),
+            rolls=list(self.damage_service.damage_rolls(attacker, defender, move)),
+            distribution=[DamageOutcome(damage=damage, probability=p) for damage, p in distribution],
+            ko_chance=self.damage_service.ko_chances(distribution, hp, hits)
         )
+        _DAMAGE_CALC.observe(time.perf_counter() - started)
+        return response
+    
+    async def _resolve_pokemon(self, name: str, not_found_message: str, rng: Optional[SessionRng] = None) -> Pokemon:
+        """Fetch and normalize a pokemon by name (or "random"), served from the species cache"""
+        import httpx
         
-        hit = self.damage_service.check_accuracy(move)
+        key = self._species_key(name, rng)
+        cached = self.pokemon_cache.get(key)
+        if cached is not None:
+            return cached
         
-        if hit:
-            session.state.player.hp = max(0, session.state.player.hp - damage)
-            session.state.log.append(
-                f"{session.opponent_pokemon.name.upper()} used {move.name.upper()}! "
-                f"It dealt {damage} damage!"
-            )
-        else:
-            session.state.log.append(
-                f"{session.opponent_pokemon.name.upper()} used {move.name.upper()}... "
-                f"But it missed!"
-            )
+        # Single-flight: concurrent sessions for an uncached species share one load
+        pending = self._pokemon_inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load_pokemon(key))
+            self._pokemon_inflight[key] = pending
+            pending.add_done_callback(lambda _: self._pokemon_inflight.pop(key, None))
+        try:
+            return await asyncio.shield(pending)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise ValueError(not_found_message)
+            raise
+    
+    def _species_key(self, name: str, rng: Optional[SessionRng] = None) -> str:
+        key = name.lower().strip()
+        if key == "random":
+            key = self.pokeapi_client.random_pokemon_name(rng)
+        return key
+    
+    async def _load_pokemon(self, key: str) -> Pokemon:
+        data = await self.pokeapi_client.get_pokemon(key)
+        pokemon = await self._normalize_pokemon(data)
+        # "25" and "pikachu" share the canonical entry
+        self.pokemon_cache.put(pokemon, alias=key)
+        if self.pokeapi_client.search_index is not None:
+            self.pokeapi_client.search_index.set_sprite(pokemon.name, pokemon.sprite)
+        return pokemon
     
+    def preload(self, pokemon: Iterable[Pokemon]) -> int:
+        """Seed the species cache with already normalized Pokémon, e.g. from a roster bundle"""
+        count = 0
+        for entry in pokemon:
+            self.pokemon_cache.put(entry)
+            if self.pokeapi_client.search_index is not None:
+                self.pokeapi_client.search_index.set_sprite(entry.name, entry.sprite)
+            count += 1
+        return count
+    
+    async def warmup(self, names: Optional[List[str]] = None, on_loaded: Optional[Callable[[str], None]] = None) -> int:
+        """Preload species (default: the random pool) into the cache, returning how many loaded"""
+        names = names if names is not None else self.pokeapi_client.POPULAR_POKEMON
+        
+        async def load(name: str) -> Pokemon:
+            pokemon = await self._resolve_pokemon(name, f"Pokémon '{name}' not found.")
+            if on_loaded is not None:
+                on_loaded(name)
+            return pokemon
+        
+        results = await asyncio.gather(*(load(name) for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.warning("Warmup of %s failed: %s", name, result)
+        return sum(1 for result in results if not isinstance(result, BaseException))
+    
+    async def _load_moves(self, move_names: List[str]) -> List[Move]:
+        """Fetch candidate moves concurrently, keeping the first damaging ones in listing order"""
+        semaphore = asyncio.Semaphore(self.move_fetch_concurrency)
+        
+        async def fetch(name: str) -> Dict:
+            async with semaphore:
+                return await self.pokeapi_client.get_move(name)
+        
+        tasks = [asyncio.ensure_future(fetch(name)) for name in move_names]
+        moves = []
+        try:
+            for task in tasks:
+                try:
+                    move_data = await task
+                except CircuitOpenError:
+                    # Don't cache a species with a moveset cut short by an outage
+                    raise
+                except Exception as e:
+                    logger.warning("Skipping move that failed to load: %s", e)
+                    continue
+                
+                move = self._build_move(move_data)
+                if move.power <= 0:
+                    continue
+                moves.append(move)
+                
+                # Stop early: later candidates can no longer make the cut
+                if len(moves) == self.MAX_MOVES:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return moves
+    
+    def _build_move(self, move_data: Dict) -> Move:
+        return build_move(move_data)
+    
+    @timed(STAGE_SECONDS.labels("normalize"))
     async def _normalize_pokemon(self, data: Dict) -> Pokemon:
         """Normalize pokemon data from PokéAPI"""
         from app.models import Stats
@@ -193,35 +509,16 @@ class BattleEngine:
         types = [t["type"]["name"] for t in data["types"]]
         
         # Get sprite (prefer animated if available)
-        sprite = data["sprites"].get("versions", {}).get("generation-v", {}).get("black-white", {}).get("animated", {}).get("front_default") or \
-                 data["sprites"]["other"]["official-artwork"]["front_default"] or \
-                 data["sprites"]["front_default"]
+        sprite = extract_sprite(data)
         
-        # Get moves (first 4 damaging moves)
-        moves = []
-        for move_entry in data["moves"][:20]:  # Check up to 20 moves
-            try:
-                move_data = await self.pokeapi_client.get_move(move_entry["move"]["name"])
-                power = move_data.get("power") or 0
-                damage_class = move_data.get("damage_class", {}).get("name", "status")
-                
-                if power > 0 and len(moves) < 4:
-                    move_type = move_data["type"]["name"]
-                    accuracy = move_data.get("accuracy") or 100
-                    
-                    from app.models import Move as MoveModel
-                    moves.append(MoveModel(
-                        id=move_data["name"],
-                        name=move_data["name"],
-                        type=move_type,
-                        power=power,
-                        class_=damage_class,
-                        accuracy=accuracy,
-                        damage_class=damage_class
-                    ))
-            except Exception as e:
-                print(f"Error loading move: {e}")
-                continue
+        learnset = [move_entry["move"]["name"] for move_entry in data["moves"]]
+        moves: List[Move] = []
+        if self.move_index is not None:
+            # Ranked over the whole learnset, without fetching a single move
+            moves = self.move_index.moveset(data["name"], types, stats, learnset, self.MAX_MOVES)
+        if not moves:
+            # Get moves (first 4 damaging moves)
+            moves = await self._load_moves(learnset[:self.MOVE_CANDIDATES])
         
         # Fallback if no damaging moves found
         if not moves:
@@ -0,0 +1,403 @@
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.battle_state import BattleSession, EVENT_NAMES, FAINT, HIT, MISS, OPPONENT, SIDE_NAMES, START, unpack_event
+from app.damage_service import DamageService
+from app.models import Pokemon
+from app.type_chart import NO_TYPE, TypeChartCache
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PKBLOG01"
+# Record: type (b"S" species, b"C" type chart or b"B" battle), JSON header length, binary payload length
+_RECORD = struct.Struct("<cII")
+
+
+def _events_bytes(events: array) -> bytes:
+    if sys.byteorder == "big":
+        events = array("I", events)
+        events.byteswap()
+    return events.tobytes()
+
+
+def _events_from_bytes(payload: bytes) -> array:
+    events = array("I")
+    events.frombytes(payload)
+    if sys.byteorder == "big":
+        events.byteswap()
+    return events
+
+
+class BattleRecord:
+    """One finished battle read back from a log"""
+    
+    __slots__ = ("session_id", "player", "opponent", "difficulty", "winner", "events", "seed", "chart", "type_matrix")
+    
+    def __init__(
+        self,
+        session_id: str,
+        player: Pokemon,
+        opponent: Pokemon,
+        difficulty: str,
+        winner: Optional[str],
+        events: array,
+        seed: Optional[int] = None,
+        chart: Optional[str] = None,
+        type_matrix: Optional[np.ndarray] = None
+    ):
+        self.session_id = session_id
+        self.player = player
+        self.opponent = opponent
+        self.difficulty = difficulty
+        self.winner = winner
+        self.events = events
+        # None for battles logged before sessions were seeded
+        self.seed = seed
+        # Fingerprint and single-type matrix of the chart the battle was fought with; None in older logs
+        self.chart = chart
+        self.type_matrix = type_matrix
+
+
+class BattleLogWriter:
+    """Append-only binary log of finished battles
+    
+    Each battle is a small JSON header plus its packed uint32 events. Normalized Pokémon
+    are written once per file as species records and referenced by name, so a battle
+    costs ~100 bytes plus 4 bytes per event. Given the server's ``type_chart``, each
+    battle also names the chart it was fought with, stored once per file, so replays
+    use that chart rather than the bundled one. Use one file per process.
+    
+    ``append`` only queues the battle. A writer thread opens the file, dropping a torn
+    tail record, then encodes and writes queued battles in batches of up to
+    ``flush_interval`` seconds; ``flush`` waits for it.
+    """
+    
+    def __init__(self, path: str, type_chart: Optional[TypeChartCache] = None, flush_interval: float = 0.1):
+        self.path = path
+        self.type_chart = type_chart
+        self.flush_interval = flush_interval
+        # Battles written, and lost to an unusable file or a failed write
+        self.written = 0
+        self.dropped = 0
+        # Entries: (b"C", fingerprint, matrix) or (b"B", player, opponent, header, events)
+        self._pending: List[Tuple[Any, ...]] = []
+        # True while the writer is opening the file or writing a batch
+        self._writing = True
+        self._flushing = 0
+        self._chart: Optional[str] = None
+        self._changed = threading.Condition()
+        self._closed = False
+        self._error: Optional[Exception] = None
+        self._writer = threading.Thread(target=self._write_loop, name="battle-log-writer", daemon=True)
+        self._writer.start()
+    
+    def append(self, session_id: str, session: BattleSession):
+        header = {
+            "id": session_id,
+            "player": session.player.pokemon.name,
+            "opponent": session.opponent.pokemon.name,
+            "difficulty": session.difficulty,
+            "winner": session.winner,
+            "seed": session.seed,
+        }
+        if self.type_chart is not None:
+            header["chart"] = self.type_chart.fingerprint
+        battle = (b"B", session.player.pokemon, session.opponent.pokemon, header, _events_bytes(session.events))
+        with self._changed:
+            if self._error is not None:
+                self.dropped += 1
+                return
+            idle = not self._pending
+            chart = header.get("chart")
+            if chart is not None and chart != self._chart:
+                self._pending.append((b"C", chart, self.type_chart.matrix.copy()))
+                self._chart = chart
+            self._pending.append(battle)
+            if idle:
+                self._changed.notify_all()
+    
+    def _open(self) -> Tuple[Any, Set[str], Set[str]]:
+        """Append handle to the log, and the species and charts it already holds"""
+        species: Set[str] = set()
+        charts: Set[str] = set()
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        end = len(MAGIC)
+        if exists:
+            for kind, header, _, end in _records(self.path, read_payload=False):
+                if kind == b"S":
+                    species.add(header["name"])
+                elif kind == b"C":
+                    charts.add(header["fingerprint"])
+        # Unbuffered, so a failed write can be cut back to the last complete record
+        f = open(self.path, "ab", buffering=0)
+        if exists:
+            # Drop a partial record left by a crash so new records stay readable
+            f.truncate(end)
+        else:
+            _write_all(f, MAGIC)
+        return f, species, charts
+    
+    def _write_loop(self):
+        try:
+            f, species, charts = self._open()
+        except Exception as e:
+            logger.exception("Opening battle log %s failed; battles will not be logged", self.path)
+            with self._changed:
+                self._error = e
+                self._writing = False
+                self.dropped += sum(1 for entry in self._pending if entry[0] == b"B")
+                self._pending = []
+                self._changed.notify_all()
+            return
+        with self._changed:
+            self._writing = False
+            self._changed.notify_all()
+        with f:
+            while True:
+                with self._changed:
+                    while not self._pending and not self._closed:
+                        self._changed.wait()
+                    if not self._closed and not self._flushing:
+                        # Let a batch build up; flush() and close() cut this short
+                        self._changed.wait(self.flush_interval)
+                    batch, self._pending = self._pending, []
+                    self._writing = bool(batch)
+                    closing = self._closed
+                records = []
+                new_species: Set[str] = set()
+                new_charts: Set[str] = set()
+                for entry in batch:
+                    if entry[0] == b"C":
+                        _, chart, matrix = entry
+                        if chart not in charts and chart not in new_charts:
+                            records.append(_encode(b"C", {"fingerprint": chart}, matrix.astype("<f8").tobytes()))
+                            new_charts.add(chart)
+                        continue
+                    _, player, opponent, header, events = entry
+                    for pokemon in (player, opponent):
+                        if pokemon.name not in species and pokemon.name not in new_species:
+                            records.append(_encode(b"S", pokemon.model_dump()))
+                            new_species.add(pokemon.name)
+                    records.append(_encode(b"B", header, events))
+                end = f.tell()
+                try:
+                    _write_all(f, b"".join(records))
+                    species |= new_species
+                    charts |= new_charts
+                    with self._changed:
+                        self.written += sum(1 for entry in batch if entry[0] == b"B")
+                except OSError:
+                    lost = sum(1 for entry in batch if entry[0] == b"B")
+                    logger.exception("Writing %d battles to battle log %s failed", lost, self.path)
+                    try:
+                        f.truncate(end)
+                    except OSError:
+                        logger.exception("Truncating battle log %s back to %d bytes failed", self.path, end)
+                    with self._changed:
+                        self.dropped += lost
+                with self._changed:
+                    self._writing = False
+                    self._changed.notify_all()
+                if closing and not batch:
+                    return
+    
+    def flush(self):
+        """Wait until every battle appended so far is written"""
+        with self._changed:
+            self._flushing += 1
+            self._changed.notify_all()
+            try:
+                while (self._pending or self._writing) and self._error is None:
+                    self._changed.wait()
+            finally:
+                self._flushing -= 1
+            if self._error is not None:
+                raise self._error
+    
+    def metrics(self) -> Dict[str, int]:
+        with self._changed:
+            pending = sum(1 for entry in self._pending if entry[0] == b"B")
+            return {"written": self.written, "dropped": self.dropped, "pending": pending}
+    
+    def close(self):
+        """Write what is queued and close the file"""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        self._writer.join()
+
+
+def _write_all(f, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+
+def _encode(kind: bytes, header: Dict, payload: bytes = b"") -> bytes:
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    return _RECORD.pack(kind, len(encoded), len(payload)) + encoded + payload
+
+
+def _records(path: str, read_payload: bool = True) -> Iterator[Tuple[bytes, Dict, bytes, int]]:
+    """(type, header, payload, end offset) of each complete record"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a battle log")
+        while True:
+            prefix = f.read(_RECORD.size)
+            if len(prefix) < _RECORD.size:
+                return
+            kind, header_length, payload_length = _RECORD.unpack(prefix)
+            if f.tell() + header_length + payload_length > size:
+                return  # record cut short by a crash
+            header = f.read(header_length)
+            if read_payload:
+                payload = f.read(payload_length)
+            else:
+                f.seek(payload_length, os.SEEK_CUR)
+                payload = b""
+            yield kind, json.loads(header), payload, f.tell()
+
+
+def iter_battles(paths: Iterable[str]) -> Iterator[BattleRecord]:
+    """Stream battles from log files one at a time, in file order"""
+    for path in paths:
+        species: Dict[str, Pokemon] = {}
+        charts: Dict[str, np.ndarray] = {}
+        for kind, header, payload, _ in _records(path):
+            if kind == b"S":
+                species[header["name"]] = Pokemon.model_validate(header)
+            elif kind == b"C":
+                charts[header["fingerprint"]] = np.frombuffer(payload, dtype="<f8").reshape(NO_TYPE + 1, NO_TYPE + 1)
+            elif kind == b"B":
+                chart = header.get("chart")
+                yield BattleRecord(
+                    header["id"], species[header["player"]], species[header["opponent"]],
+                    header["difficulty"], header["winner"], _events_from_bytes(payload), header.get("seed"),
+                    chart, charts.get(chart) if chart is not None else None
+                )
+
+
+def replay(record: BattleRecord, damage_service: DamageService) -> Tuple[BattleSession, List[str]]:
+    """Rebuild a battle from its events, recomputing every hit's damage from its roll
+    
+    Seeded battles also replay the session's random stream in engine order (easy AI
+    choice, damage roll, accuracy) and check each draw against the recorded event.
+    Returns the reconstructed session (render it with ``log()``) and any inconsistencies;
+    ``damage_service_for`` picks a service with the chart the battle was fought with.
+    """
+    session = BattleSession(record.player, record.opponent, record.difficulty, record.seed)
+    session.events = array("I")
+    problems = []
+    if record.chart is not None and record.chart != damage_service.type_chart.fingerprint:
+        problems.append(f"logged with type chart {record.chart}, replaying with {damage_service.type_chart.fingerprint}")
+    for index, event in enumerate(record.events):
+        kind, side, slot, damage, roll = unpack_event(event)
+        attacker, defender = session.side(side), session.side(1 - side)
+        if kind in (HIT, MISS) and slot >= len(attacker.pokemon.moves):
+            problems.append(f"event {index}: unknown move slot {slot}")
+        elif kind in (HIT, MISS):
+            if record.seed is not None:
+                problems.extend(f"event {index}: {problem}" for problem in _redraw(session, damage_service, kind, side, slot, roll))
+            if kind == HIT:
+                expected = damage_service.roll_damage(attacker.pokemon, defender.pokemon, attacker.pokemon.moves[slot], roll)
+                if expected != damage:
+                    problems.append(f"event {index}: recorded {damage} damage, formula gives {expected}")
+                defender.hp = max(0, defender.hp - damage)
+        elif kind == FAINT:
+            if attacker.hp > 0:
+                problems.append(f"event {index}: {SIDE_NAMES[side]} fainted with {attacker.hp} HP")
+            session.winner = SIDE_NAMES[1 - side]
+        session.events.append(event)
+    if not record.events or unpack_event(record.events[0])[0] != START:
+        problems.append("missing start event")
+    if session.winner != record.winner:
+        problems.append(f"replayed winner {session.winner}, recorded {record.winner}")
+    return session, problems
+
+
+def damage_service_for(record: BattleRecord, services: Dict[Optional[str], DamageService]) -> DamageService:
+    """DamageService on the type chart ``record`` was logged with (bundled for older logs), cached in ``services``"""
+    key = record.chart if record.type_matrix is not None else None
+    service = services.get(key)
+    if service is None:
+        type_chart = TypeChartCache(None)
+        if record.type_matrix is not None:
+            type_chart.load_matrix(record.type_matrix)
+        service = services[key] = DamageService(type_chart)
+    return service
+
+
+def _redraw(session: BattleSession, damage_service: DamageService, kind: int, side: int, slot: int, roll: int) -> List[str]:
+    """Replay one attack's draws from the session stream, returning mismatches"""
+    problems = []
+    rng = session.rng
+    moves = session.side(side).pokemon.moves
+    if side == OPPONENT and (session.difficulty == "easy" or len(moves) == 1):
+        expected_slot = rng.randrange(len(moves))
+        if expected_slot != slot:
+            problems.append(f"seed picks move slot {expected_slot}, recorded {slot}")
+    expected_roll = rng.randrange(len(damage_service.ROLLS))
+    if kind == HIT and expected_roll != roll:
+        problems.append(f"seed gives roll {expected_roll}, recorded {roll}")
+    if damage_service.check_accuracy(moves[slot], rng) != (kind == HIT):
+        problems.append(f"seed gives a {'miss' if kind == HIT else 'hit'}, recorded {EVENT_NAMES[kind]}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Inspect and replay binary battle logs")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    verify = subcommands.add_parser("verify", help="Replay every battle and check damage and outcomes")
+    verify.add_argument("logs", nargs="+")
+    show = subcommands.add_parser("show", help="Render one battle's log as text")
+    show.add_argument("logs", nargs="+")
+    show.add_argument("--id", required=True, help="Session id")
+    args = parser.parse_args(argv)
+    
+    services: Dict[Optional[str], DamageService] = {}
+    if args.command == "show":
+        for record in iter_battles(args.logs):
+            if record.session_id == args.id:
+                session, problems = replay(record, damage_service_for(record, services))
+                print("\n".join(session.log()))
+                for problem in problems:
+                    print(f"! {problem}")
+                return
+        parser.exit(1, f"Battle {args.id} not found\n")
+    
+    started = time.perf_counter()
+    battles = events = mismatched = 0
+    for record in iter_battles(args.logs):
+        _, problems = replay(record, damage_service_for(record, services))
+        battles += 1
+        events += len(record.events)
+        if problems:
+            mismatched += 1
+            print(f"{record.session_id}: {'; '.join(problems)}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "battles": battles,
+        "events": events,
+        "mismatched": mismatched,
+        "seconds": round(elapsed, 3),
+        "battles_per_second": round(battles / elapsed) if elapsed else None,
+    }))
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+from array import array
+from typing import Any, Dict, List, Optional
+from app.models import BattleState, Pokemon, SessionState
+from app.rng import SessionRng, new_seed
+
+
+PLAYER, OPPONENT = 0, 1
+SIDE_NAMES = ("player", "opponent")
+
+# Log events are packed into one unsigned 32-bit int each:
+# kind (2 bits) | side (1 bit) | move slot (3 bits) | damage roll (4 bits) | damage (22 bits)
+START, HIT, MISS, FAINT = range(4)
+EVENT_NAMES = ("start", "hit", "miss", "faint")
+_ROLL_SHIFT = 6
+_DAMAGE_SHIFT = 10
+_MAX_DAMAGE = (1 << 22) - 1
+
+
+def pack_event(kind: int, side: int = PLAYER, slot: int = 0, damage: int = 0, roll: int = 0) -> int:
+    return kind | side << 2 | slot << 3 | roll << _ROLL_SHIFT | min(damage, _MAX_DAMAGE) << _DAMAGE_SHIFT
+
+
+def unpack_event(event: int):
+    """(kind, side, slot, damage, roll) of a packed event"""
+    return event & 0b11, event >> 2 & 1, event >> 3 & 0b111, event >> _DAMAGE_SHIFT, event >> _ROLL_SHIFT & 0b1111
+
+
+class Side:
+    """One combatant: a shared, immutable Pokémon plus its mutable HP"""
+    
+    __slots__ = ("pokemon", "hp")
+    
+    def __init__(self, pokemon: Pokemon, hp: Optional[int] = None):
+        self.pokemon = pokemon
+        self.hp = pokemon.stats.hp if hp is None else hp
+    
+    @property
+    def max_hp(self) -> int:
+        return self.pokemon.stats.hp
+    
+    def to_state(self) -> BattleState:
+        return BattleState(hp=self.hp, max_hp=self.max_hp)
+
+
+class BattleSession:
+    """Compact engine-side battle state
+    
+    The log is kept as packed event codes referencing move slots, and is only rendered
+    to text (and converted to pydantic models) at the API boundary. Every random choice
+    in the battle (damage rolls, accuracy, AI moves) draws from the session's own ``rng``,
+    so a seed plus the player's moves reproduces the battle exactly. (The hard AI's search
+    is bounded by positions expanded, not wall-clock time, for the same reason.)
+    """
+    
+    __slots__ = ("player", "opponent", "turn", "winner", "difficulty", "events", "rng")
+    
+    def __init__(self, player: Pokemon, opponent: Pokemon, difficulty: str = "normal", seed: Optional[int] = None):
+        self.player = Side(player)
+        self.opponent = Side(opponent)
+        self.turn = "player"
+        self.winner: Optional[str] = None
+        self.difficulty = difficulty
+        self.events = array("I", [pack_event(START)])
+        self.rng = SessionRng(new_seed() if seed is None else seed)
+    
+    @property
+    def seed(self) -> int:
+        return self.rng.seed
+    
+    @property
+    def player_pokemon(self) -> Pokemon:
+        return self.player.pokemon
+    
+    @property
+    def opponent_pokemon(self) -> Pokemon:
+        return self.opponent.pokemon
+    
+    def side(self, index: int) -> Side:
+        return self.player if index == PLAYER else self.opponent
+    
+    def record(self, kind: int, side: int = PLAYER, slot: int = 0, damage: int = 0, roll: int = 0):
+        self.events.append(pack_event(kind, side, slot, damage, roll))
+    
+    def _labels(self):
+        """Upper-cased Pokémon and move names per side, computed once per render"""
+        sides = (self.player.pokemon, self.opponent.pokemon)
+        return (
+            tuple(pokemon.name.upper() for pokemon in sides),
+            tuple(tuple(move.name.upper() for move in pokemon.moves) for pokemon in sides)
+        )
+    
+    @staticmethod
+    def _render(event: int, names, moves) -> str:
+        kind, side, slot, damage, _ = unpack_event(event)
+        if kind == START:
+            return f"Battle started! {names[side]} vs {names[1 - side]}"
+        if kind == FAINT:
+            return f"{names[side]} fainted! {names[1 - side]} wins!"
+        if kind == HIT:
+            return f"{names[side]} used {moves[side][slot]}! It dealt {damage} damage!"
+        return f"{names[side]} used {moves[side][slot]}... But it missed!"
+    
+    def render_event(self, event: int) -> str:
+        return self._render(event, *self._labels())
+    
+    def log(self, since: int = 0) -> List[str]:
+        """Rendered log lines from index ``since`` on"""
+        names, moves = self._labels()
+        return [self._render(event, names, moves) for event in self.events[max(0, since):]]
+    
+    def describe(self, since: int = 0) -> List[Dict[str, Any]]:
+        """Structured events from index ``since`` on, with their rendered log text"""
+        names, moves = self._labels()
+        described = []
+        for event in self.events[max(0, since):]:
+            kind, side, slot, damage, roll = unpack_event(event)
+            entry: Dict[str, Any] = {"kind": EVENT_NAMES[kind], "side": SIDE_NAMES[side]}
+            if kind in (HIT, MISS):
+                entry["move"] = self.side(side).pokemon.moves[slot].id
+            if kind == HIT:
+                entry["damage"] = damage
+                entry["roll"] = roll
+            entry["text"] = self._render(event, names, moves)
+            described.append(entry)
+        return described
+    
+    def to_state(self, since: int = 0) -> SessionState:
+        return SessionState(
+            player=self.player.to_state(),
+            opponent=self.opponent.to_state(),
+            turn=self.turn,
+            log=self.log(since),
+            winner=self.winner
+        )
+    
+    def approx_size(self) -> int:
+        """Rough resident size in bytes, used for session store memory caps"""
+        # Pokémon are shared through the species cache, so only the session's own objects count
+        return 512 + self.events.itemsize * len(self.events)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "player": self.player.pokemon.model_dump(),
+            "opponent": self.opponent.pokemon.model_dump(),
+            "hp": [self.player.hp, self.opponent.hp],
+            "turn": self.turn,
+            "winner": self.winner,
+            "difficulty": self.difficulty,
+            "events": self.events.tolist(),
+            "rng": [self.rng.seed, self.rng.counter],
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BattleSession":
+        session = cls.__new__(cls)
+        session.player = Side(Pokemon.model_validate(data["player"]), data["hp"][0])
+        session.opponent = Side(Pokemon.model_validate(data["opponent"]), data["hp"][1])
+        session.turn = data["turn"]
+        session.winner = data["winner"]
+        session.difficulty = data["difficulty"]
+        session.events = array("I", data["events"])
+        # Sessions saved before seeding was added continue on a fresh stream
+        seed, counter = data.get("rng") or (new_seed(), 0)
+        session.rng = SessionRng(seed, counter)
+        return session
@@ -1,14 +1,47 @@
 import random
-from typing import Dict
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
 from app.models import Move, Stats, Pokemon
+from app.rng import SessionRng
 from app.type_chart import TypeChartCache
 
 
+# (damage, probability) outcomes of one move, highest damage first, misses as 0 damage
+Distribution = Tuple[Tuple[int, float], ...]
+
+
+def _ko_chances(distribution: Distribution, hp: int, hits: int) -> Tuple[float, ...]:
+    pmf = np.zeros(max(damage for damage, _ in distribution) + 1)
+    for damage, probability in distribution:
+        pmf[damage] += probability
+    # alive[d]: probability the defender has taken exactly d < hp damage so far. HP beyond
+    # what ``hits`` uses can deal never changes the answer, so it doesn't size the arrays
+    alive = np.zeros(max(1, min(hp, hits * (len(pmf) - 1) + 1)))
+    alive[0] = 1.0
+    chances = []
+    for _ in range(hits):
+        alive = np.convolve(alive, pmf)[:len(alive)]
+        chances.append(min(1.0, max(0.0, 1.0 - float(alive.sum()))) if hp <= len(alive) else 0.0)
+    return tuple(chances)
+
+
 class DamageService:
     LEVEL = 50
+    # Random factors of the 16 discrete damage rolls
+    ROLLS = tuple((85 + i) / 100 for i in range(16))
+    DISTRIBUTION_CACHE_SIZE = 16384
+    KO_CACHE_SIZE = 4096
+    # Above any normalized Pokémon's HP (base 255 gives 620)
+    MAX_HP = 1000
     
     def __init__(self, type_chart: TypeChartCache):
         self.type_chart = type_chart
+        # Keyed by (attacker, defender, move); normalized Pokémon and moves never change
+        self._distributions: "OrderedDict[Tuple[str, str, str], Distribution]" = OrderedDict()
+        self._ko: "OrderedDict[Tuple[Distribution, int, int], Tuple[float, ...]]" = OrderedDict()
     
     async def calculate_damage(
         self,
@@ -18,6 +51,19 @@ class DamageService:
         use_random: bool = True
     ) -> int:
         """Calculate damage using Pokémon damage formula"""
+        if move.power == 0:
+            return 0
+        
+        # Random factor (0.85 - 1.0)
+        random_factor = random.uniform(0.85, 1.0) if use_random else 0.95
+        
+        # Calculate final damage
+        damage = int(self.base_damage(attacker, defender, move) * random_factor)
+        
+        return max(1, damage)  # Minimum 1 damage
+    
+    def base_damage(self, attacker: Pokemon, defender: Pokemon, move: Move) -> float:
+        """Damage before the random factor: base × STAB × type effect"""
         # Determine attack and defense stats based on move class
         if move.class_ == "special":
             attack_stat = attacker.stats.sp_attack
@@ -26,12 +72,8 @@ class DamageService:
             attack_stat = attacker.stats.attack
             defense_stat = defender.stats.defense
         
-        power = move.power
-        if power == 0:
-            return 0
-        
         # Calculate base damage
-        base = ((2 * self.LEVEL / 5 + 2) * power * (attack_stat / defense_stat)) / 50 + 2
+        base = ((2 * self.LEVEL / 5 + 2) * move.power * (attack_stat / defense_stat)) / 50 + 2
         
         # STAB (Same Type Attack Bonus)
         stab = 1.5 if move.type in attacker.types else 1.0
@@ -39,19 +81,141 @@ class DamageService:
         # Type effectiveness
         type_effect = self.type_chart.calculate_type_effectiveness(move.type, defender.types)
         
-        # Random factor (0.85 - 1.0)
-        random_factor = random.uniform(0.85, 1.0) if use_random else 0.95
+        return base * stab * type_effect
+    
+    def roll_damage(self, attacker: Pokemon, defender: Pokemon, move: Move, roll: int) -> int:
+        """Damage of one of the 16 discrete rolls, 0 being the 85% roll"""
+        if move.power == 0:
+            return 0
+        return max(1, int(self.base_damage(attacker, defender, move) * self.ROLLS[roll]))
+    
+    def damage_rolls(self, attacker: Pokemon, defender: Pokemon, move: Move) -> Tuple[int, ...]:
+        """Damage for each of the 16 game-style random rolls (85% to 100%), lowest first"""
+        if move.power == 0:
+            return (0,) * len(self.ROLLS)
+        base = self.base_damage(attacker, defender, move)
+        return tuple(max(1, int(base * factor)) for factor in self.ROLLS)
+    
+    def hit_chance(self, move: Move) -> float:
+        """Probability that check_accuracy passes"""
+        if move.accuracy >= 100:
+            return 1.0
+        return max(0, move.accuracy) / 100
+    
+    def damage_distribution(self, attacker: Pokemon, defender: Pokemon, move: Move) -> Distribution:
+        """Exact damage outcomes of one use of ``move``: the 16 equally likely rolls, plus misses"""
+        key = (attacker.name, defender.name, move.id)
+        cached = self._distributions.get(key)
+        if cached is not None:
+            self._distributions.move_to_end(key)
+            return cached
         
-        # Calculate final damage
-        damage = int(base * stab * type_effect * random_factor)
+        hit_chance = self.hit_chance(move)
+        outcomes: Counter = Counter()
+        for damage in self.damage_rolls(attacker, defender, move):
+            outcomes[damage] += hit_chance / len(self.ROLLS)
+        if hit_chance < 1.0:
+            outcomes[0] += 1.0 - hit_chance
+        distribution = tuple(sorted(outcomes.items(), reverse=True))
         
-        return max(1, damage)  # Minimum 1 damage
+        self._distributions[key] = distribution
+        if len(self._distributions) > self.DISTRIBUTION_CACHE_SIZE:
+            self._distributions.popitem(last=False)
+        return distribution
+    
+    def ko_chances(self, distribution: Distribution, hp: int, hits: int) -> List[float]:
+        """Probability of a knockout within 1, 2, ... ``hits`` uses of a move against ``hp`` HP"""
+        if not 1 <= hp <= self.MAX_HP:
+            raise ValueError(f"HP must be between 1 and {self.MAX_HP}")
+        key = (distribution, hp, hits)
+        chances = self._ko.get(key)
+        if chances is None:
+            chances = self._ko[key] = _ko_chances(distribution, hp, hits)
+            if len(self._ko) > self.KO_CACHE_SIZE:
+                self._ko.popitem(last=False)
+        else:
+            self._ko.move_to_end(key)
+        return list(chances)
+    
+    def base_damage_batch(
+        self,
+        attack: np.ndarray,
+        sp_attack: np.ndarray,
+        defense: np.ndarray,
+        sp_defense: np.ndarray,
+        power: np.ndarray,
+        special: np.ndarray,
+        move_types: np.ndarray,
+        defender_types: np.ndarray,
+        stab: np.ndarray
+    ) -> np.ndarray:
+        """Damage before the random factor (base × STAB × type effect) as float64
+        
+        Inputs broadcast against each other; ``defender_types`` carries a trailing axis of
+        two padded type ids (see TypeChartCache.intern_types).
+        """
+        special = np.asarray(special, dtype=bool)
+        power = np.asarray(power, dtype=np.float64)
+        attack_stat = np.where(special, sp_attack, attack).astype(np.float64)
+        defense_stat = np.where(special, sp_defense, defense).astype(np.float64)
+        
+        # Same operation order as the scalar formula so results are bit-for-bit identical
+        base = ((2 * self.LEVEL / 5 + 2) * power * (attack_stat / defense_stat)) / 50 + 2
+        stab_factor = np.where(stab, 1.5, 1.0)
+        type_effect = self.type_chart.calculate_type_effectiveness_batch(move_types, defender_types)
+        return base * stab_factor * type_effect
+    
+    def roll_damage_batch(self, base_damage: np.ndarray, power: np.ndarray, random_factor) -> np.ndarray:
+        """Apply the random factor, truncation and the 1-damage floor to base_damage_batch output"""
+        damage = (base_damage * random_factor).astype(np.int64)
+        return np.where(np.asarray(power) == 0, 0, np.maximum(damage, 1))
+    
+    def calculate_damage_batch(
+        self,
+        attack: np.ndarray,
+        sp_attack: np.ndarray,
+        defense: np.ndarray,
+        sp_defense: np.ndarray,
+        power: np.ndarray,
+        special: np.ndarray,
+        move_types: np.ndarray,
+        defender_types: np.ndarray,
+        stab: np.ndarray,
+        accuracy: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """Vectorized calculate_damage over N attacks
+        
+        ``special`` and ``stab`` are boolean arrays, ``move_types`` interned type ids and
+        ``defender_types`` an (N, 2) array of padded ids (see TypeChartCache.intern_types).
+        Without ``rng`` the random factor is fixed at 0.95 and every attack hits, matching
+        ``calculate_damage(..., use_random=False)`` exactly. With ``rng`` the factor is drawn
+        per attack and, if ``accuracy`` is given, missed attacks deal 0.
+        """
+        base_damage = self.base_damage_batch(
+            attack, sp_attack, defense, sp_defense, power, special, move_types, defender_types, stab
+        )
+        if rng is None:
+            random_factor = 0.95
+        else:
+            random_factor = rng.uniform(0.85, 1.0, size=base_damage.shape)
+        damage = self.roll_damage_batch(base_damage, power, random_factor)
+        
+        if rng is not None and accuracy is not None:
+            damage = np.where(self.check_accuracy_batch(accuracy, rng), damage, 0)
+        return damage
+    
+    def check_accuracy_batch(self, accuracy: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Vectorized check_accuracy"""
+        accuracy = np.asarray(accuracy)
+        rolls = rng.random(size=accuracy.shape) * 100
+        return (accuracy >= 100) | ((accuracy > 0) & (rolls < accuracy))
     
-    def check_accuracy(self, move: Move) -> bool:
-        """Check if move hits"""
+    def check_accuracy(self, move: Move, rng: Optional[SessionRng] = None) -> bool:
+        """Check if move hits, drawing from ``rng`` (a session's stream) when given"""
         if move.accuracy >= 100:
             return True
         if move.accuracy <= 0:
             return False
-        return random.random() * 100 < move.accuracy
+        return (rng or random).random() * 100 < move.accuracy
 
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class DiskEntry:
+    __slots__ = ("data", "fetched_at", "etag", "last_modified")
+    
+    def __init__(self, data: Dict[str, Any], fetched_at: float, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.data = data
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class DiskCache:
+    """Persistent PokeAPI response cache shared by every worker on a host
+    
+    Payloads are stored once per distinct content (zlib-compressed, keyed by the SHA-256
+    of their canonical JSON), so aliases such as ``pokemon/25`` and ``pokemon/pikachu``
+    share a blob. Each endpoint row keeps the time it was last confirmed against PokeAPI
+    plus the ETag/Last-Modified validators for conditional revalidation. Freshness is
+    decided by the caller; times are wall-clock so they agree across processes.
+    
+    Methods block, so async callers run them in a thread; a lock serializes use of the
+    connection. When another process holds the database for longer than ``busy_timeout``
+    seconds, ``get`` reports a miss and ``put``/``touch`` are skipped, so a contended
+    cache costs an upstream fetch rather than a stalled request.
+    """
+    
+    def __init__(self, path: str, clock: Callable[[], float] = time.time, busy_timeout: float = 0.25):
+        self.path = path
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.revalidated = 0
+        self.busy = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS blobs (hash BLOB PRIMARY KEY, data BLOB NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "endpoint TEXT PRIMARY KEY, hash BLOB NOT NULL, fetched_at REAL NOT NULL, etag TEXT, last_modified TEXT)"
+        )
+    
+    def get(self, endpoint: str) -> Optional[DiskEntry]:
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT blobs.data, entries.fetched_at, entries.etag, entries.last_modified "
+                    "FROM entries JOIN blobs ON blobs.hash = entries.hash WHERE entries.endpoint = ?",
+                    (endpoint,)
+                ).fetchone()
+        except sqlite3.OperationalError as e:
+            self._busy("read", endpoint, e)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        blob, fetched_at, etag, last_modified = row
+        return DiskEntry(json.loads(zlib.decompress(blob)), fetched_at, etag, last_modified)
+    
+    def age(self, entry: DiskEntry) -> float:
+        return max(0.0, self.clock() - entry.fetched_at)
+    
+    def put(self, endpoint: str, data: Dict[str, Any], etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        """Store a payload, returning False if the database was too busy"""
+        payload = json.dumps(data, separators=(",", ":"), sort_keys=True).encode()
+        digest = hashlib.sha256(payload).digest()
+        blob = zlib.compress(payload, 6)
+        try:
+            with self._lock:
+                # One transaction, so a concurrent sweep never sees the entry without its blob
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._db.execute("INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", (digest, blob))
+                    self._db.execute(
+                        "INSERT INTO entries (endpoint, hash, fetched_at, etag, last_modified) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(endpoint) DO UPDATE SET hash = excluded.hash, fetched_at = excluded.fetched_at, "
+                        "etag = excluded.etag, last_modified = excluded.last_modified",
+                        (endpoint, digest, self.clock(), etag, last_modified)
+                    )
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+        except sqlite3.OperationalError as e:
+            self._busy("write", endpoint, e)
+            return False
+        self.writes += 1
+        return True
+    
+    def touch(self, endpoint: str) -> bool:
+        """Mark an entry as just confirmed by PokeAPI (a 304 answer to a conditional request)"""
+        try:
+            with self._lock:
+                self._db.execute("UPDATE entries SET fetched_at = ? WHERE endpoint = ?", (self.clock(), endpoint))
+        except sqlite3.OperationalError as e:
+            self._busy("touch", endpoint, e)
+            return False
+        self.revalidated += 1
+        return True
+    
+    def _busy(self, operation: str, endpoint: str, error: Exception):
+        self.busy += 1
+        logger.warning("Disk cache %s of %s skipped: %s", operation, endpoint, error)
+    
+    def sweep(self, max_age: float) -> int:
+        """Drop entries unconfirmed for ``max_age`` seconds and blobs nothing refers to, returning entries removed
+        
+        Skipped when another process is writing; the next startup sweeps instead.
+        """
+        try:
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    removed = self._db.execute("DELETE FROM entries WHERE fetched_at < ?", (self.clock() - max_age,)).rowcount
+                    self._db.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM entries)")
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+        except sqlite3.OperationalError as e:
+            self._busy("sweep", self.path, e)
+            return 0
+        return removed
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            blobs, stored = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+        return {
+            "entries": len(self),
+            "blobs": blobs,
+            "bytes": stored,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "revalidated": self.revalidated,
+            "busy": self.busy,
+        }
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
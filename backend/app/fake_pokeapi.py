@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import json
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.type_chart import BUNDLED_DAMAGE_RELATIONS, TYPE_NAMES
+
+
+POPULAR = [
+    "pikachu", "charizard", "blastoise", "venusaur", "snorlax",
+    "garchomp", "lucario", "dragonite", "gengar", "tyranitar",
+    "machamp", "gyarados", "mewtwo", "rayquaza", "metagross"
+]
+
+
+class FakePokeApi:
+    """Deterministic in-process stand-in for PokeAPI with injectable latency and faults
+    
+    ``error_rate`` of requests get a 503 and ``slow_rate`` take ``slow_delay`` seconds
+    instead of ``delay``; set ``down`` to fail every request, as in an outage. Responses
+    carry an ETag of their body and answer a matching If-None-Match with a 304.
+    """
+    
+    def __init__(
+        self,
+        species: int = 200,
+        moves: int = 300,
+        delay: float = 0.0,
+        seed: int = 0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_delay: float = 1.0
+    ):
+        self.delay = delay
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.down = False
+        self.calls: Counter = Counter()
+        self.errors = 0
+        self.not_modified = 0
+        # Separate stream so fault settings don't change the generated data
+        self._faults = random.Random(seed + 1)
+        rng = random.Random(seed)
+        
+        self.types = {
+            name: {"id": i + 1, "name": name, "damage_relations": self._damage_relations(name)}
+            for i, name in enumerate(TYPE_NAMES)
+        }
+        
+        self.moves: Dict[str, Dict[str, Any]] = {}
+        for i in range(moves):
+            name = f"move-{i}"
+            damaging = rng.random() < 0.6
+            damage_class = rng.choice(["physical", "special"]) if damaging else "status"
+            self.moves[name] = {
+                "id": i + 1,
+                "name": name,
+                "power": rng.choice([40, 60, 75, 90, 110]) if damaging else None,
+                "accuracy": rng.choice([None, 70, 85, 90, 100]),
+                "type": {"name": rng.choice(TYPE_NAMES)},
+                "damage_class": {"name": damage_class},
+            }
+        
+        move_names = list(self.moves)
+        names = POPULAR + [f"species-{i}" for i in range(max(0, species - len(POPULAR)))]
+        self.pokemon: Dict[str, Dict[str, Any]] = {}
+        for i, name in enumerate(names):
+            types = rng.sample(TYPE_NAMES, rng.choice([1, 2]))
+            self.pokemon[name] = self._pokemon_payload(
+                i + 1, name, types, rng.sample(move_names, 30), rng
+            )
+    
+    @staticmethod
+    def _damage_relations(name: str) -> Dict[str, List[Dict[str, str]]]:
+        return {
+            key: [{"name": t} for t in defenders]
+            for key, defenders in BUNDLED_DAMAGE_RELATIONS[name].items()
+        }
+    
+    @staticmethod
+    def _pokemon_payload(pokemon_id: int, name: str, types: List[str], moves: List[str], rng: random.Random) -> Dict[str, Any]:
+        stat_names = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+        artwork = f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/{pokemon_id}.png"
+        return {
+            "id": pokemon_id,
+            "name": name,
+            "stats": [{"base_stat": rng.randint(40, 130), "stat": {"name": stat}} for stat in stat_names],
+            "types": [{"slot": slot + 1, "type": {"name": t}} for slot, t in enumerate(types)],
+            "sprites": {
+                "front_default": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{pokemon_id}.png",
+                "other": {"official-artwork": {"front_default": artwork}},
+                "versions": {},
+            },
+            "moves": [{"move": {"name": move}} for move in moves],
+        }
+    
+    def resolve(self, path: str, params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        resource, _, name = path.strip("/").partition("/")
+        table = {"pokemon": self.pokemon, "move": self.moves, "type": self.types}.get(resource)
+        if table is None:
+            return None
+        if not name:
+            limit = int(params.get("limit", 20))
+            offset = int(params.get("offset", 0))
+            results = [
+                {"name": n, "url": f"https://pokeapi.co/api/v2/{resource}/{entry['id']}/"}
+                for n, entry in table.items()
+            ]
+            return {"count": len(results), "next": None, "previous": None, "results": results[offset:offset + limit]}
+        return table.get(name)
+    
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.split("/api/v2/", 1)[-1]
+        self.calls[path] += 1
+        delay = self.slow_delay if self.slow_rate and self._faults.random() < self.slow_rate else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        if self.down or (self.error_rate and self._faults.random() < self.error_rate):
+            self.errors += 1
+            return httpx.Response(503, text="Service Unavailable")
+        data = self.resolve(path, dict(request.url.params))
+        if data is None:
+            return httpx.Response(404, text="Not Found")
+        body = json.dumps(data).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            self.not_modified += 1
+            return httpx.Response(304, headers={"etag": etag})
+        return httpx.Response(200, content=body, headers={"content-type": "application/json", "etag": etag})
+    
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+    
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+import orjson
+from fastapi.responses import Response
+
+from app.battle_state import BattleSession
+from app.models import Pokemon, StartSessionResponse
+
+
+class JSONBytes(Response):
+    """Response for bodies that are already encoded JSON
+    
+    Returning it from an endpoint skips FastAPI's response_model validation and
+    jsonable_encoder pass; the response_model still documents the schema.
+    """
+    media_type = "application/json"
+
+
+class PokemonJson:
+    """Each species' encoded JSON, reused for as long as its normalized object is
+    
+    Normalized Pokémon are immutable and shared through the engine's species cache, so
+    object identity says whether the bytes are still current. Least recently used
+    species are dropped past ``max_entries``.
+    """
+    
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Pokemon, bytes]]" = OrderedDict()
+    
+    def get(self, pokemon: Pokemon) -> bytes:
+        entry = self._entries.get(pokemon.name)
+        if entry is None or entry[0] is not pokemon:
+            entry = (pokemon, pokemon.model_dump_json().encode())
+            self._entries[pokemon.name] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(pokemon.name)
+        return entry[1]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def encode_start_session(response: StartSessionResponse, pokemon_json: PokemonJson) -> bytes:
+    """StartSessionResponse as JSON, with both species' cached bytes spliced in"""
+    return b"".join((
+        b'{"session_id":', orjson.dumps(response.session_id),
+        b',"seed":', orjson.dumps(response.seed),
+        b',"player":', pokemon_json.get(response.player),
+        b',"opponent":', pokemon_json.get(response.opponent),
+        b',"turn":', orjson.dumps(response.turn),
+        b',"log":', orjson.dumps(response.log),
+        b"}",
+    ))
+
+
+def session_state(session: BattleSession, since: int = 0) -> Dict[str, Any]:
+    """SessionState as plain data, in the model's field order"""
+    return {
+        "player": {"hp": session.player.hp, "max_hp": session.player.max_hp, "status": None},
+        "opponent": {"hp": session.opponent.hp, "max_hp": session.opponent.max_hp, "status": None},
+        "turn": session.turn,
+        "log": session.log(since),
+        "winner": session.winner,
+    }
+
+
+def encode_action(session: BattleSession, since: int = 0) -> bytes:
+    """ActionResponse as JSON, straight from the session without building the models"""
+    return orjson.dumps({"state": session_state(session, since), "log_offset": since})
@@ -1,35 +1,142 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, WebSocket
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.models import ActionRequest, ActionResponse, StartSessionRequest, StartSessionResponse
-from app.pokeapi_client import PokeApiClient
+from app.models import (
+    ActionRequest, ActionResponse, BatchSessionRequest, BatchSessionResponse, CountersResponse, DamageCalcResponse,
+    MultiActionRequest, MultiActionResponse, StartSessionRequest, StartSessionResponse, TeamJob, TeamOptimizeRequest
+)
+from app.pokeapi_client import PokeApiClient, ResponseCache
+from app.snapshot_store import SnapshotStore
+from app.disk_cache import DiskCache
 from app.type_chart import TypeChartCache
 from app.damage_service import DamageService
 from app.battle_engine import BattleEngine
-from typing import List
+from app.fast_json import JSONBytes
+from app.move_index import load_index
+from app.matchups import MatchupMatrix, load_matrix
+from app.team_optimizer import DEFAULT_ROSTER, JobsBusyError, TeamJobs, TeamOptimizer
+from app.battle_ai import BattleAI
+from app.battle_channel import BattleChannel
+from app.battle_log import BattleLogWriter
+from app.session_store import MemorySessionStore, SqliteSessionStore
+from app.upstream import CircuitOpenError, RetryPolicy
+from app.warmup import DEFAULT_BUNDLE, Warmup
+from app.metrics import REGISTRY, dict_families
+from app.profiler import RequestProfiler
+from typing import List, Optional
+import asyncio
+import httpx
+import logging
+import math
+import os
+
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    client = PokeApiClient()
+    snapshot_path = os.getenv("POKEAPI_SNAPSHOT")
+    disk_cache_path = os.getenv("POKEAPI_DISK_CACHE")
+    disk_cache = DiskCache(disk_cache_path) if disk_cache_path else None
+    if disk_cache is not None:
+        # Expired entries are kept for cheap conditional revalidation and offline use, up to a point
+        disk_cache.sweep(float(os.getenv("POKEAPI_DISK_CACHE_MAX_AGE_DAYS", "30")) * 86400)
+    client = PokeApiClient(
+        snapshot=SnapshotStore(snapshot_path) if snapshot_path else None,
+        offline=os.getenv("POKEAPI_OFFLINE") == "1",
+        cache=ResponseCache(
+            max_bytes=int(os.getenv("POKEAPI_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl_hours=float(os.getenv("POKEAPI_CACHE_TTL_HOURS", "24")),
+            stale_hours=float(os.getenv("POKEAPI_CACHE_STALE_HOURS", "24")),
+            refresh_ahead=0.1
+        ),
+        timeout=float(os.getenv("POKEAPI_TIMEOUT", "5")),
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("POKEAPI_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("POKEAPI_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=30.0
+        ),
+        http2=os.getenv("POKEAPI_HTTP2") == "1",
+        retry=RetryPolicy(attempts=int(os.getenv("POKEAPI_ATTEMPTS", "3"))),
+        disk_cache=disk_cache
+    )
     type_chart = TypeChartCache(client)
     damage_service = DamageService(type_chart)
-    battle_engine = BattleEngine(client, damage_service)
+    idle_ttl = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+    if os.getenv("SESSION_DB"):
+        session_store = SqliteSessionStore(os.environ["SESSION_DB"], idle_ttl=idle_ttl)
+    else:
+        max_bytes = os.getenv("SESSION_MAX_BYTES")
+        session_store = MemorySessionStore(
+            idle_ttl=idle_ttl,
+            max_entries=int(os.getenv("SESSION_MAX_ENTRIES", "10000")),
+            max_bytes=int(max_bytes) if max_bytes else None
+        )
+    ai = BattleAI(damage_service, node_budget=int(os.getenv("AI_NODE_BUDGET", "200")))
+    # One log file per worker process
+    battle_log_dir = os.getenv("BATTLE_LOG_DIR")
+    battle_log = BattleLogWriter(os.path.join(battle_log_dir, f"battles-{os.getpid()}.pkb"), type_chart) if battle_log_dir else None
+    move_index = load_index(os.getenv("MOVE_INDEX"))
+    battle_engine = BattleEngine(
+        client, damage_service, session_store=session_store, ai=ai, battle_log=battle_log, move_index=move_index
+    )
     
     # Store in app state
     app.state.pokeapi_client = client
     app.state.type_chart = type_chart
     app.state.damage_service = damage_service
     app.state.battle_engine = battle_engine
+    app.state.matchups = load_matrix(os.getenv("MATCHUP_MATRIX"))
+    roster_path = os.getenv("TEAM_ROSTER", DEFAULT_ROSTER)
+    app.state.team_jobs = None
+    if os.path.exists(roster_path):
+        optimizer = TeamOptimizer(roster_path, workers=int(os.getenv("TEAM_OPTIMIZER_WORKERS", "2")))
+        app.state.team_jobs = TeamJobs(optimizer)
+    
+    # The bundle loads in milliseconds, so it is in place before the first request; the
+    # rest is fetched in the background and /api/ready reports progress
+    warmup = Warmup(
+        battle_engine,
+        type_chart,
+        bundle_path=os.getenv("ROSTER_BUNDLE", DEFAULT_BUNDLE),
+        deadline=float(os.getenv("WARMUP_DEADLINE", "10"))
+    )
+    app.state.warmup = warmup
+    warmup.load_bundle()
+    warmup_task = None
+    if os.getenv("WARMUP", "1") == "1":
+        warmup_task = asyncio.create_task(warmup.run())
+    else:
+        warmup.status = "ready"
     
     yield
     
+    if warmup_task is not None:
+        # Let warmup unwind before the client it fetches with is closed
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    if app.state.team_jobs is not None:
+        app.state.team_jobs.cancel()
+        await asyncio.to_thread(app.state.team_jobs.optimizer.close)
+    
     # Shutdown
     await client.close()
+    session_store.close()
+    if battle_log is not None:
+        battle_log.close()
+
 
+# orjson for every other endpoint's final encoding step
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
-app = FastAPI(lifespan=lifespan)
+# Per-request sampling profiler, off unless PROFILE_DIR is set
+if os.getenv("PROFILE_DIR"):
+    app.middleware("http")(RequestProfiler(
+        os.environ["PROFILE_DIR"], sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    ))
 
 # CORS middleware
 app.add_middleware(
@@ -41,12 +148,19 @@ app.add_middleware(
 )
 
 
+def upstream_unavailable(e: CircuitOpenError) -> HTTPException:
+    """503 for a request that needed PokeAPI while its circuit is open, with when to retry"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+
 @app.post("/api/session", response_model=StartSessionResponse)
 async def create_session(request: StartSessionRequest):
     """Start a new battle session"""
     try:
         battle_engine: BattleEngine = app.state.battle_engine
-        return await battle_engine.start_session(request)
+        return JSONBytes(await battle_engine.start_session_json(request))
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -56,13 +170,39 @@ async def perform_action(session_id: str, request: ActionRequest):
     """Perform an action in a battle"""
     try:
         battle_engine: BattleEngine = app.state.battle_engine
-        return await battle_engine.perform_action(session_id, request)
+        return JSONBytes(await battle_engine.perform_action_json(session_id, request))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post("/api/session/batch", response_model=BatchSessionResponse)
+async def create_sessions(request: BatchSessionRequest):
+    """Start many battle sessions in one call; each entry reports its own error"""
+    battle_engine: BattleEngine = app.state.battle_engine
+    return await battle_engine.start_sessions(request.sessions)
+
+
+@app.post("/api/session/{session_id}/actions", response_model=MultiActionResponse)
+async def perform_actions(session_id: str, request: MultiActionRequest):
+    """Play several moves, or run the battle to the end with the AI on both sides"""
+    try:
+        battle_engine: BattleEngine = app.state.battle_engine
+        return await battle_engine.perform_actions(session_id, request)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.websocket("/api/session/{session_id}/ws")
+async def battle_socket(websocket: WebSocket, session_id: str):
+    """Play a battle over a WebSocket, receiving only each turn's events"""
+    battle_engine: BattleEngine = app.state.battle_engine
+    await BattleChannel(websocket, battle_engine, session_id).run()
+
+
 @app.get("/api/pokemon/search")
 async def search_pokemon(q: str = "", with_sprites: bool = False):
     """Search for pokemon by name"""
@@ -77,16 +217,60 @@ async def search_pokemon(q: str = "", with_sprites: bool = False):
         else:
             results = await client.search_pokemon(q, limit=20)
             return results
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/pokemon/{name}/counters", response_model=CountersResponse)
+async def get_counters(name: str, k: int = Query(10, ge=1, le=50)):
+    """Species that beat ``name``, from the precomputed matchup matrix"""
+    matchups: Optional[MatchupMatrix] = getattr(app.state, "matchups", None)
+    if matchups is None:
+        raise HTTPException(status_code=503, detail="Matchup matrix not loaded")
+    species = name.lower().strip()
+    try:
+        return CountersResponse(species=species, counters=matchups.counters(species, k))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/api/teams/optimize", response_model=TeamJob, status_code=202)
+async def optimize_team(request: TeamOptimizeRequest):
+    """Start a team search against an opponent pool; poll the returned job for progress"""
+    team_jobs: Optional[TeamJobs] = getattr(app.state, "team_jobs", None)
+    if team_jobs is None:
+        raise HTTPException(status_code=503, detail="Team optimizer roster not loaded")
+    options = request.model_dump()
+    opponents = [name.lower().strip() for name in options.pop("opponents")]
+    options["size"] = options.pop("team_size")
+    try:
+        return team_jobs.submit(opponents, **options)
+    except JobsBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/api/teams/jobs/{job_id}", response_model=TeamJob)
+async def get_team_job(job_id: str):
+    """Progress of a team search, and its result once done"""
+    team_jobs: Optional[TeamJobs] = getattr(app.state, "team_jobs", None)
+    job = team_jobs.get(job_id) if team_jobs is not None else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @app.get("/api/moves/{name}")
 async def get_move(name: str):
     """Get move details"""
     try:
         client: PokeApiClient = app.state.pokeapi_client
-        return await client.get_move(name)
+        return await client.get_move_details(name)
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -96,11 +280,105 @@ async def get_type(name: str):
     """Get type details"""
     try:
         client: PokeApiClient = app.state.pokeapi_client
-        return await client.get_type(name)
+        return await client.get_type_details(name)
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@app.get("/api/damage", response_model=DamageCalcResponse)
+async def damage_calc(
+    attacker: str,
+    defender: str,
+    move: str,
+    hits: int = Query(4, ge=1, le=10),
+    defender_hp: Optional[int] = Query(None, ge=1, le=DamageService.MAX_HP)
+):
+    """Exact damage distribution and N-hit KO chances for a move"""
+    try:
+        battle_engine: BattleEngine = app.state.battle_engine
+        return await battle_engine.damage_calc(attacker, defender, move, hits, defender_hp)
+    except CircuitOpenError as e:
+        raise upstream_unavailable(e)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/stats")
+async def get_stats():
+    """Resident size and eviction counters for sizing workers"""
+    battle_engine: BattleEngine = app.state.battle_engine
+    client: PokeApiClient = app.state.pokeapi_client
+    return {
+        "sessions": battle_engine.sessions.metrics(),
+        "species_cache": battle_engine.pokemon_cache.metrics(),
+        "pokeapi_cache": client.cache.metrics(),
+        "pokeapi_upstream": client.metrics(),
+        "pokeapi_disk_cache": client.disk_cache.metrics() if client.disk_cache is not None else None,
+        "move_index": battle_engine.move_index.metrics() if battle_engine.move_index is not None else None,
+        "matchups": app.state.matchups.metrics() if getattr(app.state, "matchups", None) is not None else None,
+        "battle_log": battle_engine.battle_log.metrics() if battle_engine.battle_log is not None else None,
+    }
+
+
+def collect_app_metrics():
+    """Scrape-time view of the engine's, cache's and upstream client's own counters"""
+    state = app.state
+    families = []
+    if hasattr(state, "battle_engine"):
+        families += dict_families(
+            "session_store", state.battle_engine.sessions.metrics(), "Battle session store",
+            counters=("evictions", "evictions_idle", "evictions_finished", "evictions_lru", "cache_hits")
+        )
+        if state.battle_engine.battle_log is not None:
+            families += dict_families(
+                "battle_log", state.battle_engine.battle_log.metrics(), "Binary battle log writer",
+                counters=("written", "dropped")
+            )
+        client: PokeApiClient = state.battle_engine.pokeapi_client
+        families += dict_families(
+            "pokeapi_cache", client.cache.metrics(), "PokeAPI response cache",
+            counters=("hits", "stale_hits", "misses", "evictions_lru", "evictions_expired")
+        )
+        upstream = client.metrics()
+        families += dict_families(
+            "pokeapi", upstream, "PokeAPI client retries and in-flight background refreshes",
+            counters=("retries", "retries_denied")
+        )
+        if client.disk_cache is not None:
+            families += dict_families(
+                "pokeapi_disk_cache", client.disk_cache.metrics(), "Shared on-disk PokeAPI cache (counters are per worker)",
+                counters=("hits", "misses", "writes", "revalidated")
+            )
+        families.append((
+            "pokeapi_circuit_state", "gauge", "PokeAPI circuit breaker state",
+            [({"state": s}, float(upstream["circuit"]["state"] == s)) for s in ("closed", "open", "half_open")]
+        ))
+    if hasattr(state, "warmup"):
+        families.append(("worker_ready", "gauge", "1 once warmup finished", [({}, float(state.warmup.ready))]))
+    return families
+
+
+REGISTRY.set_collector("app", collect_app_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text-format metrics for this worker"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/ready")
+async def ready():
+    """Readiness probe: 503 until this worker's warmup has finished or hit its deadline"""
+    warmup: Warmup = app.state.warmup
+    progress = warmup.progress()
+    return JSONResponse(progress, status_code=200 if warmup.ready else 503)
+
+
 @app.get("/")
 async def root():
     return {"message": "Pokémon Battle Simulator API"}
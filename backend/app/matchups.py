@@ -0,0 +1,258 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.simulation import MAX_MOVES, Roster, Simulator
+from app.type_chart import matrix_fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+MATRIX_VERSION = 1
+# Loaded at startup when present; build it with ``python -m app.matchups build``
+DEFAULT_MATRIX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "matchups")
+# Mean of DamageService.ROLLS
+MEAN_ROLL = 0.925
+# turns_to_ko of an attacker that can't damage the defender
+NO_KO = np.iinfo(np.uint16).max
+# Roster fields that determine a species' rows and columns
+_SPECIES_FIELDS = (
+    "hp", "attack", "defense", "sp_attack", "sp_defense", "types",
+    "move_count", "move_power", "move_accuracy", "move_special", "move_types", "move_stab",
+)
+
+
+def fingerprints(roster: Roster) -> List[str]:
+    """Per-species digest of everything its matchups depend on"""
+    digests = []
+    for i in range(len(roster)):
+        h = hashlib.blake2b(digest_size=8)
+        for field in _SPECIES_FIELDS:
+            h.update(np.ascontiguousarray(getattr(roster, field)[i]).tobytes())
+        digests.append(h.hexdigest())
+    return digests
+
+
+def chart_fingerprint(roster: Roster) -> str:
+    return matrix_fingerprint(roster.type_matrix)
+
+
+def expected_damage(simulator: Simulator, attackers: np.ndarray, defenders: np.ndarray) -> np.ndarray:
+    """Expected damage per turn of each attacker's best move at the mean roll, accuracy included, shape (A, D)"""
+    r = simulator.roster
+    a = np.asarray(attackers)[:, None, None]
+    moves = np.arange(MAX_MOVES)[None, None, :]
+    table = simulator.damage_table(attackers, defenders)
+    rolled = simulator.damage_service.roll_damage_batch(table, r.move_power[a, moves], MEAN_ROLL)
+    expected = rolled * np.minimum(r.move_accuracy[a, moves], 100) / 100
+    # Slots past move_count are padding
+    expected = np.where(moves < r.move_count[a], expected, 0.0)
+    return expected.max(axis=2).astype(np.float32)
+
+
+def turns_to_ko(damage: np.ndarray, defender_hp: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore"):
+        turns = np.ceil(defender_hp / damage)
+    return np.where(damage > 0, np.minimum(turns, NO_KO), NO_KO).astype(np.uint16)
+
+
+class MatchupMatrix:
+    """All-pairs expected damage and turns-to-KO, memory-mapped from a directory of .npy files
+    
+    ``damage[a, d]`` is what attacker ``a`` deals defender ``d`` per turn with its best
+    move, and ``turns[a, d]`` the turns it needs to knock ``d`` out from full HP.
+    """
+    
+    def __init__(self, names: Sequence[str], hp: np.ndarray, damage: np.ndarray, turns: np.ndarray, meta: Optional[Dict] = None):
+        self.names = list(names)
+        self.hp = hp
+        self.damage = damage
+        self.turns = turns
+        self.meta = meta or {}
+        self.index = {name: i for i, name in enumerate(self.names)}
+    
+    @classmethod
+    def load(cls, path: str) -> "MatchupMatrix":
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != MATRIX_VERSION:
+            raise ValueError(f"{path} has matrix version {meta.get('version')}, expected {MATRIX_VERSION}")
+        return cls(
+            meta["names"],
+            np.array(meta["hp"], dtype=np.float64),
+            # Plain views of the maps: np.memmap's per-operation overhead dominates a lookup
+            np.load(os.path.join(path, "damage.npy"), mmap_mode="r").view(np.ndarray),
+            np.load(os.path.join(path, "turns.npy"), mmap_mode="r").view(np.ndarray),
+            meta
+        )
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def counters(self, species: str, k: int = 10) -> List[Dict[str, Any]]:
+        """The ``k`` species that beat ``species`` most convincingly
+        
+        Counters are ranked by how many turns they outlast ``species`` in a damage race
+        (its turns to KO them minus theirs to KO it), then by the ratio of the damage
+        each side deals as a share of the other's HP.
+        """
+        target = self.index.get(species)
+        if target is None:
+            raise ValueError(f"Pokémon '{species}' is not in the matchup matrix")
+        dealt = self.damage[:, target].astype(np.float64)
+        taken = self.damage[target].astype(np.float64)
+        turns_needed = self.turns[:, target].astype(np.float64)
+        turns_survived = self.turns[target].astype(np.float64)
+        
+        # Integer margin plus a tie-break in [0, 1): a / (a + b) of the two HP shares,
+        # 0.5 when neither side can do damage
+        share_dealt = dealt / self.hp[target] + 1e-12
+        tie_break = share_dealt / (share_dealt + taken / self.hp + 1e-12) * 0.999
+        score = turns_survived - turns_needed + tie_break
+        score[target] = -np.inf
+        
+        k = max(0, min(k, len(self) - 1))
+        if k == 0:
+            return []
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top], kind="stable")]
+        # Python scalars up front; indexing numpy arrays one element at a time costs more than the ranking
+        columns = zip(
+            top.tolist(),
+            turns_needed[top].tolist(),
+            turns_survived[top].tolist(),
+            dealt[top].round(2).tolist(),
+            taken[top].round(2).tolist()
+        )
+        return [
+            {
+                "name": self.names[i],
+                "turns_to_ko": int(needed) if needed != NO_KO else None,
+                "turns_survived": int(survived) if survived != NO_KO else None,
+                "damage_per_turn": damage,
+                "damage_taken_per_turn": damage_taken,
+            }
+            for i, needed, survived, damage, damage_taken in columns
+        ]
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {"species": len(self), "built_at": self.meta.get("built_at")}
+
+
+def load_matrix(path: Optional[str] = None) -> Optional[MatchupMatrix]:
+    """Matrix at ``path`` (default ``DEFAULT_MATRIX``) if it exists"""
+    path = path or DEFAULT_MATRIX
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    matrix = MatchupMatrix.load(path)
+    logger.info("Loaded matchup matrix %s: %d species", path, len(matrix))
+    return matrix
+
+
+def _replace_array(path: str, array: np.ndarray):
+    # Readers keep their mapping of the old file until they reload
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def build_matrix(roster: Roster, path: str, chunk: int = 128) -> Dict[str, int]:
+    """Write the matrix for ``roster`` to ``path``, recomputing only what changed since the last build
+    
+    Species whose stats, types or moves are unchanged keep their cells; new or changed
+    species get their row and column recomputed, O(N) each instead of O(N²). New files
+    always replace the old ones, never written through, so serving workers that mapped
+    the old files keep a consistent matrix. A changed type chart rebuilds everything.
+    """
+    n = len(roster)
+    names = [str(name) for name in roster.names]
+    digests = fingerprints(roster)
+    chart = chart_fingerprint(roster)
+    simulator = Simulator(roster)
+    os.makedirs(path, exist_ok=True)
+    
+    previous = None
+    if os.path.exists(os.path.join(path, "meta.json")):
+        previous = MatchupMatrix.load(path)
+        if previous.meta.get("type_chart") != chart:
+            previous = None
+    
+    kept_new: List[int] = []
+    kept_old: List[int] = []
+    if previous is not None:
+        old = {name: (i, digest) for i, (name, digest) in enumerate(zip(previous.names, previous.meta["fingerprints"]))}
+        for i, (name, digest) in enumerate(zip(names, digests)):
+            if name in old and old[name][1] == digest:
+                kept_new.append(i)
+                kept_old.append(old[name][0])
+    dirty = np.setdiff1d(np.arange(n), kept_new)
+    
+    damage = np.zeros((n, n), dtype=np.float32)
+    turns = np.full((n, n), NO_KO, dtype=np.uint16)
+    if previous is not None and previous.names == names:
+        # Same species list: start from a copy, the dirty rows and columns are overwritten below
+        damage[:] = previous.damage
+        turns[:] = previous.turns
+    elif kept_new:
+        block = np.ix_(kept_new, kept_new)
+        source = np.ix_(kept_old, kept_old)
+        damage[block] = previous.damage[source]
+        turns[block] = previous.turns[source]
+    del previous
+    
+    hp = roster.hp.astype(np.float32)
+    everyone = np.arange(n)
+    for start in range(0, len(dirty), chunk):
+        rows = dirty[start:start + chunk]
+        # Changed species as attackers, then as defenders
+        damage[rows] = expected_damage(simulator, rows, everyone)
+        turns[rows] = turns_to_ko(damage[rows], hp[None, :])
+        damage[:, rows] = expected_damage(simulator, everyone, rows)
+        turns[:, rows] = turns_to_ko(damage[:, rows], hp[None, rows])
+    
+    _replace_array(os.path.join(path, "damage.npy"), damage)
+    _replace_array(os.path.join(path, "turns.npy"), turns)
+    
+    meta = {
+        "version": MATRIX_VERSION,
+        "names": names,
+        "hp": roster.hp.tolist(),
+        "fingerprints": digests,
+        "type_chart": chart,
+        "built_at": int(time.time()),
+    }
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, separators=(",", ":"))
+    os.replace(tmp, os.path.join(path, "meta.json"))
+    return {"species": n, "recomputed": len(dirty), "kept": len(kept_new)}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="All-pairs matchup matrix for counter lookups")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Build or incrementally update the matrix from a roster file")
+    build.add_argument("roster", help="Roster .npz file (see python -m app.simulation build-roster)")
+    build.add_argument("out", nargs="?", default=DEFAULT_MATRIX)
+    counters = subcommands.add_parser("counters", help="Print the top counters of a species")
+    counters.add_argument("species")
+    counters.add_argument("--matrix", default=DEFAULT_MATRIX)
+    counters.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+    
+    if args.command == "build":
+        started = time.perf_counter()
+        counts = build_matrix(Roster.load(args.roster), args.out)
+        print(json.dumps(dict(counts, path=args.out, seconds=round(time.perf_counter() - started, 3))))
+    else:
+        print(json.dumps(MatchupMatrix.load(args.matrix).counters(args.species, args.k), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import asyncio
+import functools
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond engine stages to slow upstream calls
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, type, help, [(labels, value), ...]) as produced by a collector at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+    
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # Per-bucket (not cumulative) counts, the last slot being +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _Metric(ABC):
+    """Metric family with optional labels; bind hot-path children once with ``labels``"""
+    
+    TYPE = ""
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+    
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child for one combination of label values"""
+    
+    @abstractmethod
+    def render(self) -> Iterable[str]:
+        """Exposition-format lines of every child"""
+    
+    def labels(self, *values: str):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        self.labels().observe(value)
+    
+    def render(self) -> Iterable[str]:
+        for values, child in sorted(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(dict(labels, le=le))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}"
+            yield f"{self.name}_count{_format_labels(labels)} {child.count}"
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+    
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+    
+    def render(self) -> Iterable[str]:
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_format_labels(dict(zip(self.labelnames, values)))} {_format_value(child.value)}"
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text format
+    
+    Hot-path metrics are plain in-process objects; state that already has its own
+    counters (caches, session stores) is read by collectors only when scraped.
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Family]]] = {}
+    
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+    
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+    
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def set_collector(self, key: str, collector: Optional[Callable[[], Iterable[Family]]]):
+        """Register (or with None remove) a scrape-time collector, replacing any under ``key``"""
+        if collector is None:
+            self._collectors.pop(key, None)
+        else:
+            self._collectors[key] = collector
+    
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            lines.extend(metric.render())
+        for collector in list(self._collectors.values()):
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+def timed(child: _HistogramChild):
+    """Decorator observing a function's (or coroutine's) wall time in a histogram child"""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - started)
+            return async_wrapper
+        
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def dict_families(prefix: str, values: Dict[str, float], help: str, counters: Iterable[str] = ()) -> List[Family]:
+    """Families for a component's ``metrics()`` dict: keys in ``counters`` become ``*_total`` counters, the rest gauges"""
+    counters = set(counters)
+    families = []
+    for key, value in values.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if key in counters:
+            families.append((f"{prefix}_{key}_total", "counter", help, [({}, value)]))
+        else:
+            families.append((f"{prefix}_{key}", "gauge", help, [({}, value)]))
+    return families
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "battle_stage_seconds",
+    "Latency of request stages; nested stages (upstream_fetch inside normalize, ai_turn inside perform_action) overlap",
+    ["stage"]
+)
+UPSTREAM_REQUESTS = REGISTRY.counter("pokeapi_upstream_attempts_total", "PokeAPI request attempts by outcome", ["outcome"])
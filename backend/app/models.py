@@ -1,9 +1,14 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from enum import Enum
+import math
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Any, ClassVar, Dict, List, Literal, Optional
+from app.rng import SEED_BITS
+
+Difficulty = Literal["easy", "normal", "hard"]
 
 
 class Move(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     name: str
     type: str
@@ -14,6 +19,8 @@ class Move(BaseModel):
 
 
 class Stats(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     hp: int
     attack: int
     defense: int
@@ -23,6 +30,8 @@ class Stats(BaseModel):
 
 
 class Pokemon(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     sprite: str
     types: List[str]
@@ -46,22 +55,176 @@ class SessionState(BaseModel):
 
 class ActionRequest(BaseModel):
     move_id: str
+    # Number of log lines the client already has; when set, only newer lines are returned
+    since: Optional[int] = Field(None, ge=0)
 
 
 class ActionResponse(BaseModel):
     state: SessionState
+    # Index of state.log[0] in the full battle log
+    log_offset: int = 0
 
 
 class StartSessionRequest(BaseModel):
     player_pokemon: str
     opponent: str = "random"
-    difficulty: str = "normal"
+    difficulty: Difficulty = "normal"
+    # Replays a previous battle's random choices; a fresh seed is drawn when omitted.
+    # Capped so it round-trips through JavaScript numbers
+    seed: Optional[int] = Field(None, ge=0, le=2**SEED_BITS - 1)
 
 
 class StartSessionResponse(BaseModel):
     session_id: str
+    seed: int
     player: Pokemon
     opponent: Pokemon
     turn: str
     log: List[str]
 
+
+# Upper bounds for one batch request, so a single call can't monopolize a worker
+MAX_BATCH_SESSIONS = 1000
+MAX_BATCH_TURNS = 1000
+
+
+class BatchSessionRequest(BaseModel):
+    sessions: List[StartSessionRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SESSIONS)
+
+
+class BatchSessionEntry(BaseModel):
+    # session_id and seed are set on success, error otherwise
+    session_id: Optional[str] = None
+    seed: Optional[int] = None
+    # Keys into BatchSessionResponse.pokemon
+    player: Optional[str] = None
+    opponent: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchSessionResponse(BaseModel):
+    sessions: List[BatchSessionEntry]
+    # Each species once, however many sessions use it
+    pokemon: Dict[str, Pokemon]
+
+
+class MultiActionRequest(BaseModel):
+    # Played in order; the batch stops early if the battle ends
+    moves: List[str] = Field([], max_length=MAX_BATCH_TURNS)
+    # After the moves, let the server-side AI play the player's side until the battle ends
+    auto: bool = False
+    # Difficulty of the player's autopilot
+    player_difficulty: Difficulty = "normal"
+    max_turns: int = Field(MAX_BATCH_TURNS, ge=1, le=MAX_BATCH_TURNS)
+    # When set, the log lines from this index on are returned as well
+    since: Optional[int] = Field(None, ge=0)
+
+
+class MultiActionResponse(BaseModel):
+    turns_played: int
+    turn: str
+    winner: Optional[str] = None
+    player: BattleState
+    opponent: BattleState
+    # Index of log[0] in the full battle log; log is only returned when since was given
+    log_offset: int = 0
+    log: Optional[List[str]] = None
+
+
+class MatchupCounter(BaseModel):
+    name: str
+    # Expected turns for the counter to knock the species out, and to be knocked out by
+    # it; None when the attacker can't damage the other at all
+    turns_to_ko: Optional[int] = None
+    turns_survived: Optional[int] = None
+    damage_per_turn: float
+    damage_taken_per_turn: float
+
+
+class CountersResponse(BaseModel):
+    species: str
+    counters: List[MatchupCounter]
+
+
+class TeamOptimizeRequest(BaseModel):
+    opponents: List[str] = Field(..., min_length=1, max_length=50)
+    team_size: int = Field(3, ge=1, le=6)
+    # Teams scored analytically before any battle is simulated
+    candidates: int = Field(256, ge=1, le=4096)
+    # Battles per member and opponent in the first simulated round, multiplied by eta each round
+    battles: int = Field(16, ge=1, le=1000)
+    eta: int = Field(2, ge=2, le=8)
+    top: int = Field(5, ge=1, le=20)
+    seed: int = Field(0, ge=0, le=2**SEED_BITS - 1)
+    
+    # About 20 s of simulation on one core
+    MAX_BATTLES: ClassVar[int] = 10_000_000
+    
+    def planned_battles(self) -> int:
+        """Most battles the search can simulate: every kept team's members against every opponent, each round"""
+        total, battles = 0, self.battles
+        teams = min(self.candidates, max(self.top, math.ceil(self.candidates / self.eta)))
+        while True:
+            total += teams * self.team_size * len(self.opponents) * battles
+            if teams <= self.top:
+                return total
+            teams = max(self.top, math.ceil(teams / self.eta))
+            battles *= self.eta
+    
+    @model_validator(mode="after")
+    def check_budget(self) -> "TeamOptimizeRequest":
+        planned = self.planned_battles()
+        if planned > self.MAX_BATTLES:
+            raise ValueError(
+                f"Search could simulate {planned} battles, over the limit of {self.MAX_BATTLES}; "
+                "lower battles, candidates or eta, or raise top"
+            )
+        return self
+
+
+class TeamCandidate(BaseModel):
+    members: List[str]
+    # Mean over opponents of the best member's simulated win rate
+    score: float
+    analytic_score: float
+
+
+class TeamOptimizeResult(BaseModel):
+    opponents: List[str]
+    team_size: int
+    teams: List[TeamCandidate]
+    candidates: int
+    rounds: int
+    battles: int
+    team_evaluations: int
+    seconds: float
+    battles_per_second: int
+    evaluations_per_second: int
+
+
+class TeamJob(BaseModel):
+    job_id: str
+    # queued, running, done, failed or cancelled
+    status: str
+    stage: str
+    progress: float
+    result: Optional[TeamOptimizeResult] = None
+    error: Optional[str] = None
+
+
+class DamageOutcome(BaseModel):
+    damage: int
+    probability: float
+
+
+class DamageCalcResponse(BaseModel):
+    attacker: str
+    defender: str
+    move: Move
+    defender_hp: int
+    hit_chance: float
+    # Damage of each of the 16 random rolls, lowest first
+    rolls: List[int]
+    distribution: List[DamageOutcome]
+    # ko_chance[i]: probability of a knockout within i + 1 uses of the move
+    ko_chance: List[float]
@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.models import Move, Stats
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+# Used at startup when present; build it with ``python -m app.move_index build``
+DEFAULT_INDEX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "move_index.db")
+MOVE_LIMIT = 2000
+SPECIES_LIMIT = 2000
+
+STAB = 1.5
+# Each earlier pick of the same type scales a move's score by this, favouring coverage
+REPEAT_TYPE_FACTOR = 0.5
+# Listed power pays for a drawback the engine doesn't model: fainting, recharging,
+# charging up, or only working under conditions
+DRAWBACK_MOVES = frozenset({
+    "explosion", "self-destruct", "misty-explosion", "mind-blown", "steel-beam",
+    "hyper-beam", "giga-impact", "blast-burn", "hydro-cannon", "frenzy-plant", "rock-wrecker",
+    "roar-of-time", "prismatic-laser", "eternabeam", "meteor-assault",
+    "solar-beam", "solar-blade", "sky-attack", "skull-bash", "razor-wind", "future-sight", "doom-desire",
+    "focus-punch", "dream-eater", "belch", "last-resort", "synchronoise",
+})
+
+
+def build_move(move_data: Dict[str, Any]) -> Move:
+    """Move model from a (projected) PokeAPI move payload; status moves get power 0"""
+    damage_class = (move_data.get("damage_class") or {}).get("name", "status")
+    return Move(
+        id=move_data["name"],
+        name=move_data["name"],
+        type=move_data["type"]["name"],
+        power=move_data.get("power") or 0,
+        class_=damage_class,
+        accuracy=move_data.get("accuracy") or 100,
+        damage_class=damage_class
+    )
+
+
+def rank_moveset(types: Sequence[str], stats: Stats, moves: Iterable[Move], size: int = 4) -> List[Move]:
+    """The ``size`` best damaging moves for a species
+    
+    Moves score power × accuracy × STAB × the attack stat their damage class uses. Picks
+    are greedy, and each pick scales the remaining moves of its type by
+    ``REPEAT_TYPE_FACTOR``, so a second move of a type only beats an off-type move when
+    it is much stronger. Ties go to the alphabetically first move.
+    """
+    base: Dict[str, float] = {}
+    candidates: Dict[str, Move] = {}
+    for move in moves:
+        if move.power <= 0 or move.id in DRAWBACK_MOVES or move.id in candidates:
+            continue
+        stat = stats.sp_attack if move.class_ == "special" else stats.attack
+        candidates[move.id] = move
+        base[move.id] = move.power * move.accuracy / 100 * (STAB if move.type in types else 1.0) * stat
+    
+    remaining = sorted(candidates.values(), key=lambda m: (-base[m.id], m.id))
+    chosen: List[Move] = []
+    picked_types: Counter = Counter()
+    while remaining and len(chosen) < size:
+        best = max(remaining, key=lambda m: base[m.id] * REPEAT_TYPE_FACTOR ** picked_types[m.type])
+        remaining.remove(best)
+        chosen.append(best)
+        picked_types[best.type] += 1
+    return chosen
+
+
+class MoveIndex:
+    """Move facts and species learnsets, for choosing movesets without fetching moves"""
+    
+    def __init__(self, moves: Dict[str, Move], learnsets: Dict[str, Tuple[str, ...]]):
+        self.moves = moves
+        self.learnsets = learnsets
+    
+    @classmethod
+    def load(cls, path: str) -> "MoveIndex":
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            if version != INDEX_VERSION:
+                raise ValueError(f"{path} has index version {version}, expected {INDEX_VERSION}")
+            moves = {
+                name: Move(id=name, name=name, type=type_, power=power, class_=damage_class, accuracy=accuracy, damage_class=damage_class)
+                for name, type_, power, damage_class, accuracy in db.execute(
+                    "SELECT name, type, power, damage_class, accuracy FROM moves"
+                )
+            }
+            learnsets = {species: tuple(json.loads(names)) for species, names in db.execute("SELECT species, moves FROM learnsets")}
+        finally:
+            db.close()
+        return cls(moves, learnsets)
+    
+    def __len__(self) -> int:
+        return len(self.moves)
+    
+    def moveset(self, species: str, types: Sequence[str], stats: Stats, learnset: Sequence[str], size: int = 4) -> List[Move]:
+        """Ranked moveset from the indexed learnset, or ``learnset`` (the payload's) for unindexed species"""
+        names = self.learnsets.get(species) or learnset
+        return rank_moveset(types, stats, (self.moves[name] for name in names if name in self.moves), size)
+    
+    def metrics(self) -> Dict[str, int]:
+        return {"moves": len(self.moves), "species": len(self.learnsets)}
+
+
+def load_index(path: Optional[str] = None) -> Optional[MoveIndex]:
+    """Index at ``path`` (default ``DEFAULT_INDEX``) if the file exists"""
+    path = path or DEFAULT_INDEX
+    if not os.path.exists(path):
+        return None
+    index = MoveIndex.load(path)
+    logger.info("Loaded move index %s: %s", path, index.metrics())
+    return index
+
+
+def open_index(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path, isolation_level=None)
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, INDEX_VERSION):
+        db.close()
+        raise ValueError(f"{path} has index version {version}, expected {INDEX_VERSION}")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS moves ("
+        "name TEXT PRIMARY KEY, type TEXT NOT NULL, power INTEGER NOT NULL, damage_class TEXT NOT NULL, accuracy INTEGER NOT NULL)"
+    )
+    db.execute("CREATE TABLE IF NOT EXISTS learnsets (species TEXT PRIMARY KEY, moves TEXT NOT NULL)")
+    db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    return db
+
+
+async def _stream(
+    names: List[str],
+    fetch: Callable[[str], Awaitable[Dict[str, Any]]],
+    write: Callable[[List[Tuple]], None],
+    to_row: Callable[[Dict[str, Any]], Tuple],
+    concurrency: int,
+    chunk: int
+) -> int:
+    """Fetch ``names`` a chunk at a time, committing each chunk's rows; returns failures
+    
+    Only one chunk of payloads is held at once, and an interrupted build loses at most
+    the chunk in flight. Failed names are skipped and picked up by the next run.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = 0
+    
+    async def one(name: str) -> Optional[Tuple]:
+        async with semaphore:
+            try:
+                return to_row(await fetch(name))
+            except Exception as e:
+                logger.warning("Skipping %s: %s", name, e)
+                return None
+    
+    for start in range(0, len(names), chunk):
+        rows = await asyncio.gather(*(one(name) for name in names[start:start + chunk]))
+        failed += sum(row is None for row in rows)
+        write([row for row in rows if row is not None])
+        logger.info("Indexed %d/%d", min(start + chunk, len(names)), len(names))
+    return failed
+
+
+async def build_index(
+    path: str,
+    species_limit: int = SPECIES_LIMIT,
+    snapshot: Optional[str] = None,
+    offline: bool = False,
+    concurrency: int = 16,
+    chunk: int = 100,
+    client=None
+) -> Dict[str, int]:
+    """Index every move and the learnsets of the first ``species_limit`` species, resuming a partial build"""
+    from app.pokeapi_client import PokeApiClient, ResponseCache
+    from app.snapshot_store import SnapshotStore
+    
+    own_client = client is None
+    if own_client:
+        # The index itself is the durable copy; keep the response cache small
+        client = PokeApiClient(
+            snapshot=SnapshotStore(snapshot) if snapshot else None,
+            offline=offline,
+            cache=ResponseCache(max_entries=4 * chunk)
+        )
+    db = open_index(path)
+    try:
+        def write(sql: str) -> Callable[[List[Tuple]], None]:
+            def run(rows: List[Tuple]):
+                db.execute("BEGIN")
+                db.executemany(sql, rows)
+                db.execute("COMMIT")
+            return run
+        
+        def move_row(data: Dict[str, Any]) -> Tuple:
+            move = build_move(data)
+            return move.id, move.type, move.power, move.class_, move.accuracy
+        
+        def learnset_row(data: Dict[str, Any]) -> Tuple:
+            return data["name"], json.dumps([entry["move"]["name"] for entry in data["moves"]])
+        
+        done = {name for (name,) in db.execute("SELECT name FROM moves")}
+        listing = await client._fetch(f"move?limit={MOVE_LIMIT}")
+        moves = [entry["name"] for entry in listing["results"] if entry["name"] not in done]
+        failed = await _stream(
+            moves, client.get_move, write("INSERT OR REPLACE INTO moves VALUES (?, ?, ?, ?, ?)"), move_row, concurrency, chunk
+        )
+        
+        done = {name for (name,) in db.execute("SELECT species FROM learnsets")}
+        listing = await client._fetch(f"pokemon?limit={species_limit}")
+        species = [entry["name"] for entry in listing["results"] if entry["name"] not in done]
+        failed += await _stream(
+            species, client.get_pokemon, write("INSERT OR REPLACE INTO learnsets VALUES (?, ?)"), learnset_row, concurrency, chunk
+        )
+        
+        return {
+            "moves": db.execute("SELECT COUNT(*) FROM moves").fetchone()[0],
+            "species": db.execute("SELECT COUNT(*) FROM learnsets").fetchone()[0],
+            "fetched": len(moves) + len(species) - failed,
+            "failed": failed,
+        }
+    finally:
+        db.close()
+        if own_client:
+            await client.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Move and learnset index for fetch-free moveset selection")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Index the move catalogue and species learnsets (resumes a partial build)")
+    build.add_argument("out", nargs="?", default=DEFAULT_INDEX)
+    build.add_argument("--limit", type=int, default=SPECIES_LIMIT, help="Species to index")
+    build.add_argument("--snapshot", help="Serve PokeAPI data from this snapshot file")
+    build.add_argument("--offline", action="store_true")
+    build.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    counts = asyncio.run(build_index(args.out, args.limit, args.snapshot, args.offline, args.concurrency))
+    print(json.dumps(dict(counts, path=args.out)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from typing import Any, Dict, Optional
+
+
+def _names(entries) -> list:
+    return [{"name": entry["name"]} for entry in entries or []]
+
+
+def project_pokemon(data: Dict[str, Any]) -> Dict[str, Any]:
+    sprites = data.get("sprites") or {}
+    animated = (
+        sprites.get("versions", {}).get("generation-v", {}).get("black-white", {})
+        .get("animated", {}).get("front_default")
+    )
+    artwork = (sprites.get("other") or {}).get("official-artwork", {}).get("front_default")
+    return {
+        "id": data.get("id"),
+        "name": data["name"],
+        "stats": [
+            {"base_stat": stat["base_stat"], "stat": {"name": stat["stat"]["name"]}}
+            for stat in data.get("stats", [])
+        ],
+        "types": [{"slot": t.get("slot"), "type": {"name": t["type"]["name"]}} for t in data.get("types", [])],
+        "sprites": {
+            "front_default": sprites.get("front_default"),
+            "other": {"official-artwork": {"front_default": artwork}},
+            "versions": {"generation-v": {"black-white": {"animated": {"front_default": animated}}}},
+        },
+        "moves": [{"move": {"name": entry["move"]["name"]}} for entry in data.get("moves", [])],
+    }
+
+
+def project_move(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": data.get("id"),
+        "name": data["name"],
+        "power": data.get("power"),
+        "accuracy": data.get("accuracy"),
+        "type": {"name": data["type"]["name"]} if data.get("type") else None,
+        "damage_class": {"name": data["damage_class"]["name"]} if data.get("damage_class") else {},
+    }
+
+
+def project_type(data: Dict[str, Any]) -> Dict[str, Any]:
+    relations = data.get("damage_relations", {})
+    return {
+        "id": data.get("id"),
+        "name": data["name"],
+        "damage_relations": {
+            key: _names(relations.get(key))
+            for key in ("double_damage_to", "half_damage_to", "no_damage_to")
+        },
+    }
+
+
+def project_list(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "count": data.get("count"),
+        "next": data.get("next"),
+        "previous": data.get("previous"),
+        "results": [{"name": r["name"], "url": r.get("url")} for r in data.get("results", [])],
+    }
+
+
+_PROJECTIONS = {"pokemon": project_pokemon, "move": project_move, "type": project_type}
+
+
+def project_payload(endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields the engine, type chart and search read
+    
+    Raw Pokémon payloads are dominated by ``moves`` version details, ``sprites`` and
+    ``game_indices`` that we never use; projecting them shrinks cache entries ~50x.
+    """
+    path = endpoint.partition("?")[0].strip("/")
+    resource, _, name = path.partition("/")
+    if not name:
+        return project_list(data) if "results" in data else data
+    projection = _PROJECTIONS.get(resource)
+    return projection(data) if projection else data
+
+
+def extract_sprite(data: Dict[str, Any]) -> Optional[str]:
+    """Best sprite for a Pokémon payload, preferring the animated Gen V one"""
+    sprites = data["sprites"]
+    return sprites.get("versions", {}).get("generation-v", {}).get("black-white", {}).get("animated", {}).get("front_default") or \
+        (sprites.get("other") or {}).get("official-artwork", {}).get("front_default") or \
+        sprites.get("front_default")
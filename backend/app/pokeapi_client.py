@@ -1,45 +1,338 @@
+import asyncio
 import httpx
-from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
-from collections import defaultdict
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, List, Set
+from collections import Counter, OrderedDict
 import random
 
+from app.disk_cache import DiskCache, DiskEntry
+from app.metrics import STAGE_SECONDS, UPSTREAM_REQUESTS
+from app.payloads import project_payload
+from app.rng import SessionRng
+from app.search_index import SearchIndex
+from app.snapshot_store import SnapshotStore
+from app.upstream import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+logger = logging.getLogger(__name__)
+
+_UPSTREAM_FETCH = STAGE_SECONDS.labels("upstream_fetch")
+_ATTEMPTS = {
+    outcome: UPSTREAM_REQUESTS.labels(outcome)
+    for outcome in ("1xx", "2xx", "3xx", "4xx", "5xx", "timeout", "error", "short_circuit")
+}
+
 
 class CacheEntry:
-    def __init__(self, data: Dict[Any, Any], ttl_hours: int = 24):
+    __slots__ = ("data", "expires_at", "refresh_at", "stale_until", "size")
+    
+    def __init__(
+        self,
+        data: Dict[Any, Any],
+        ttl_hours: float = 24,
+        size: int = 0,
+        stale_hours: float = 0.0,
+        refresh_ahead: float = 0.0,
+        age: float = 0.0
+    ):
         self.data = data
-        self.expires_at = datetime.now() + timedelta(hours=ttl_hours)
+        ttl = ttl_hours * 3600
+        # ``age``: seconds since the payload was fetched, for entries loaded from the disk cache
+        self.expires_at = time.monotonic() + ttl - age
+        self.refresh_at = self.expires_at - ttl * refresh_ahead
+        self.stale_until = self.expires_at + stale_hours * 3600
+        self.size = size
     
     def is_expired(self) -> bool:
-        return datetime.now() > self.expires_at
+        return time.monotonic() > self.expires_at
+    
+    def needs_refresh(self) -> bool:
+        """Expired, or close enough to expiry that it should be refetched in the background"""
+        return time.monotonic() >= self.refresh_at
+
+
+class ResponseCache:
+    """LRU + TTL cache of projected PokeAPI payloads with approximate byte accounting
+    
+    Expired entries are kept for another ``stale_hours`` so they can be served while being
+    revalidated or while PokeAPI is down. Fresh entries within the last ``refresh_ahead``
+    fraction of their TTL are flagged for background refresh.
+    """
+    
+    def __init__(
+        self,
+        max_bytes: Optional[int] = 64 * 1024 * 1024,
+        max_entries: Optional[int] = None,
+        ttl_hours: float = 24,
+        stale_hours: float = 0.0,
+        refresh_ahead: float = 0.0
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_hours = ttl_hours
+        self.stale_hours = stale_hours
+        self.refresh_ahead = refresh_ahead
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions: Counter = Counter()
+    
+    def lookup(self, key: str, allow_stale: bool = True) -> Optional[CacheEntry]:
+        """Entry for ``key`` if fresh, or expired but still within the stale window"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        now = time.monotonic()
+        if now > entry.stale_until:
+            self._remove(key, "expired")
+            self.misses += 1
+            return None
+        if now > entry.expires_at:
+            if not allow_stale:
+                self.misses += 1
+                return None
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.lookup(key, allow_stale=False)
+        return entry.data if entry is not None else None
+    
+    def put(self, key: str, data: Dict[str, Any], age: float = 0.0):
+        if key in self._entries:
+            self._remove(key)
+        # Compact JSON length is a stable, cheap proxy for resident size
+        entry = CacheEntry(
+            data, self.ttl_hours, len(json.dumps(data, separators=(",", ":"))), self.stale_hours, self.refresh_ahead, age
+        )
+        self._entries[key] = entry
+        self.bytes += entry.size
+        while len(self._entries) > 1 and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)), "lru")
+    
+    def _remove(self, key: str, reason: Optional[str] = None):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        if reason:
+            self.evictions[reason] += 1
+    
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not entry.is_expired()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions_lru": self.evictions["lru"],
+            "evictions_expired": self.evictions["expired"],
+        }
 
 
 class PokeApiClient:
     BASE_URL = "https://pokeapi.co/api/v2"
+    POPULAR_POKEMON = [
+        "pikachu", "charizard", "blastoise", "venusaur", "snorlax",
+        "garchomp", "lucario", "dragonite", "gengar", "tyranitar",
+        "machamp", "gyarados", "mewtwo", "rayquaza", "metagross"
+    ]
+    SEARCH_LIMIT = 2000
+    DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
     
-    def __init__(self):
-        self.cache: Dict[str, CacheEntry] = {}
-        self.client = httpx.AsyncClient(timeout=30.0)
+    def __init__(
+        self,
+        snapshot: Optional[SnapshotStore] = None,
+        offline: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[ResponseCache] = None,
+        timeout: float = 5.0,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        disk_cache: Optional[DiskCache] = None
+    ):
+        self.cache = cache if cache is not None else ResponseCache(stale_hours=24, refresh_ahead=0.1)
+        # Write-through second tier shared with the other workers; uses the same TTLs
+        self.disk_cache = disk_cache
+        # http2=True needs the optional h2 package (pip install 'httpx[http2]')
+        self.client = httpx.AsyncClient(
+            timeout=timeout, transport=transport, limits=limits or self.DEFAULT_LIMITS, http2=http2
+        )
+        # httpx timeouts apply per socket operation; this bounds each whole attempt
+        self.timeout = timeout
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Future] = set()
+        self.snapshot = snapshot
+        self.offline = offline
+        self.search_index: Optional[SearchIndex] = None
+        self._search_index_source: Optional[Dict[str, Any]] = None
     
     async def _fetch(self, endpoint: str) -> Dict[str, Any]:
-        # Check cache
-        if endpoint in self.cache:
-            entry = self.cache[endpoint]
-            if not entry.is_expired():
-                return entry.data
-            else:
-                del self.cache[endpoint]
+        # Check cache; stale and nearly expired entries are served while being refetched
+        entry = self.cache.lookup(endpoint)
+        if entry is not None:
+            if entry.needs_refresh():
+                self._revalidate(endpoint)
+            return entry.data
         
-        # Fetch from API
+        # Single-flight: concurrent callers for the same endpoint share one request
+        pending = self._inflight.get(endpoint)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch_uncached(endpoint))
+            self._inflight[endpoint] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(endpoint, None))
+        # Shielded so a cancelled waiter does not abort the fetch for the others
+        return await asyncio.shield(pending)
+    
+    async def _fetch_uncached(self, endpoint: str) -> Dict[str, Any]:
         url = f"{self.BASE_URL}/{endpoint}"
-        response = await self.client.get(url)
+        
+        # Serve from the offline snapshot when one is attached
+        if self.snapshot is not None:
+            data = self.snapshot.get(endpoint)
+            if data is not None:
+                data = project_payload(endpoint, data)
+                self.cache.put(endpoint, data)
+                return data
+        
+        # Then the disk cache: entries another worker (or an earlier run) fetched are used
+        # as long as they are fresh, and offline anything on disk beats nothing
+        disk_entry = await asyncio.to_thread(self.disk_cache.get, endpoint) if self.disk_cache is not None else None
+        age = self.disk_cache.age(disk_entry) if disk_entry is not None else 0.0
+        ttl = self.cache.ttl_hours * 3600
+        if disk_entry is not None and (self.offline or age < ttl * (1 - self.cache.refresh_ahead)):
+            self.cache.put(endpoint, disk_entry.data, age)
+            return disk_entry.data
+        
+        if self.offline:
+            request = httpx.Request("GET", url)
+            raise httpx.HTTPStatusError(
+                f"{endpoint} is not in the offline snapshot",
+                request=request,
+                response=httpx.Response(404, request=request)
+            )
+        
+        # Fetch from API, conditionally when an older copy is on disk
+        try:
+            response = await self._get(url, self._validators(disk_entry))
+        except (httpx.HTTPError, CircuitOpenError):
+            if disk_entry is not None and age < ttl + self.cache.stale_hours * 3600:
+                logger.warning("Serving stale %s from the disk cache", endpoint)
+                self.cache.put(endpoint, disk_entry.data, age)
+                return disk_entry.data
+            raise
+        if response.status_code == 304 and disk_entry is not None:
+            await asyncio.to_thread(self.disk_cache.touch, endpoint)
+            self.cache.put(endpoint, disk_entry.data)
+            return disk_entry.data
         response.raise_for_status()
-        data = response.json()
+        data = project_payload(endpoint, response.json())
         
         # Cache it
-        self.cache[endpoint] = CacheEntry(data)
+        self.cache.put(endpoint, data)
+        if self.disk_cache is not None:
+            await asyncio.to_thread(
+                self.disk_cache.put, endpoint, data, response.headers.get("etag"), response.headers.get("last-modified")
+            )
         return data
     
+    @staticmethod
+    def _validators(entry: Optional[DiskEntry]) -> Optional[Dict[str, str]]:
+        if entry is None:
+            return None
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers or None
+    
+    async def _get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET with a per-attempt deadline, jittered retries and the circuit breaker
+        
+        Timeouts, transport errors, 5xx and 429 are retried and count as breaker failures;
+        any other response (including 404) is returned as is.
+        """
+        self.retry.record_request()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                _ATTEMPTS["short_circuit"].inc()
+                retry_in = self.breaker.retry_in()
+                raise CircuitOpenError(f"PokeAPI is unavailable, retrying in {retry_in:.0f}s", retry_after=retry_in)
+            attempt += 1
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(self.client.get(url, headers=headers), self.timeout)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                error: Exception = httpx.ReadTimeout(f"PokeAPI timed out after {self.timeout}s", request=httpx.Request("GET", url))
+            except httpx.TransportError as e:
+                outcome = "error"
+                error = e
+            else:
+                outcome = f"{response.status_code // 100}xx"
+                if response.status_code < 500 and response.status_code != 429:
+                    _UPSTREAM_FETCH.observe(time.perf_counter() - started)
+                    _ATTEMPTS[outcome].inc()
+                    self.breaker.record_success()
+                    return response
+                error = httpx.HTTPStatusError(
+                    f"PokeAPI returned {response.status_code}", request=response.request, response=response
+                )
+            _UPSTREAM_FETCH.observe(time.perf_counter() - started)
+            _ATTEMPTS[outcome].inc()
+            self.breaker.record_failure()
+            if not self.retry.try_retry(attempt):
+                raise error
+            logger.info("Retrying %s after %s (attempt %d)", url, outcome, attempt)
+            await asyncio.sleep(self.retry.backoff(attempt))
+    
+    def _revalidate(self, endpoint: str):
+        """Refetch ``endpoint`` in the background, unless already in flight or the circuit is open"""
+        if endpoint in self._inflight or self.breaker.is_open():
+            return
+        task = asyncio.ensure_future(self._fetch_uncached(endpoint))
+        self._inflight[endpoint] = task
+        self._background.add(task)
+        
+        def done(_):
+            self._inflight.pop(endpoint, None)
+            self._background.discard(task)
+            # Failures keep serving the cached entry
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning("Background refresh of %s failed: %s", endpoint, task.exception())
+        
+        task.add_done_callback(done)
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.metrics(),
+            "retries": self.retry.retries,
+            "retries_denied": self.retry.denied,
+            "background_refreshes": len(self._background),
+        }
+    
     async def get_pokemon(self, name: str) -> Dict[str, Any]:
         name = name.lower().strip()
         return await self._fetch(f"pokemon/{name}")
@@ -52,54 +345,99 @@ class PokeApiClient:
         name = name.lower().strip()
         return await self._fetch(f"type/{name}")
     
+    async def get_move_details(self, name: str) -> Dict[str, Any]:
+        """The complete PokeAPI move payload, for API clients; the engine uses get_move"""
+        name = name.lower().strip()
+        return await self._fetch_full(f"move/{name}")
+    
+    async def get_type_details(self, name: str) -> Dict[str, Any]:
+        """The complete PokeAPI type payload, for API clients; the engine uses get_type"""
+        name = name.lower().strip()
+        return await self._fetch_full(f"type/{name}")
+    
+    async def _fetch_full(self, endpoint: str) -> Dict[str, Any]:
+        """Unprojected payload, kept in the memory cache under its own key and never on disk
+        
+        Offline, the snapshot's payload is served as stored: complete only if the snapshot
+        was built with ``--full``.
+        """
+        key = f"full:{endpoint}"
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch_full_uncached(endpoint))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending)
+    
+    async def _fetch_full_uncached(self, endpoint: str) -> Dict[str, Any]:
+        url = f"{self.BASE_URL}/{endpoint}"
+        if self.offline:
+            data = self.snapshot.get(endpoint) if self.snapshot is not None else None
+            if data is None:
+                request = httpx.Request("GET", url)
+                raise httpx.HTTPStatusError(
+                    f"{endpoint} is not in the offline snapshot",
+                    request=request,
+                    response=httpx.Response(404, request=request)
+                )
+        else:
+            response = await self._get(url)
+            response.raise_for_status()
+            data = response.json()
+        self.cache.put(f"full:{endpoint}", data)
+        return data
+    
+    async def get_search_index(self) -> SearchIndex:
+        """Search index over every species, rebuilt whenever the cached name list is refreshed"""
+        data = await self._fetch(f"pokemon?limit={self.SEARCH_LIMIT}")
+        if self.search_index is None or self._search_index_source is not data:
+            self.search_index = SearchIndex.from_listing(data)
+            self._search_index_source = data
+        return self.search_index
+    
     async def search_pokemon(self, query: str, limit: int = 10) -> List[str]:
-        # Simple search - fetch list and filter
         try:
-            data = await self._fetch("pokemon?limit=1000")
-            all_pokemon = [p["name"] for p in data.get("results", [])]
-            filtered = [p for p in all_pokemon if query.lower() in p.lower()]
-            return filtered[:limit]
-        except Exception as e:
-            print(f"Search error: {e}")
+            index = await self.get_search_index()
+            return index.search(query, limit)
+        except CircuitOpenError:
+            # An outage, not an empty result; the endpoint reports it as 503
+            raise
+        except Exception:
+            logger.exception("Search failed for %r", query)
             return []
     
     async def search_pokemon_with_sprites(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search pokemon and return names with sprites"""
+        """Search pokemon and return names with sprites from the precomputed sprite table"""
         try:
-            data = await self._fetch("pokemon?limit=1000")
-            all_pokemon = [p["name"] for p in data.get("results", [])]
-            filtered = [p for p in all_pokemon if query.lower() in p.lower()][:limit]
-            
-            results = []
-            for name in filtered:
-                try:
-                    pokemon_data = await self.get_pokemon(name)
-                    # Try animated sprites first
-                    sprite = pokemon_data["sprites"].get("versions", {}).get("generation-v", {}).get("black-white", {}).get("animated", {}).get("front_default") or \
-                            pokemon_data["sprites"]["other"]["official-artwork"]["front_default"] or \
-                            pokemon_data["sprites"]["front_default"]
-                    results.append({"name": name, "sprite": sprite})
-                except Exception as e:
-                    print(f"Error getting sprite for {name}: {e}")
-                    results.append({"name": name, "sprite": ""})
-            
-            return results
-        except Exception as e:
-            print(f"Search error: {e}")
+            index = await self.get_search_index()
+            return index.search_with_sprites(query, limit)
+        except CircuitOpenError:
+            # An outage, not an empty result; the endpoint reports it as 503
+            raise
+        except Exception:
+            logger.exception("Search failed for %r", query)
             return []
     
+    def random_pokemon_name(self, rng: Optional[SessionRng] = None) -> str:
+        """Pick a random known popular pokemon, from ``rng`` when given"""
+        if rng is None:
+            return random.choice(self.POPULAR_POKEMON)
+        return self.POPULAR_POKEMON[rng.randrange(len(self.POPULAR_POKEMON))]
+    
     async def get_random_pokemon(self) -> Dict[str, Any]:
-        # Get total count
-        data = await self._fetch("pokemon?limit=1")
-        # For simplicity, pick a random known popular pokemon
-        popular = [
-            "pikachu", "charizard", "blastoise", "venusaur", "snorlax",
-            "garchomp", "lucario", "dragonite", "gengar", "tyranitar",
-            "machamp", "gyarados", "mewtwo", "rayquaza", "metagross"
-        ]
-        name = random.choice(popular)
-        return await self.get_pokemon(name)
+        return await self.get_pokemon(self.random_pokemon_name())
     
     async def close(self):
+        for task in list(self._background):
+            task.cancel()
+        # Fetches nobody awaits any more (moves past an early stop) still finish, so they reach the disk cache
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
         await self.client.aclose()
+        if self.snapshot is not None:
+            self.snapshot.close()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
 
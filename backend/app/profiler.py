@@ -0,0 +1,90 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a background thread
+    
+    Stacks are aggregated in collapsed ("folded") form, one ``frame;frame;frame count``
+    line per distinct stack, which flamegraph.pl and speedscope read directly. Nothing
+    is hooked into the profiled thread, so overhead is only the sampler's share of the GIL.
+    """
+    
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+    
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Per-request profiling toggle for production debugging
+    
+    Profiles requests carrying ``X-Profile: 1`` and a ``sample_rate`` fraction of the rest,
+    one at a time, writing a folded-stack file per request to ``directory``. The event
+    loop thread is sampled, so concurrent requests show up in each other's profiles.
+    """
+    
+    HEADER = "x-profile"
+    
+    def __init__(self, directory: str, sample_rate: float = 0.0, interval: float = 0.001):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._busy = False
+        os.makedirs(directory, exist_ok=True)
+    
+    def wants(self, headers) -> bool:
+        if self._busy:
+            return False
+        return headers.get(self.HEADER) == "1" or (self.sample_rate > 0 and random.random() < self.sample_rate)
+    
+    async def __call__(self, request, call_next):
+        if not self.wants(request.headers):
+            return await call_next(request)
+        self._busy = True
+        profiler = SamplingProfiler(self.interval)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            return await call_next(request)
+        finally:
+            profiler.stop()
+            self._busy = False
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            name = request.url.path.strip("/").replace("/", "_") or "root"
+            path = os.path.join(self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{name}-{elapsed_ms:.0f}ms.folded")
+            with open(path, "w") as f:
+                f.write(profiler.collapsed())
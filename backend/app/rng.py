@@ -0,0 +1,50 @@
+import os
+
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+# Seeds stay below 2**53 so they survive a round trip through JavaScript numbers
+SEED_BITS = 53
+
+
+def new_seed() -> int:
+    """Fresh seed from the OS, without touching any shared generator state"""
+    return int.from_bytes(os.urandom(8), "little") >> (64 - SEED_BITS)
+
+
+def _mix(z: int) -> int:
+    # SplitMix64 finalizer
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & _MASK
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & _MASK
+    return z ^ (z >> 31)
+
+
+class SessionRng:
+    """Counter-based random stream: draw ``n`` is a pure function of (seed, n)
+    
+    The whole generator state is two ints, so it is stored with the session, and any
+    process can resume a stream (or jump ahead) by setting ``counter``. Independent
+    substreams for the same seed come from ``spawn``.
+    """
+    
+    __slots__ = ("seed", "counter")
+    
+    def __init__(self, seed: int, counter: int = 0):
+        self.seed = seed & _MASK
+        self.counter = counter
+    
+    def next64(self) -> int:
+        self.counter += 1
+        return _mix((self.seed + self.counter * _GOLDEN) & _MASK)
+    
+    def random(self) -> float:
+        """Uniform float in [0, 1)"""
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+    
+    def randrange(self, n: int) -> int:
+        """Uniform int in [0, n)"""
+        # Multiply-shift; the bias is below 2**-58 for the small n used here
+        return (self.next64() * n) >> 64
+    
+    def spawn(self, key: int) -> "SessionRng":
+        """Independent stream derived from this seed and ``key``"""
+        return SessionRng(_mix(self.seed ^ _mix((key + 1) * _GOLDEN & _MASK)))
@@ -0,0 +1,182 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+SPRITE_BASE = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon"
+# Gen V has animated sprites for the first 649 Pokémon
+ANIMATED_MAX_ID = 649
+_ID_FROM_URL = re.compile(r"/(\d+)/?$")
+
+
+def sprite_for_id(pokemon_id: int) -> str:
+    """Sprite URL following PokeAPI's sprite repository layout, same preference as extract_sprite"""
+    if pokemon_id <= ANIMATED_MAX_ID:
+        return f"{SPRITE_BASE}/versions/generation-v/black-white/animated/{pokemon_id}.gif"
+    return f"{SPRITE_BASE}/other/official-artwork/{pokemon_id}.png"
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Banded Levenshtein distance with adjacent transpositions, capped at limit + 1"""
+    len_a, len_b = len(a), len(b)
+    if abs(len_a - len_b) > limit:
+        return limit + 1
+    over = limit + 1
+    previous_previous: List[int] = []
+    previous = list(range(len_b + 1))
+    previous_min = 0
+    for i in range(1, len_a + 1):
+        current = [over] * (len_b + 1)
+        current[0] = row_min = i
+        ca = a[i - 1]
+        # Only cells within ``limit`` of the diagonal can stay under the limit
+        for j in range(max(1, i - limit), min(len_b, i + limit) + 1):
+            cb = b[j - 1]
+            value = previous[j - 1] if ca == cb else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and previous_previous[j - 2] + 1 < value:
+                value = previous_previous[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        # Transpositions reach back two rows, so both must exceed the limit to stop early
+        if row_min > limit and previous_min > limit:
+            return over
+        previous_previous, previous, previous_min = previous, current, row_min
+    return min(previous[-1], over)
+
+
+class SearchIndex:
+    """In-memory name index: sorted prefix lookup, n-gram substring lookup and typo tolerance
+    
+    Results are ranked exact match, then prefix matches alphabetically, then substring
+    matches (earlier occurrence first, then Pokédex order). Only when nothing matches
+    literally are fuzzy matches returned, by edit distance.
+    """
+    
+    FUZZY_CANDIDATES = 32
+    
+    def __init__(self, entries: Iterable[Tuple[str, Optional[int]]]):
+        self.names: List[str] = []
+        self.sprites: Dict[str, str] = {}
+        for name, pokemon_id in entries:
+            self.names.append(name)
+            self.sprites[name] = sprite_for_id(pokemon_id) if pokemon_id else ""
+        self._order = {name: i for i, name in enumerate(self.names)}
+        self._sorted = sorted(self.names)
+        
+        # Every 1-, 2- and 3-gram maps to the names containing it, pre-sorted in substring
+        # rank order (earliest occurrence, then Pokédex order) so short queries just slice
+        grams: Dict[str, Dict[int, int]] = defaultdict(dict)
+        for position, name in enumerate(self.names):
+            for size in (1, 2, 3):
+                for start in range(len(name) - size + 1):
+                    grams[name[start:start + size]].setdefault(position, start)
+        self._grams: Dict[str, List[int]] = {
+            gram: sorted(occurrences, key=lambda position: (occurrences[position], position))
+            for gram, occurrences in grams.items()
+        }
+    
+    @classmethod
+    def from_listing(cls, listing: Dict) -> "SearchIndex":
+        """Build from a ``pokemon?limit=N`` payload, reading ids from resource URLs"""
+        entries = []
+        for result in listing.get("results", []):
+            match = _ID_FROM_URL.search(result.get("url") or "")
+            entries.append((result["name"], int(match.group(1)) if match else None))
+        return cls(entries)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def set_sprite(self, name: str, sprite: str):
+        """Record the sprite actually resolved for a species"""
+        if name in self.sprites and sprite:
+            self.sprites[name] = sprite
+    
+    def _prefix(self, query: str, exclude: Set[str], limit: int) -> List[str]:
+        """Prefix matches in alphabetical order, straight from the sorted name array"""
+        matches = []
+        position = bisect_left(self._sorted, query)
+        while position < len(self._sorted) and len(matches) < limit:
+            name = self._sorted[position]
+            if not name.startswith(query):
+                break
+            if name not in exclude:
+                matches.append(name)
+            position += 1
+        return matches
+    
+    def _substring(self, query: str, exclude: Set[str], limit: int) -> List[str]:
+        if len(query) <= 3:
+            # Posting lists are already in rank order
+            matches = []
+            for position in self._grams.get(query, ()):
+                name = self.names[position]
+                if name not in exclude:
+                    matches.append(name)
+                    if len(matches) == limit:
+                        break
+            return matches
+        # Verify candidates from the rarest trigram of the query
+        rarest = min(
+            (self._grams.get(query[i:i + 3], ()) for i in range(len(query) - 2)),
+            key=len
+        )
+        matches = [
+            name for name in (self.names[position] for position in rarest)
+            if query in name and name not in exclude
+        ]
+        matches.sort(key=lambda name: (name.index(query), self._order[name]))
+        return matches[:limit]
+    
+    def _fuzzy(self, query: str, exclude: Set[str], limit: int) -> List[str]:
+        if len(query) < 4:
+            return []
+        max_distance = 1 if len(query) <= 6 else 2
+        # Rank candidates by shared trigrams and only score the best few
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in {query[i:i + 3] for i in range(len(query) - 2)}:
+            for position in self._grams.get(gram, ()):
+                shared[position] += 1
+        candidates = heapq.nsmallest(self.FUZZY_CANDIDATES, shared, key=lambda position: (-shared[position], position))
+        
+        matches = []
+        for position in candidates:
+            name = self.names[position]
+            if name in exclude:
+                continue
+            # Compare against the whole name and against a same-length prefix (partial typing)
+            distance = min(
+                _edit_distance(query, name, max_distance),
+                _edit_distance(query, name[:len(query)], max_distance)
+            )
+            if distance <= max_distance:
+                matches.append((distance, position, name))
+        matches.sort()
+        return [name for _, _, name in matches[:limit]]
+    
+    def search(self, query: str, limit: int = 10) -> List[str]:
+        query = query.lower().strip()
+        if not query:
+            return []
+        results = [query] if query in self._order else []
+        seen = set(results)
+        for tier in (self._prefix, self._substring):
+            if len(results) >= limit:
+                break
+            matches = tier(query, seen, limit - len(results))
+            results.extend(matches)
+            seen.update(matches)
+        # Typo tolerance only kicks in when nothing matches literally
+        if not results:
+            results = self._fuzzy(query, seen, limit)
+        return results[:limit]
+    
+    def search_with_sprites(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        return [{"name": name, "sprite": self.sprites.get(name, "")} for name in self.search(query, limit)]
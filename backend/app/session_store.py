@@ -0,0 +1,437 @@
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.battle_engine import BattleSession
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """Where BattleEngine keeps battle sessions
+    
+    Implementations expire sessions idle for longer than ``idle_ttl`` seconds and finished
+    battles ``finished_ttl`` seconds after they end. Callers must ``put`` a session back
+    after mutating it so persistent stores see the change.
+    """
+    
+    @abstractmethod
+    def get(self, session_id: str) -> Optional["BattleSession"]:
+        ...
+    
+    @abstractmethod
+    def put(self, session_id: str, session: "BattleSession"):
+        ...
+    
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+    
+    @abstractmethod
+    def sweep(self) -> int:
+        """Drop expired sessions, returning how many were removed"""
+    
+    @abstractmethod
+    def metrics(self) -> Dict[str, int]:
+        ...
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+    
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+    
+    def __getitem__(self, session_id: str) -> "BattleSession":
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+    
+    def __setitem__(self, session_id: str, session: "BattleSession"):
+        self.put(session_id, session)
+    
+    def close(self):
+        pass
+
+
+class _Entry:
+    __slots__ = ("session", "last_access", "finished_at", "size")
+    
+    def __init__(self, session: "BattleSession", now: float):
+        self.session = session
+        self.last_access = now
+        self.finished_at = now if session.winner else None
+        self.size = session.approx_size()
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store with idle TTL, finished-battle grace period and entry/byte caps"""
+    
+    def __init__(
+        self,
+        idle_ttl: float = 1800.0,
+        finished_ttl: float = 60.0,
+        max_entries: Optional[int] = 10000,
+        max_bytes: Optional[int] = None,
+        sweep_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._last_sweep = clock()
+        self.evictions: Counter = Counter()
+    
+    def _expired(self, entry: _Entry, now: float) -> Optional[str]:
+        if entry.finished_at is not None and now - entry.finished_at > self.finished_ttl:
+            return "finished"
+        if now - entry.last_access > self.idle_ttl:
+            return "idle"
+        return None
+    
+    def _remove(self, session_id: str, reason: Optional[str] = None):
+        entry = self._entries.pop(session_id)
+        self._bytes -= entry.size
+        if reason:
+            self.evictions[reason] += 1
+    
+    def get(self, session_id: str) -> Optional["BattleSession"]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        now = self.clock()
+        reason = self._expired(entry, now)
+        if reason:
+            self._remove(session_id, reason)
+            return None
+        entry.last_access = now
+        self._entries.move_to_end(session_id)
+        return entry.session
+    
+    def put(self, session_id: str, session: "BattleSession"):
+        now = self.clock()
+        previous = self._entries.get(session_id)
+        entry = _Entry(session, now)
+        if previous is not None:
+            self._bytes -= previous.size
+            if previous.finished_at is not None:
+                entry.finished_at = previous.finished_at
+        self._entries[session_id] = entry
+        self._entries.move_to_end(session_id)
+        self._bytes += entry.size
+        
+        if now - self._last_sweep > self.sweep_interval:
+            self.sweep()
+        # LRU eviction under the caps, never evicting the session just written
+        while len(self._entries) > 1 and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)), "lru")
+    
+    def delete(self, session_id: str):
+        if session_id in self._entries:
+            self._remove(session_id)
+    
+    def sweep(self) -> int:
+        now = self.clock()
+        self._last_sweep = now
+        expired = [
+            (session_id, reason) for session_id, reason in
+            ((session_id, self._expired(entry, now)) for session_id, entry in self._entries.items())
+            if reason
+        ]
+        for session_id, reason in expired:
+            self._remove(session_id, reason)
+        return len(expired)
+    
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "resident_sessions": len(self._entries),
+            "resident_bytes": self._bytes,
+            "evictions_idle": self.evictions["idle"],
+            "evictions_finished": self.evictions["finished"],
+            "evictions_lru": self.evictions["lru"],
+        }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Write:
+    """A change to one session not yet committed: a put, a touch (last access only) or a delete"""
+    __slots__ = ("kind", "data", "last_access", "finished_at", "rev")
+    
+    def __init__(
+        self,
+        kind: str,
+        data: Optional[Dict[str, Any]] = None,
+        last_access: float = 0.0,
+        finished_at: Optional[float] = None,
+        rev: Optional[str] = None
+    ):
+        self.kind = kind
+        self.data = data
+        self.last_access = last_access
+        self.finished_at = finished_at
+        self.rev = rev
+    
+    def then(self, later: "_Write") -> "_Write":
+        """This write followed by ``later``, as one"""
+        if later.kind == "touch" and self.kind != "delete":
+            self.last_access = later.last_access
+            return self
+        if later.kind == "put" and self.kind == "put" and self.finished_at is not None:
+            later.finished_at = self.finished_at
+        return later
+
+
+class SqliteSessionStore(SessionStore):
+    """SQLite-backed store shared by every worker on a host and surviving restarts
+    
+    Uses wall-clock time so expiry agrees across processes. Concurrent actions on the same
+    session from different workers are last-writer-wins.
+    
+    Writes stay off the caller's thread: ``put`` only snapshots the session, and a writer
+    thread encodes and commits pending changes in batches, coalescing repeated writes to
+    a session. Until committed they are served from memory, so a worker always reads its
+    own writes; other workers see them once the batch commits. Reads are point lookups,
+    which WAL mode never blocks behind writers.
+    
+    Every put stamps the row with a new revision. The last ``cache_size`` sessions this
+    worker read or wrote are kept decoded, and a read whose stored revision still matches
+    returns that object without fetching or decoding the row.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        idle_ttl: float = 1800.0,
+        finished_ttl: float = 60.0,
+        sweep_interval: float = 30.0,
+        clock: Callable[[], float] = time.time,
+        cache_size: int = 1024
+    ):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.cache_size = cache_size
+        self.evictions = 0
+        self.cache_hits = 0
+        self._write_db = self._connect()
+        self._write_db.execute("PRAGMA journal_mode=WAL")
+        self._write_db.execute("PRAGMA synchronous=NORMAL")
+        self._write_db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL, finished_at REAL, rev TEXT)"
+        )
+        if "rev" not in {row[1] for row in self._write_db.execute("PRAGMA table_info(sessions)")}:
+            try:
+                self._write_db.execute("ALTER TABLE sessions ADD COLUMN rev TEXT")
+            except sqlite3.OperationalError as e:
+                # Another worker added it first
+                if "duplicate column" not in str(e):
+                    raise
+        self._db = self._connect()
+        self._resident = (0, 0)
+        # Revisions are unique across workers and restarts
+        self._rev_prefix = f"{os.getpid():x}.{os.urandom(4).hex()}."
+        self._revs = itertools.count()
+        self._cache: "OrderedDict[str, Tuple[str, BattleSession]]" = OrderedDict()
+        self._last_sweep = clock()
+        # _pending: changes waiting for the writer; _committing: the batch it is writing
+        self._pending: Dict[str, _Write] = {}
+        self._committing: Dict[str, _Write] = {}
+        self._changed = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._count_resident()
+        self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._writer.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+    
+    def _expiry_clause(self) -> str:
+        return "(last_access < ? OR (finished_at IS NOT NULL AND finished_at < ?))"
+    
+    def _cutoffs(self, now: float):
+        return now - self.idle_ttl, now - self.finished_ttl
+    
+    def _queue(self, session_id: str, write: _Write):
+        with self._changed:
+            previous = self._pending.get(session_id)
+            self._pending[session_id] = previous.then(write) if previous is not None else write
+            self._changed.notify_all()
+    
+    def _unwritten(self, session_id: str) -> Optional[_Write]:
+        with self._changed:
+            write = self._pending.get(session_id) or self._committing.get(session_id)
+            return write if write is not None and write.kind != "touch" else None
+    
+    def get(self, session_id: str) -> Optional["BattleSession"]:
+        from app.battle_engine import BattleSession
+        
+        now = self.clock()
+        idle_cutoff, finished_cutoff = self._cutoffs(now)
+        cached = self._cache.get(session_id)
+        write = self._unwritten(session_id)
+        if write is not None:
+            if write.kind == "delete":
+                return None
+            rev, data = write.rev, write.data
+            expired = write.last_access < idle_cutoff or (write.finished_at is not None and write.finished_at < finished_cutoff)
+        else:
+            # The row's data is only read when the cached copy is out of date
+            row = self._db.execute(
+                f"SELECT rev, {self._expiry_clause()}, CASE WHEN rev = ? THEN NULL ELSE data END FROM sessions WHERE id = ?",
+                (idle_cutoff, finished_cutoff, cached[0] if cached is not None else None, session_id)
+            ).fetchone()
+            if row is None:
+                self._cache.pop(session_id, None)
+                return None
+            rev, expired, data = row
+        if expired:
+            self.delete(session_id)
+            self.evictions += 1
+            return None
+        self._queue(session_id, _Write("touch", last_access=now))
+        if cached is not None and rev is not None and cached[0] == rev:
+            self.cache_hits += 1
+            self._cache.move_to_end(session_id)
+            return cached[1]
+        session = BattleSession.from_dict(data if write is not None else json.loads(data))
+        self._remember(session_id, rev, session)
+        return session
+    
+    def _remember(self, session_id: str, rev: Optional[str], session: "BattleSession"):
+        if rev is None:
+            self._cache.pop(session_id, None)
+            return
+        self._cache[session_id] = (rev, session)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def put(self, session_id: str, session: "BattleSession"):
+        now = self.clock()
+        rev = f"{self._rev_prefix}{next(self._revs)}"
+        self._queue(session_id, _Write("put", session.to_dict(), now, now if session.winner else None, rev))
+        self._remember(session_id, rev, session)
+    
+    def delete(self, session_id: str):
+        self._cache.pop(session_id, None)
+        self._queue(session_id, _Write("delete"))
+    
+    def _write_loop(self):
+        while True:
+            with self._changed:
+                if not self._pending and not self._closed:
+                    self._changed.wait(self.sweep_interval)
+                batch, self._pending = self._pending, {}
+                self._committing = batch
+                closing = self._closed
+            if batch:
+                try:
+                    self._commit(batch)
+                except sqlite3.Error:
+                    logger.exception("Writing %d sessions failed; retrying", len(batch))
+                    with self._changed:
+                        for session_id, write in batch.items():
+                            later = self._pending.get(session_id)
+                            self._pending[session_id] = write.then(later) if later is not None else write
+                    if not closing:
+                        time.sleep(1.0)
+            with self._changed:
+                self._committing = {}
+                self._changed.notify_all()
+            if self.clock() - self._last_sweep > self.sweep_interval:
+                try:
+                    self._sweep()
+                except sqlite3.Error:
+                    logger.exception("Session sweep failed")
+            if closing and not batch:
+                return
+    
+    def _commit(self, batch: Dict[str, _Write]):
+        with self._write_lock:
+            self._write_db.execute("BEGIN IMMEDIATE")
+            try:
+                for session_id, write in batch.items():
+                    if write.kind == "delete":
+                        self._write_db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                    elif write.kind == "touch":
+                        self._write_db.execute("UPDATE sessions SET last_access = ? WHERE id = ?", (write.last_access, session_id))
+                    else:
+                        self._write_db.execute(
+                            "INSERT INTO sessions (id, data, last_access, finished_at, rev) VALUES (?, ?, ?, ?, ?) "
+                            "ON CONFLICT(id) DO UPDATE SET data = excluded.data, last_access = excluded.last_access, "
+                            "finished_at = COALESCE(sessions.finished_at, excluded.finished_at), rev = excluded.rev",
+                            (session_id, json.dumps(write.data), write.last_access, write.finished_at, write.rev)
+                        )
+                self._write_db.execute("COMMIT")
+            except BaseException:
+                self._write_db.execute("ROLLBACK")
+                raise
+    
+    def flush(self):
+        """Wait until every change made so far is committed"""
+        with self._changed:
+            while self._pending or self._committing:
+                self._changed.wait()
+    
+    def _sweep(self) -> int:
+        now = self.clock()
+        self._last_sweep = now
+        with self._write_lock:
+            removed = self._write_db.execute(
+                f"DELETE FROM sessions WHERE {self._expiry_clause()}", self._cutoffs(now)
+            ).rowcount
+        self.evictions += removed
+        self._count_resident()
+        return removed
+    
+    def _count_resident(self):
+        # A full scan, so only done at startup and with each sweep rather than per scrape
+        with self._write_lock:
+            self._resident = self._write_db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+            ).fetchone()
+    
+    def sweep(self) -> int:
+        self.flush()
+        return self._sweep()
+    
+    def metrics(self) -> Dict[str, int]:
+        """Committed sessions as of the last sweep; changes still queued for the writer are counted separately"""
+        count, size = self._resident
+        return {"resident_sessions": count, "resident_bytes": size, "evictions": self.evictions, "pending_writes": len(self._pending), "cache_hits": self.cache_hits}
+    
+    def __len__(self) -> int:
+        self.flush()
+        return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        self._writer.join()
+        self._db.close()
+        self._write_db.close()
@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.damage_service import DamageService
+from app.models import Pokemon
+from app.type_chart import NO_TYPE, TypeChartCache
+
+
+logger = logging.getLogger(__name__)
+
+MAX_MOVES = 4
+MAX_TURNS = 100
+
+# Battle outcomes, from the first side's point of view
+LOSS, WIN, TIMEOUT = 0, 1, -1
+
+
+class Roster:
+    """Struct-of-arrays snapshot of normalized Pokémon for headless simulation"""
+    
+    FIELDS = (
+        "names", "hp", "attack", "defense", "sp_attack", "sp_defense", "speed", "types",
+        "move_count", "move_power", "move_accuracy", "move_special", "move_types", "move_stab",
+        "type_matrix",
+    )
+    
+    def __init__(self, **arrays: np.ndarray):
+        for field in self.FIELDS:
+            setattr(self, field, arrays[field])
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    @classmethod
+    def from_pokemon(cls, pokemon: Sequence[Pokemon], type_chart: TypeChartCache) -> "Roster":
+        n = len(pokemon)
+        move_power = np.zeros((n, MAX_MOVES), dtype=np.int64)
+        move_accuracy = np.full((n, MAX_MOVES), 100, dtype=np.int64)
+        move_special = np.zeros((n, MAX_MOVES), dtype=bool)
+        move_types = np.full((n, MAX_MOVES), NO_TYPE, dtype=np.int64)
+        move_stab = np.zeros((n, MAX_MOVES), dtype=bool)
+        for i, p in enumerate(pokemon):
+            for j, move in enumerate(p.moves[:MAX_MOVES]):
+                move_power[i, j] = move.power
+                move_accuracy[i, j] = move.accuracy
+                move_special[i, j] = move.class_ == "special"
+                move_types[i, j] = type_chart.intern(move.type)
+                move_stab[i, j] = move.type in p.types
+        
+        def stat(name: str) -> np.ndarray:
+            return np.array([getattr(p.stats, name) for p in pokemon], dtype=np.int64)
+        
+        return cls(
+            names=np.array([p.name for p in pokemon]),
+            hp=stat("hp"),
+            attack=stat("attack"),
+            defense=stat("defense"),
+            sp_attack=stat("sp_attack"),
+            sp_defense=stat("sp_defense"),
+            speed=stat("speed"),
+            types=np.array([type_chart.intern_types(p.types) for p in pokemon], dtype=np.int64).reshape(n, 2),
+            move_count=np.array([max(1, min(len(p.moves), MAX_MOVES)) for p in pokemon], dtype=np.int64),
+            move_power=move_power,
+            move_accuracy=move_accuracy,
+            move_special=move_special,
+            move_types=move_types,
+            move_stab=move_stab,
+            type_matrix=type_chart.matrix.copy(),
+        )
+    
+    def save(self, path: str):
+        with open(path, "wb") as out:
+            np.savez(out, **{field: getattr(self, field) for field in self.FIELDS})
+    
+    @classmethod
+    def load(cls, path: str) -> "Roster":
+        with np.load(path) as data:
+            return cls(**{field: data[field] for field in cls.FIELDS})
+
+
+class Simulator:
+    """Synchronous, log-free battle core over a Roster
+    
+    Damage follows BattleEngine: the DamageService formula with one of its 16 discrete
+    rolls, and accuracy checks. The first side always moves first. Both sides pick
+    uniformly random moves on purpose, unlike the engine's AI, so win rates measure the
+    matchup rather than how well either side is played.
+    """
+    
+    def __init__(self, roster: Roster):
+        self.roster = roster
+        type_chart = TypeChartCache(None)
+        type_chart.load_matrix(roster.type_matrix)
+        self.damage_service = DamageService(type_chart)
+        self._rolls = np.array(DamageService.ROLLS)
+    
+    def damage_table(self, attackers: np.ndarray, defenders: np.ndarray) -> np.ndarray:
+        """Pre-random damage for every (attacker, defender, move slot), shape (A, D, MAX_MOVES)"""
+        r = self.roster
+        a = np.asarray(attackers)[:, None, None]
+        d = np.asarray(defenders)[None, :, None]
+        moves = np.arange(MAX_MOVES)[None, None, :]
+        return self.damage_service.base_damage_batch(
+            attack=r.attack[a],
+            sp_attack=r.sp_attack[a],
+            defense=r.defense[d],
+            sp_defense=r.sp_defense[d],
+            power=r.move_power[a, moves],
+            special=r.move_special[a, moves],
+            move_types=r.move_types[a, moves],
+            defender_types=r.types[d],
+            stab=r.move_stab[a, moves],
+        )
+    
+    def _attack(self, table: np.ndarray, rows: np.ndarray, columns: np.ndarray, species: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        r = self.roster
+        move = (rng.random(len(species)) * r.move_count[species]).astype(np.intp)
+        damage = self.damage_service.roll_damage_batch(
+            table[rows, columns, move],
+            r.move_power[species, move],
+            self._rolls[rng.integers(len(self._rolls), size=len(species))]
+        )
+        hit = self.damage_service.check_accuracy_batch(r.move_accuracy[species, move], rng)
+        return np.where(hit, damage, 0)
+    
+    def simulate(self, first: np.ndarray, second: np.ndarray, rng: np.random.Generator, max_turns: int = MAX_TURNS) -> np.ndarray:
+        """Run one battle per (first[i], second[i]) pair and return WIN/LOSS/TIMEOUT per battle"""
+        first = np.asarray(first)
+        second = np.asarray(second)
+        first_ids, first_rows = np.unique(first, return_inverse=True)
+        second_ids, second_rows = np.unique(second, return_inverse=True)
+        forward = self.damage_table(first_ids, second_ids)
+        backward = self.damage_table(second_ids, first_ids)
+        
+        hp_first = self.roster.hp[first].copy()
+        hp_second = self.roster.hp[second].copy()
+        outcome = np.full(len(first), TIMEOUT, dtype=np.int8)
+        live = np.arange(len(first))
+        for _ in range(max_turns):
+            if not live.size:
+                break
+            hp_second[live] -= self._attack(forward, first_rows[live], second_rows[live], first[live], rng)
+            fainted = hp_second[live] <= 0
+            outcome[live[fainted]] = WIN
+            live = live[~fainted]
+            
+            hp_first[live] -= self._attack(backward, second_rows[live], first_rows[live], second[live], rng)
+            fainted = hp_first[live] <= 0
+            outcome[live[fainted]] = LOSS
+            live = live[~fainted]
+        return outcome
+    
+    def win_rates(self, rows: np.ndarray, battles: int, rng: np.random.Generator, max_turns: int = MAX_TURNS, chunk: int = 1_000_000) -> np.ndarray:
+        """Win rate of each species in ``rows`` (moving first) against every species, shape (len(rows), N)"""
+        n = len(self.roster)
+        rows = np.asarray(rows)
+        rates = np.zeros((len(rows), n), dtype=np.float32)
+        step = max(1, chunk // (n * battles))
+        opponents = np.tile(np.repeat(np.arange(n), battles), step)
+        for start in range(0, len(rows), step):
+            block = rows[start:start + step]
+            first = np.repeat(block, n * battles)
+            outcome = self.simulate(first, opponents[:len(first)], rng, max_turns)
+            wins = (outcome == WIN).reshape(len(block), n, battles)
+            rates[start:start + len(block)] = wins.mean(axis=2)
+        return rates
+
+
+_worker_simulator: Optional[Simulator] = None
+
+
+def _init_worker(roster_path: str):
+    global _worker_simulator
+    _worker_simulator = Simulator(Roster.load(roster_path))
+
+
+def _run_shard(rows: np.ndarray, battles: int, seed: np.random.SeedSequence, max_turns: int) -> Tuple[np.ndarray, np.ndarray]:
+    return rows, _worker_simulator.win_rates(rows, battles, np.random.default_rng(seed), max_turns)
+
+
+def run_tournament(
+    roster_path: str,
+    battles: int,
+    workers: int = 1,
+    seed: int = 0,
+    max_turns: int = MAX_TURNS,
+    shard_size: int = 16
+) -> Tuple[Roster, np.ndarray]:
+    """Every species vs every species, ``battles`` each, sharded by attacker across processes
+    
+    Shards and their seeds depend only on ``seed`` and ``shard_size``, so results are the
+    same for any number of workers.
+    """
+    roster = Roster.load(roster_path)
+    n = len(roster)
+    shards = [np.arange(start, min(start + shard_size, n)) for start in range(0, n, shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(shards))
+    rates = np.zeros((n, n), dtype=np.float32)
+    
+    if workers <= 1:
+        _init_worker(roster_path)
+        results = [_run_shard(rows, battles, shard_seed, max_turns) for rows, shard_seed in zip(shards, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(roster_path,)) as pool:
+            results = list(pool.map(
+                _run_shard, shards, [battles] * len(shards), seeds, [max_turns] * len(shards)
+            ))
+    for rows, shard_rates in results:
+        rates[rows] = shard_rates
+    return roster, rates
+
+
+async def build_roster(
+    names: Optional[List[str]], limit: int, snapshot: Optional[str], offline: bool, move_index: Optional[str] = None
+) -> Roster:
+    """Fetch and normalize species through the regular client and engine"""
+    from app.battle_engine import BattleEngine
+    from app.move_index import load_index
+    from app.pokeapi_client import PokeApiClient
+    from app.snapshot_store import SnapshotStore
+    
+    client = PokeApiClient(snapshot=SnapshotStore(snapshot) if snapshot else None, offline=offline)
+    type_chart = TypeChartCache(client)
+    engine = BattleEngine(client, DamageService(type_chart), move_index=load_index(move_index))
+    try:
+        await type_chart.load_all()
+        if not names:
+            listing = await client._fetch(f"pokemon?limit={limit}")
+            names = [p["name"] for p in listing["results"]]
+        
+        semaphore = asyncio.Semaphore(16)
+        
+        async def normalize(name: str) -> Optional[Pokemon]:
+            async with semaphore:
+                try:
+                    return await engine._normalize_pokemon(await client.get_pokemon(name))
+                except Exception as e:
+                    logger.warning("Skipping %s: %s", name, e)
+                    return None
+        
+        pokemon = [p for p in await asyncio.gather(*(normalize(name) for name in names)) if p is not None]
+        return Roster.from_pokemon(pokemon, type_chart)
+    finally:
+        await client.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Headless battle simulation")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    
+    build = subcommands.add_parser("build-roster", help="Precompute a roster file from PokeAPI or a snapshot")
+    build.add_argument("out", help="Roster .npz file to write")
+    build.add_argument("--names", help="Comma-separated species (default: first --limit species)")
+    build.add_argument("--limit", type=int, default=151)
+    build.add_argument("--snapshot", help="Serve PokeAPI data from this snapshot file")
+    build.add_argument("--offline", action="store_true")
+    build.add_argument("--move-index", help="Move index for movesets (default: the bundled index, if built)")
+    
+    tournament = subcommands.add_parser("tournament", help="Simulate every matchup and write a win-rate matrix")
+    tournament.add_argument("roster", help="Roster .npz file")
+    tournament.add_argument("out", help="Win-rate .npz file to write")
+    tournament.add_argument("--battles", type=int, default=100, help="Battles per ordered matchup")
+    tournament.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    tournament.add_argument("--seed", type=int, default=0)
+    tournament.add_argument("--max-turns", type=int, default=MAX_TURNS)
+    
+    args = parser.parse_args(argv)
+    if args.command == "build-roster":
+        names = args.names.split(",") if args.names else None
+        roster = asyncio.run(build_roster(names, args.limit, args.snapshot, args.offline, args.move_index))
+        roster.save(args.out)
+        print(f"Wrote {len(roster)} species to {args.out}")
+    else:
+        started = time.perf_counter()
+        roster, rates = run_tournament(args.roster, args.battles, args.workers, args.seed, args.max_turns)
+        elapsed = time.perf_counter() - started
+        with open(args.out, "wb") as out:
+            np.savez(out, names=roster.names, win_rate=rates)
+        total = len(roster) ** 2 * args.battles
+        print(json.dumps({
+            "species": len(roster),
+            "battles": total,
+            "seconds": round(elapsed, 3),
+            "battles_per_second": round(total / elapsed),
+            "battles_per_second_per_worker": round(total / elapsed / max(1, args.workers)),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+
+# File layout: header | zlib-compressed JSON records | key blob | sorted index
+MAGIC = b"PKSNAP01"
+HEADER = struct.Struct("<8sIQQ")  # magic, index entries, index offset, keys offset
+INDEX_ENTRY = struct.Struct("<IIQI")  # key offset, key length, record offset, record length
+RESOURCES = ("pokemon", "move", "type")
+DEFAULT_LIST_LIMIT = 20
+
+
+class SnapshotStore:
+    """Read-only, memory-mapped PokeAPI snapshot keyed by endpoint"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._index_offset, self._keys_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a PokeAPI snapshot")
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __contains__(self, endpoint: str) -> bool:
+        return self._find(endpoint.encode()) is not None
+    
+    def _entry(self, position: int) -> Tuple[int, int, int, int]:
+        return INDEX_ENTRY.unpack_from(self._mmap, self._index_offset + position * INDEX_ENTRY.size)
+    
+    def _key(self, position: int) -> bytes:
+        key_offset, key_length, _, _ = self._entry(position)
+        start = self._keys_offset + key_offset
+        return self._mmap[start:start + key_length]
+    
+    def _find(self, key: bytes) -> Optional[Tuple[int, int]]:
+        """Binary search the sorted index, returning (record offset, length)"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._key(low) == key:
+            _, _, offset, length = self._entry(low)
+            return offset, length
+        return None
+    
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        location = self._find(key.encode())
+        if location is None:
+            return None
+        offset, length = location
+        return json.loads(zlib.decompress(self._mmap[offset:offset + length]))
+    
+    def get(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        """Resolve a client endpoint such as ``move/tackle`` or ``pokemon?limit=1000``"""
+        path, _, query = endpoint.partition("?")
+        path = path.strip("/")
+        if "/" in path:
+            return self._load(path)
+        
+        # Resource list endpoints are stored once and paginated on read
+        listing = self._load(path)
+        if listing is None:
+            return None
+        params = parse_qs(query)
+        limit = int(params.get("limit", [DEFAULT_LIST_LIMIT])[0])
+        offset = int(params.get("offset", [0])[0])
+        results = listing["results"]
+        return {
+            "count": len(results),
+            "next": None,
+            "previous": None,
+            "results": results[offset:offset + limit],
+        }
+    
+    def keys(self) -> Iterator[str]:
+        for position in range(self._count):
+            yield self._key(position).decode()
+    
+    def close(self):
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+
+def _resource_root(dump_dir: Path) -> Path:
+    """Accept either a PokeAPI api-data checkout or its ``api/v2`` directory"""
+    for candidate in (dump_dir / "data" / "api" / "v2", dump_dir / "api" / "v2"):
+        if candidate.is_dir():
+            return candidate
+    return dump_dir
+
+
+def _iter_resource(resource_dir: Path) -> Iterator[Dict[str, Any]]:
+    """Yield every payload in a resource directory (``<id>/index.json`` or ``<name>.json``)"""
+    for entry in sorted(resource_dir.iterdir()):
+        if entry.is_dir() and (entry / "index.json").is_file():
+            yield json.loads((entry / "index.json").read_text())
+        elif entry.suffix == ".json" and entry.name != "index.json":
+            yield json.loads(entry.read_text())
+
+
+def build_snapshot(dump_dir: str, out_path: str, resources: Tuple[str, ...] = RESOURCES, project: bool = True) -> int:
+    """Ingest a local PokeAPI dump into a snapshot file, returning the number of index keys
+    
+    With ``project`` (the default) only the fields the backend reads are stored.
+    """
+    from app.payloads import project_payload
+    
+    root = _resource_root(Path(dump_dir))
+    records: List[bytes] = []
+    keys: Dict[str, int] = {}
+    
+    def add(payload: Dict[str, Any]) -> int:
+        records.append(zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), 9))
+        return len(records) - 1
+    
+    for resource in resources:
+        resource_dir = root / resource
+        if not resource_dir.is_dir():
+            continue
+        listing = []
+        for payload in _iter_resource(resource_dir):
+            if project:
+                payload = project_payload(f"{resource}/{payload['name']}", payload)
+            record = add(payload)
+            keys[f"{resource}/{payload['name']}"] = record
+            if "id" in payload:
+                keys[f"{resource}/{payload['id']}"] = record
+                listing.append((payload["id"], payload["name"]))
+        listing.sort()
+        keys[resource] = add({
+            "results": [
+                {"name": name, "url": f"https://pokeapi.co/api/v2/{resource}/{resource_id}/"}
+                for resource_id, name in listing
+            ]
+        })
+    
+    sorted_keys = sorted((key.encode(), record) for key, record in keys.items())
+    
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(b"\0" * HEADER.size)
+        record_offsets = []
+        for record in records:
+            record_offsets.append((out.tell(), len(record)))
+            out.write(record)
+        
+        keys_offset = out.tell()
+        key_positions = []
+        position = 0
+        for key, _ in sorted_keys:
+            key_positions.append(position)
+            out.write(key)
+            position += len(key)
+        
+        index_offset = out.tell()
+        for (key, record), key_position in zip(sorted_keys, key_positions):
+            offset, length = record_offsets[record]
+            out.write(INDEX_ENTRY.pack(key_position, len(key), offset, length))
+        
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, len(sorted_keys), index_offset, keys_offset))
+    
+    # Atomic swap so running workers never map a half-written file
+    os.replace(tmp_path, out_path)
+    return len(sorted_keys)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build an offline PokeAPI snapshot")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    
+    build = subcommands.add_parser("build", help="Ingest a local PokeAPI data dump")
+    build.add_argument("dump_dir", help="PokeAPI api-data checkout or api/v2 directory")
+    build.add_argument("out", help="Snapshot file to write")
+    build.add_argument("--full", action="store_true", help="Keep complete payloads instead of projecting them")
+    
+    get = subcommands.add_parser("get", help="Print one endpoint from a snapshot")
+    get.add_argument("snapshot")
+    get.add_argument("endpoint")
+    
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        count = build_snapshot(args.dump_dir, args.out, project=not args.full)
+        print(f"Wrote {count} keys to {args.out}")
+    else:
+        store = SnapshotStore(args.snapshot)
+        try:
+            print(json.dumps(store.get(args.endpoint), indent=2))
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
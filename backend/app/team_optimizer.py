@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from app import simulation
+from app.matchups import expected_damage, turns_to_ko
+from app.simulation import MAX_TURNS, WIN, Roster, Simulator
+
+
+logger = logging.getLogger(__name__)
+
+# Used by the job API when present; build it with ``python -m app.simulation build-roster``
+DEFAULT_ROSTER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "roster.npz")
+# Simulated battles per process-pool task
+SHARD_BATTLES = 200_000
+
+Progress = Callable[[str, float], None]
+
+
+def team_scores(rates: np.ndarray, teams: np.ndarray) -> np.ndarray:
+    """Mean over opponents of the team's best member's win rate, for (C, size) teams over (N, O) rates
+    
+    A team is scored as if it could send in its best answer to each opponent.
+    """
+    return rates[teams].max(axis=1).mean(axis=1)
+
+
+def _run_pairs(first: np.ndarray, second: np.ndarray, battles: np.ndarray, seed: np.random.SeedSequence, max_turns: int) -> np.ndarray:
+    """Wins of ``first[i]`` (moving first) in ``battles[i]`` battles against ``second[i]``, in a pool worker"""
+    outcome = simulation._worker_simulator.simulate(
+        np.repeat(first, battles), np.repeat(second, battles), np.random.default_rng(seed), max_turns
+    )
+    starts = np.concatenate(([0], np.cumsum(battles)[:-1]))
+    return np.add.reduceat((outcome == WIN).astype(np.int64), starts)
+
+
+class TeamOptimizer:
+    """Successive-halving search for the team that best covers an opponent pool
+    
+    Every candidate team is first scored analytically from the damage race of each
+    member against each opponent. The best ``1/eta`` then get ``battles`` simulated
+    battles per member and opponent, the best ``1/eta`` of those ``eta`` times as many,
+    and so on until ``top`` teams remain. Battle results are kept per species and
+    opponent, so teams sharing members share simulations, and later rounds only top up
+    the counts. Simulation runs on a process pool whose workers each load the roster
+    file once; only index arrays and win counts cross process boundaries.
+    
+    The pool is created once and kept until ``close``. Its workers start from a
+    forkserver, never by forking a server process whose threads may hold locks.
+    """
+    
+    def __init__(self, roster_path: str, workers: int = 1, max_turns: int = MAX_TURNS):
+        self.roster_path = roster_path
+        self.roster = Roster.load(roster_path)
+        self.simulator = Simulator(self.roster)
+        self.workers = workers
+        self.max_turns = max_turns
+        self.index = {str(name): i for i, name in enumerate(self.roster.names)}
+        self.pool: Optional[Executor] = None
+        if workers > 1:
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=simulation._init_worker,
+                initargs=(roster_path,)
+            )
+    
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+    
+    def species(self, names: Sequence[str]) -> np.ndarray:
+        missing = [name for name in names if name not in self.index]
+        if missing:
+            raise ValueError(f"Not in the roster: {', '.join(missing)}")
+        return np.array([self.index[name] for name in names], dtype=np.int64)
+    
+    def analytic_rates(self, opponents: np.ndarray) -> np.ndarray:
+        """Estimated win probability of every species, moving first, against each opponent, shape (N, O)"""
+        r = self.roster
+        everyone = np.arange(len(r))
+        needed = turns_to_ko(expected_damage(self.simulator, everyone, opponents), r.hp[opponents][None, :])
+        survived = turns_to_ko(expected_damage(self.simulator, opponents, everyone).T, r.hp[:, None])
+        # Moving first, a species wins the race when it needs no more turns than it survives
+        margin = np.clip(survived.astype(np.float64) - needed + 0.5, -30, 30)
+        return 1 / (1 + np.exp(-margin))
+    
+    def candidate_teams(self, rates: np.ndarray, size: int, count: int, rng: np.random.Generator) -> np.ndarray:
+        """The greedy coverage team plus random teams leaning towards strong species, shape (C, size)"""
+        n = len(rates)
+        greedy: List[int] = []
+        best = np.zeros(rates.shape[1])
+        for _ in range(size):
+            gain = np.maximum(best, rates).mean(axis=1)
+            gain[greedy] = -1
+            pick = int(np.argmax(gain))
+            greedy.append(pick)
+            best = np.maximum(best, rates[pick])
+        
+        teams: Set[tuple] = {tuple(sorted(greedy))}
+        # Half weighted by individual strength, half uniform so weak-looking specialists still get tried
+        strength = rates.mean(axis=1) ** 2 + 1e-12
+        weights = 0.5 * strength / strength.sum() + 0.5 / n
+        for _ in range(count * 10):
+            if len(teams) >= min(count, math.comb(n, size)):
+                break
+            teams.add(tuple(sorted(rng.choice(n, size, replace=False, p=weights).tolist())))
+        return np.array(sorted(teams), dtype=np.int64)
+    
+    def optimize(
+        self,
+        opponents: Sequence[str],
+        size: int = 3,
+        candidates: int = 256,
+        battles: int = 16,
+        eta: int = 2,
+        top: int = 5,
+        seed: int = 0,
+        progress: Optional[Progress] = None
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        opponent_ids = self.species(opponents)
+        size = min(size, len(self.roster))
+        report = progress or (lambda stage, fraction: None)
+        
+        rates = self.analytic_rates(opponent_ids)
+        teams = self.candidate_teams(rates, size, candidates, np.random.default_rng(seed))
+        analytic = team_scores(rates, teams)
+        evaluations = len(teams)
+        order = np.argsort(-analytic, kind="stable")
+        teams = teams[order[:max(top, math.ceil(len(teams) / eta))]]
+        
+        rounds = 1 + max(0, math.ceil(math.log(len(teams) / top, eta))) if len(teams) > top else 1
+        report("analytic", 1 / (rounds + 1))
+        
+        wins = np.zeros(rates.shape, dtype=np.int64)
+        played = np.zeros(rates.shape, dtype=np.int64)
+        simulated = 0
+        if self.pool is None:
+            simulation._init_worker(self.roster_path)
+        for round_index in range(rounds):
+            simulated += self._top_up(np.unique(teams), opponent_ids, battles, wins, played, seed, round_index, self.pool)
+            scores = team_scores(wins / np.maximum(played, 1), teams)
+            evaluations += len(teams)
+            order = np.argsort(-scores, kind="stable")
+            teams, scores = teams[order], scores[order]
+            report(f"round {round_index + 1}/{rounds}: {len(teams)} teams, {battles} battles per matchup", (round_index + 2) / (rounds + 1))
+            if len(teams) <= top:
+                break
+            keep = max(top, math.ceil(len(teams) / eta))
+            teams, scores = teams[:keep], scores[:keep]
+            battles *= eta
+        
+        teams, scores = teams[:top], scores[:top]
+        elapsed = time.perf_counter() - started
+        names = self.roster.names
+        return {
+            "opponents": list(opponents),
+            "team_size": size,
+            "teams": [
+                {
+                    "members": [str(names[i]) for i in team],
+                    "score": round(float(score), 4),
+                    "analytic_score": round(float(estimate), 4),
+                }
+                for team, score, estimate in zip(teams.tolist(), scores, team_scores(rates, teams))
+            ],
+            "candidates": len(analytic),
+            "rounds": rounds,
+            "battles": int(simulated),
+            "team_evaluations": int(evaluations),
+            "seconds": round(elapsed, 3),
+            "battles_per_second": round(simulated / elapsed),
+            "evaluations_per_second": round(evaluations / elapsed),
+        }
+    
+    def _top_up(
+        self,
+        species: np.ndarray,
+        opponents: np.ndarray,
+        battles: int,
+        wins: np.ndarray,
+        played: np.ndarray,
+        seed: int,
+        round_index: int,
+        pool: Optional[Executor]
+    ) -> int:
+        """Simulate until every (species, opponent) pair has ``battles`` battles, returning battles run"""
+        rows, columns = np.meshgrid(species, np.arange(len(opponents)), indexing="ij")
+        rows, columns = rows.ravel(), columns.ravel()
+        deficit = battles - played[rows, columns]
+        needed = deficit > 0
+        rows, columns, deficit = rows[needed], columns[needed], deficit[needed]
+        if not len(rows):
+            return 0
+        
+        # Shard layout and seeds depend only on the inputs, not on the number of workers
+        per_shard = max(1, SHARD_BATTLES // int(deficit.max()))
+        shards = [slice(start, start + per_shard) for start in range(0, len(rows), per_shard)]
+        seeds = [np.random.SeedSequence(seed, spawn_key=(round_index, i)) for i in range(len(shards))]
+        args = [(rows[s], opponents[columns[s]], deficit[s], shard_seed, self.max_turns) for s, shard_seed in zip(shards, seeds)]
+        if pool is None:
+            results = [_run_pairs(*a) for a in args]
+        else:
+            results = list(pool.map(_run_pairs, *zip(*args)))
+        for s, shard_wins in zip(shards, results):
+            np.add.at(wins, (rows[s], columns[s]), shard_wins)
+            np.add.at(played, (rows[s], columns[s]), deficit[s])
+        return int(deficit.sum())
+
+
+class JobsBusyError(Exception):
+    """Raised when a job is submitted while another is still queued or running"""
+
+
+class JobStopped(Exception):
+    """Raised from a job's progress callback to stop its search between rounds"""
+
+
+class TeamJobs:
+    """Optimizations as background jobs, run one at a time and polled by id
+    
+    The search runs in a thread (its simulations on the optimizer's process pool) so the
+    event loop keeps serving battles. A new job is refused while one is queued or running.
+    Threads can't be interrupted, so a job is stopped, when cancelled, evicted or past
+    ``timeout`` seconds, at the next round boundary. Only the most recent ``max_jobs``
+    jobs are kept.
+    """
+    
+    def __init__(self, optimizer: TeamOptimizer, max_jobs: int = 100, timeout: float = 300.0):
+        self.optimizer = optimizer
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stopping: Set[str] = set()
+    
+    def submit(self, opponents: Sequence[str], **options) -> Dict[str, Any]:
+        """Queue an optimization, raising ValueError for species not in the roster and
+        JobsBusyError while another job is unfinished"""
+        self.optimizer.species(opponents)
+        if self._tasks:
+            raise JobsBusyError("A team search is already queued or running")
+        job = {"job_id": str(uuid.uuid4()), "status": "queued", "stage": "queued", "progress": 0.0, "result": None, "error": None}
+        job_id = job["job_id"]
+        self.jobs[job_id] = job
+        while len(self.jobs) > self.max_jobs:
+            evicted, _ = self.jobs.popitem(last=False)
+            self.stop(evicted)
+        task = asyncio.create_task(self._run(job, list(opponents), options))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return job
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+    
+    def stop(self, job_id: str):
+        """Stop a job at its next round boundary; its status becomes cancelled"""
+        if job_id in self._tasks:
+            self._stopping.add(job_id)
+    
+    async def _run(self, job: Dict[str, Any], opponents: List[str], options: Dict[str, Any]):
+        job_id = job["job_id"]
+        deadline = time.monotonic() + self.timeout
+        
+        def progress(stage: str, fraction: float):
+            if job_id in self._stopping:
+                raise JobStopped("cancelled")
+            if time.monotonic() > deadline:
+                raise JobStopped(f"timed out after {self.timeout:g} s")
+            job["stage"] = stage
+            job["progress"] = round(fraction, 3)
+        
+        try:
+            async with self._lock:
+                job["status"] = "running"
+                progress("starting", 0.0)
+                job["result"] = await asyncio.to_thread(self.optimizer.optimize, opponents, progress=progress, **options)
+                job["status"] = "done"
+        except asyncio.CancelledError:
+            # The thread carries on until its next progress call, which sees the job in _stopping
+            job["status"] = "cancelled"
+            raise
+        except JobStopped as e:
+            job["status"] = "cancelled"
+            job["error"] = str(e)
+        except Exception as e:
+            logger.exception("Team optimization %s failed", job_id)
+            job["status"] = "failed"
+            job["error"] = str(e)
+        self._stopping.discard(job_id)
+    
+    def cancel(self):
+        """Stop every job, for shutdown"""
+        for job_id, task in list(self._tasks.items()):
+            self.stop(job_id)
+            task.cancel()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Suggest a team against an opponent pool")
+    parser.add_argument("roster", nargs="?", default=DEFAULT_ROSTER, help="Roster .npz file")
+    parser.add_argument("--opponents", required=True, help="Comma-separated opponent species")
+    parser.add_argument("--size", type=int, default=3, help="Team size")
+    parser.add_argument("--candidates", type=int, default=256, help="Teams scored analytically")
+    parser.add_argument("--battles", type=int, default=16, help="Battles per matchup in the first simulated round")
+    parser.add_argument("--eta", type=int, default=2, help="Keep 1/eta of the teams each round")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    optimizer = TeamOptimizer(args.roster, workers=args.workers)
+    try:
+        result = optimizer.optimize(
+            args.opponents.split(","),
+            size=args.size,
+            candidates=args.candidates,
+            battles=args.battles,
+            eta=args.eta,
+            top=args.top,
+            seed=args.seed,
+            progress=lambda stage, fraction: logger.info("%3d%% %s", fraction * 100, stage)
+        )
+    finally:
+        optimizer.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
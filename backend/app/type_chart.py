@@ -1,11 +1,92 @@
-from typing import Dict, Set, Tuple
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
 from app.pokeapi_client import PokeApiClient
 
 
+logger = logging.getLogger(__name__)
+
+TYPE_NAMES: Tuple[str, ...] = (
+    "normal", "fire", "water", "electric", "grass", "ice", "fighting", "poison", "ground",
+    "flying", "psychic", "bug", "rock", "ghost", "dragon", "dark", "steel", "fairy",
+)
+
+# Padding id for mono-type defenders and unknown types; always neutral
+NO_TYPE = len(TYPE_NAMES)
+
+# Generation VI+ chart, used until (or instead of) fetching from PokeAPI
+BUNDLED_DAMAGE_RELATIONS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "normal": {"double_damage_to": (), "half_damage_to": ("rock", "steel"), "no_damage_to": ("ghost",)},
+    "fire": {"double_damage_to": ("grass", "ice", "bug", "steel"), "half_damage_to": ("fire", "water", "rock", "dragon"), "no_damage_to": ()},
+    "water": {"double_damage_to": ("fire", "ground", "rock"), "half_damage_to": ("water", "grass", "dragon"), "no_damage_to": ()},
+    "electric": {"double_damage_to": ("water", "flying"), "half_damage_to": ("electric", "grass", "dragon"), "no_damage_to": ("ground",)},
+    "grass": {"double_damage_to": ("water", "ground", "rock"), "half_damage_to": ("fire", "grass", "poison", "flying", "bug", "dragon", "steel"), "no_damage_to": ()},
+    "ice": {"double_damage_to": ("grass", "ground", "flying", "dragon"), "half_damage_to": ("fire", "water", "ice", "steel"), "no_damage_to": ()},
+    "fighting": {"double_damage_to": ("normal", "ice", "rock", "dark", "steel"), "half_damage_to": ("poison", "flying", "psychic", "bug", "fairy"), "no_damage_to": ("ghost",)},
+    "poison": {"double_damage_to": ("grass", "fairy"), "half_damage_to": ("poison", "ground", "rock", "ghost"), "no_damage_to": ("steel",)},
+    "ground": {"double_damage_to": ("fire", "electric", "poison", "rock", "steel"), "half_damage_to": ("grass", "bug"), "no_damage_to": ("flying",)},
+    "flying": {"double_damage_to": ("grass", "fighting", "bug"), "half_damage_to": ("electric", "rock", "steel"), "no_damage_to": ()},
+    "psychic": {"double_damage_to": ("fighting", "poison"), "half_damage_to": ("psychic", "steel"), "no_damage_to": ("dark",)},
+    "bug": {"double_damage_to": ("grass", "psychic", "dark"), "half_damage_to": ("fire", "fighting", "poison", "flying", "ghost", "steel", "fairy"), "no_damage_to": ()},
+    "rock": {"double_damage_to": ("fire", "ice", "flying", "bug"), "half_damage_to": ("fighting", "ground", "steel"), "no_damage_to": ()},
+    "ghost": {"double_damage_to": ("psychic", "ghost"), "half_damage_to": ("dark",), "no_damage_to": ("normal",)},
+    "dragon": {"double_damage_to": ("dragon",), "half_damage_to": ("steel",), "no_damage_to": ("fairy",)},
+    "dark": {"double_damage_to": ("psychic", "ghost"), "half_damage_to": ("fighting", "dark", "fairy"), "no_damage_to": ()},
+    "steel": {"double_damage_to": ("ice", "rock", "fairy"), "half_damage_to": ("fire", "water", "electric", "steel"), "no_damage_to": ()},
+    "fairy": {"double_damage_to": ("fighting", "dragon", "dark"), "half_damage_to": ("fire", "poison", "steel"), "no_damage_to": ()},
+}
+
+
+def matrix_fingerprint(matrix: np.ndarray) -> str:
+    """Short digest identifying a single-type matrix"""
+    return hashlib.blake2b(np.ascontiguousarray(matrix, dtype=np.float64).tobytes(), digest_size=8).hexdigest()
+
+
 class TypeChartCache:
     def __init__(self, client: PokeApiClient):
         self.client = client
         self.cache: Dict[str, Dict[str, Set[str]]] = {}
+        self.type_index: Dict[str, int] = {name: i for i, name in enumerate(TYPE_NAMES)}
+        
+        # matrix[attacking type, defending type]; the extra NO_TYPE row/column is neutral
+        self.matrix = np.ones((NO_TYPE + 1, NO_TYPE + 1), dtype=np.float64)
+        for type_name, relations in BUNDLED_DAMAGE_RELATIONS.items():
+            self._set_relations(type_name, relations)
+        self._rebuild()
+    
+    def _set_relations(self, type_name: str, relations: Dict[str, Iterable[str]]):
+        row = self.type_index.get(type_name)
+        if row is None:
+            return
+        self.matrix[row, :] = 1.0
+        for multiplier, key in ((2.0, "double_damage_to"), (0.5, "half_damage_to"), (0.0, "no_damage_to")):
+            for defender_type in relations.get(key, ()):
+                column = self.type_index.get(defender_type)
+                if column is not None:
+                    self.matrix[row, column] = multiplier
+    
+    def _rebuild(self):
+        """Precompute the dual-type table and its plain-list mirror for scalar lookups"""
+        # dual[move, first, second] = matrix[move, first] * matrix[move, second]
+        self.dual = self.matrix[:, :, None] * self.matrix[:, None, :]
+        self.dual[:, np.arange(NO_TYPE), np.arange(NO_TYPE)] = self.matrix[:, :NO_TYPE]
+        self._dual_rows: List[List[List[float]]] = self.dual.tolist()
+        self.fingerprint = matrix_fingerprint(self.matrix)
+    
+    def intern(self, type_name: str) -> int:
+        """Map a type name to its matrix index (unknown types are neutral)"""
+        return self.type_index.get(type_name, NO_TYPE)
+    
+    def intern_types(self, defender_types: Sequence[str]) -> Tuple[int, int]:
+        """Map a defender's types to a padded (first, second) index pair"""
+        index = self.type_index
+        first = index.get(defender_types[0], NO_TYPE) if defender_types else NO_TYPE
+        second = index.get(defender_types[1], NO_TYPE) if len(defender_types) > 1 else NO_TYPE
+        return first, second
     
     async def get_type_damage_relations(self, type_name: str) -> Dict[str, Set[str]]:
         """Get damage relations for a type (2x, 0.5x, 0x)"""
@@ -22,28 +103,51 @@ class TypeChartCache:
         }
         
         self.cache[type_name] = relations
+        self._set_relations(type_name, relations)
+        self._rebuild()
         return relations
     
+    def effectiveness(self, move_type_id: int, first_type_id: int, second_type_id: int = NO_TYPE) -> float:
+        """O(1) multiplier lookup on interned type ids"""
+        return self._dual_rows[move_type_id][first_type_id][second_type_id]
+    
     def calculate_type_effectiveness(self, move_type: str, defender_types: list[str]) -> float:
         """Calculate type effectiveness multiplier (1.0, 0.5, 2.0, 4.0, 0.0)"""
-        effectiveness = 1.0
-        
-        if move_type not in self.cache:
-            return effectiveness
-        
-        move_relations = self.cache[move_type]
-        
-        for defender_type in defender_types:
-            if defender_type in move_relations["no_damage_to"]:
-                return 0.0
-            elif defender_type in move_relations["double_damage_to"]:
-                effectiveness *= 2.0
-            elif defender_type in move_relations["half_damage_to"]:
-                effectiveness *= 0.5
-        
-        return effectiveness
+        first, second = self.intern_types(defender_types)
+        return self._dual_rows[self.type_index.get(move_type, NO_TYPE)][first][second]
+    
+    def calculate_type_effectiveness_batch(self, move_type_ids: np.ndarray, defender_type_ids: np.ndarray) -> np.ndarray:
+        """Vectorized multipliers for arrays of move type ids and (..., 2) defender type ids"""
+        defender_type_ids = np.asarray(defender_type_ids)
+        return self.dual[np.asarray(move_type_ids), defender_type_ids[..., 0], defender_type_ids[..., 1]]
+    
+    def load_matrix(self, matrix: np.ndarray):
+        """Replace the single-type matrix, e.g. with one saved alongside a roster"""
+        self.matrix[:, :] = matrix
+        self._rebuild()
+    
+    def load_relations(self, relations: Dict[str, Dict[str, Iterable[str]]]):
+        """Install damage relations for many types at once, e.g. from a roster bundle"""
+        for type_name, type_relations in relations.items():
+            self.cache[type_name] = {key: set(names) for key, names in type_relations.items()}
+            self._set_relations(type_name, type_relations)
+        self._rebuild()
     
     async def load_type(self, type_name: str):
         """Pre-load a type into cache"""
         await self.get_type_damage_relations(type_name)
-
+    
+    async def load_all(self, timeout: Optional[float] = 5.0) -> int:
+        """Fetch every type concurrently; types that fail or time out keep the bundled chart"""
+        task_names = {asyncio.ensure_future(self.get_type_damage_relations(name)): name for name in TYPE_NAMES}
+        tasks = list(task_names)
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        loaded = 0
+        for task in done:
+            if task.exception() is None:
+                loaded += 1
+            else:
+                logger.warning("Type %s failed to load, keeping the bundled chart: %s", task_names[task], task.exception())
+        return loaded
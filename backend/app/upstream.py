@@ -0,0 +1,114 @@
+import random
+import time
+from typing import Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is failing"""
+    
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        # Seconds until the breaker lets a probe through
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, capped by a retry budget
+    
+    Every request earns ``budget_ratio`` retry tokens (up to ``budget_burst``) and every
+    retry spends one, so during an outage retries add at most ~``budget_ratio`` extra
+    load instead of multiplying it by ``attempts``.
+    """
+    
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 0.05,
+        max_delay: float = 1.0,
+        budget_ratio: float = 0.2,
+        budget_burst: float = 10.0,
+        rng: Optional[random.Random] = None
+    ):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.tokens = budget_burst
+        self.rng = rng or random.Random()
+        self.retries = 0
+        self.denied = 0
+    
+    def record_request(self):
+        self.tokens = min(self.budget_burst, self.tokens + self.budget_ratio)
+    
+    def try_retry(self, attempt: int) -> bool:
+        """Whether failed attempt number ``attempt`` (1-based) may be retried"""
+        if attempt >= self.attempts:
+            return False
+        if self.tokens < 1:
+            self.denied += 1
+            return False
+        self.tokens -= 1
+        self.retries += 1
+        return True
+    
+    def backoff(self, attempt: int) -> float:
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker
+    
+    After ``failure_threshold`` failures in a row the circuit opens and calls are refused
+    for ``reset_timeout`` seconds. Then a single probe is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+    
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.short_circuited = 0
+        self._probing = False
+    
+    def is_open(self) -> bool:
+        """Whether calls would currently be refused, without claiming the probe"""
+        if self.state == self.OPEN:
+            return self.clock() - self.opened_at < self.reset_timeout
+        return self.state == self.HALF_OPEN and self._probing
+    
+    def allow(self) -> bool:
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.short_circuited += 1
+        return False
+    
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+            self._probing = False
+    
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+    
+    def metrics(self) -> Dict[str, object]:
+        return {"state": self.state, "consecutive_failures": self.failures, "short_circuited": self.short_circuited}
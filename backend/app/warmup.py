@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from app.battle_engine import BattleEngine
+from app.models import Pokemon
+from app.type_chart import TYPE_NAMES, TypeChartCache
+
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 1
+# Loaded at startup when present; build it with ``python -m app.warmup build-bundle``
+DEFAULT_BUNDLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "roster_bundle.json.gz")
+
+
+def load_bundle(path: str, engine: BattleEngine, type_chart: TypeChartCache) -> Dict[str, int]:
+    """Install a pre-baked bundle: type chart, search name list and normalized Pokémon"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        bundle = json.load(f)
+    if bundle.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"{path} has bundle version {bundle.get('version')}, expected {BUNDLE_VERSION}")
+    client = engine.pokeapi_client
+    type_chart.load_relations(bundle["types"])
+    if bundle.get("listing"):
+        client.cache.put(f"pokemon?limit={client.SEARCH_LIMIT}", bundle["listing"])
+    species = engine.preload(Pokemon.model_validate(entry) for entry in bundle["pokemon"])
+    return {"types": len(bundle["types"]), "species": species, "names": len((bundle.get("listing") or {}).get("results", ()))}
+
+
+async def collect_bundle(engine: BattleEngine, type_chart: TypeChartCache, names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Fetch the type chart, name list and roster (default: the random pool) into a bundle"""
+    client = engine.pokeapi_client
+    loaded_types = await type_chart.load_all(timeout=None)
+    if loaded_types < len(TYPE_NAMES):
+        raise RuntimeError(f"Only {loaded_types} of {len(TYPE_NAMES)} types loaded")
+    listing = await client._fetch(f"pokemon?limit={client.SEARCH_LIMIT}")
+    names = names or client.POPULAR_POKEMON
+    await engine.warmup(names)
+    return {
+        "version": BUNDLE_VERSION,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "types": {name: {key: sorted(values) for key, values in relations.items()} for name, relations in type_chart.cache.items()},
+        "listing": listing,
+        "pokemon": [engine.pokemon_cache[name].model_dump() for name in names if name in engine.pokemon_cache],
+    }
+
+
+def write_bundle(bundle: Dict[str, Any], out: str):
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = f"{out}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(bundle, f, separators=(",", ":"))
+    os.replace(tmp, out)
+
+
+async def build_bundle(
+    out: str,
+    names: Optional[List[str]] = None,
+    snapshot: Optional[str] = None,
+    offline: bool = False,
+    move_index: Optional[str] = None
+) -> Dict[str, int]:
+    from app.damage_service import DamageService
+    from app.move_index import load_index
+    from app.pokeapi_client import PokeApiClient
+    from app.snapshot_store import SnapshotStore
+    
+    client = PokeApiClient(snapshot=SnapshotStore(snapshot) if snapshot else None, offline=offline)
+    type_chart = TypeChartCache(client)
+    try:
+        # Same moveset policy as the workers that will load the bundle
+        engine = BattleEngine(client, DamageService(type_chart), move_index=load_index(move_index))
+        bundle = await collect_bundle(engine, type_chart, names)
+    finally:
+        await client.close()
+    write_bundle(bundle, out)
+    return {"types": len(bundle["types"]), "species": len(bundle["pokemon"]), "names": len(bundle["listing"].get("results", ()))}
+
+
+class Warmup:
+    """Startup warmup with progress for the readiness endpoint
+    
+    A bundle, if given, is loaded first by ``load_bundle`` (milliseconds). Whatever it
+    doesn't cover (type chart, the random pool with its moves, the search name list) is
+    then fetched concurrently by ``run`` until ``deadline`` seconds have passed. The
+    worker reports ``ready`` once everything loaded, or ``degraded`` when the deadline or
+    errors cut warmup short.
+    """
+    
+    def __init__(
+        self,
+        engine: BattleEngine,
+        type_chart: TypeChartCache,
+        bundle_path: Optional[str] = None,
+        deadline: float = 10.0,
+        names: Optional[List[str]] = None
+    ):
+        self.engine = engine
+        self.type_chart = type_chart
+        self.bundle_path = bundle_path
+        self.deadline = deadline
+        self.names = names if names is not None else list(engine.pokeapi_client.POPULAR_POKEMON)
+        self.status = "pending"
+        self.bundle: Optional[Dict[str, int]] = None
+        self.bundle_error: Optional[str] = None
+        self.types_loaded = 0
+        self.species_loaded = 0
+        self.search_loaded = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+    
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "degraded")
+    
+    def load_bundle(self):
+        """Install the bundle, if there is one; call before ``run``"""
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        if not self.bundle_path or not os.path.exists(self.bundle_path):
+            return
+        try:
+            self.bundle = load_bundle(self.bundle_path, self.engine, self.type_chart)
+        except (OSError, ValueError, KeyError) as e:
+            self.bundle_error = str(e)
+            logger.warning("Roster bundle %s not loaded: %s", self.bundle_path, e)
+    
+    async def run(self):
+        """Fetch whatever the bundle didn't cover, within the deadline"""
+        self.status = "warming"
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        client = self.engine.pokeapi_client
+        
+        if self.bundle is not None:
+            self.types_loaded = len(TYPE_NAMES)
+        missing = [name for name in self.names if name not in self.engine.pokemon_cache]
+        self.species_loaded = len(self.names) - len(missing)
+        
+        async def load_types():
+            self.types_loaded = await self.type_chart.load_all(timeout=None)
+        
+        async def load_search():
+            await client.get_search_index()
+            self.search_loaded = True
+        
+        def loaded(_):
+            self.species_loaded += 1
+        
+        steps = []
+        if self.types_loaded < len(TYPE_NAMES):
+            steps.append(load_types())
+        if missing:
+            steps.append(self.engine.warmup(missing, on_loaded=loaded))
+        # With a bundle the name list is already cached, so this only builds the index
+        steps.append(load_search())
+        tasks = [asyncio.ensure_future(step) for step in steps]
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        failed = [task for task in done if task.exception() is not None]
+        for task in failed:
+            logger.warning("Warmup step failed: %s", task.exception())
+        
+        complete = (
+            not pending and not failed and self.types_loaded == len(TYPE_NAMES)
+            and self.species_loaded == len(self.names) and self.search_loaded
+        )
+        self.status = "ready" if complete else "degraded"
+        self.finished_at = time.monotonic()
+        logger.info("Warmup %s in %.0f ms: %s", self.status, (self.finished_at - self.started_at) * 1000, self.progress())
+    
+    def progress(self) -> Dict[str, Any]:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "elapsed_ms": round((end - self.started_at) * 1000) if self.started_at is not None else 0,
+            "bundle": self.bundle,
+            "bundle_error": self.bundle_error,
+            "types": {"loaded": self.types_loaded, "total": len(TYPE_NAMES)},
+            "roster": {"loaded": self.species_loaded, "total": len(self.names)},
+            "search_index": self.search_loaded,
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Pre-baked roster bundles for fast worker startup")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build-bundle", help="Fetch the type chart, name list and roster into a bundle file")
+    build.add_argument("out", nargs="?", default=DEFAULT_BUNDLE)
+    build.add_argument("--names", help="Comma-separated species (default: the random pool)")
+    build.add_argument("--snapshot", help="Serve PokeAPI data from this snapshot file")
+    build.add_argument("--offline", action="store_true")
+    build.add_argument("--move-index", help="Move index for movesets (default: the bundled index, if built)")
+    args = parser.parse_args(argv)
+    
+    names = args.names.split(",") if args.names else None
+    counts = asyncio.run(build_bundle(args.out, names, args.snapshot, args.offline, args.move_index))
+    print(json.dumps(dict(counts, path=args.out)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Measure per-turn opponent AI latency and reached search depth by difficulty
+
+Run from the backend directory:
+    python -m benchmarks.bench_ai --positions 500 --node-budget 200
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+from app.battle_ai import BattleAI, DIFFICULTIES
+from app.battle_engine import BattleEngine
+from app.battle_state import BattleSession
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+
+
+async def load_species(count: int):
+    fake = FakePokeApi(species=count)
+    client = PokeApiClient(transport=fake.transport())
+    engine = BattleEngine(client, DamageService(TypeChartCache(client)))
+    pokemon = await asyncio.gather(*(engine._normalize_pokemon(data) for data in fake.pokemon.values()))
+    await client.close()
+    return engine.damage_service, pokemon
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--species", type=int, default=50)
+    parser.add_argument("--positions", type=int, default=500, help="Random mid-battle positions per difficulty")
+    parser.add_argument("--node-budget", type=int, default=200, help="Positions the hard search may expand")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    damage_service, pokemon = asyncio.run(load_species(args.species))
+    for difficulty in DIFFICULTIES:
+        # Fresh AI per difficulty so damage table builds are counted, as for new matchups
+        ai = BattleAI(damage_service, node_budget=args.node_budget)
+        rng = random.Random(args.seed)
+        latencies = []
+        depths: Counter = Counter()
+        for _ in range(args.positions):
+            player, opponent = rng.sample(pokemon, 2)
+            session = BattleSession(player, opponent, difficulty)
+            session.player.hp = rng.randint(1, player.stats.hp)
+            session.opponent.hp = rng.randint(1, opponent.stats.hp)
+            started = time.perf_counter()
+            ai.choose_move(session)
+            latencies.append(time.perf_counter() - started)
+            depths[ai.last_depth] += 1
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1e3
+        p99 = latencies[int(len(latencies) * 0.99)] * 1e3
+        line = f"{difficulty:<7} p50 {p50:6.3f} ms  p99 {p99:6.3f} ms  max {latencies[-1] * 1e3:6.3f} ms"
+        if difficulty == "hard":
+            line += "  depth " + " ".join(f"{depth}:{count}" for depth, count in sorted(depths.items()))
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
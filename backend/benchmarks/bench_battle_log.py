@@ -0,0 +1,81 @@
+"""Measure battle log write and streaming replay throughput, size and memory
+
+Run from the backend directory:
+    python -m benchmarks.bench_battle_log --battles 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import tempfile
+import time
+
+from app.battle_log import BattleLogWriter, iter_battles, replay
+from app.battle_state import BattleSession, FAINT, HIT, MISS, OPPONENT, PLAYER, SIDE_NAMES
+from benchmarks.bench_ai import load_species
+
+
+def play(session: BattleSession, damage_service, rng: random.Random):
+    """Random-move battle with the engine's rules, without the async plumbing
+    
+    The player's picks come from ``rng``; the easy opponent's picks, rolls and accuracy
+    come from the session stream in engine order, so seeded replays check out.
+    """
+    side = PLAYER
+    while not session.winner:
+        attacker, defender = session.side(side), session.side(1 - side)
+        slot = (rng if side == PLAYER else session.rng).randrange(len(attacker.pokemon.moves))
+        move = attacker.pokemon.moves[slot]
+        roll = session.rng.randrange(len(damage_service.ROLLS))
+        damage = damage_service.roll_damage(attacker.pokemon, defender.pokemon, move, roll)
+        if damage_service.check_accuracy(move, session.rng):
+            defender.hp = max(0, defender.hp - damage)
+            session.record(HIT, side, slot, damage, roll)
+        else:
+            session.record(MISS, side, slot)
+        if defender.hp <= 0:
+            session.winner = SIDE_NAMES[side]
+            session.record(FAINT, 1 - side)
+        side = OPPONENT if side == PLAYER else PLAYER
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--battles", type=int, default=200000)
+    parser.add_argument("--species", type=int, default=100)
+    args = parser.parse_args()
+    
+    damage_service, pokemon = asyncio.run(load_species(args.species))
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "battles.pkb")
+        log = BattleLogWriter(path)
+        started = time.perf_counter()
+        events = 0
+        for i in range(args.battles):
+            session = BattleSession(*rng.sample(pokemon, 2), "easy", seed=i)
+            play(session, damage_service, rng)
+            events += len(session.events)
+            log.append(str(i), session)
+        log.close()
+        write_seconds = time.perf_counter() - started
+        size = os.path.getsize(path)
+        rss_before = max_rss_mb()
+        
+        started = time.perf_counter()
+        mismatched = sum(1 for record in iter_battles([path]) if replay(record, damage_service)[1])
+        replay_seconds = time.perf_counter() - started
+    
+    print(f"battles {args.battles:,}  events {events:,}  file {size / 1e6:.1f} MB ({size / args.battles:.0f} B/battle)")
+    print(f"simulate+write  {args.battles / write_seconds:>9,.0f} battles/s")
+    print(f"stream+replay   {args.battles / replay_seconds:>9,.0f} battles/s  mismatched {mismatched}")
+    print(f"max RSS {rss_before:.0f} MB before replay, {max_rss_mb():.0f} MB after")
+
+
+if __name__ == "__main__":
+    main()
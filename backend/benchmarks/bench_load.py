@@ -0,0 +1,161 @@
+"""Load-test the HTTP API in-process: thousands of concurrent battles against a fake PokeAPI
+
+Run from the backend directory:
+    python -m benchmarks.bench_load --battles 2000 --concurrency 500 --json load.json
+    python -m benchmarks.bench_load --compare load.json --threshold 0.2
+
+Requests go through the full FastAPI stack over httpx's ASGI transport (no sockets), so
+numbers cover routing, validation and serialization as well as the engine. Each virtual
+client starts a session and plays random moves until the battle ends, asking only for
+new log lines as the frontend does. Without --warm the first battle for each species
+pays for its cold load, as after a deploy without a roster bundle.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+import app.main as main_module
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+from benchmarks.common import compare_results, peak_rss_bytes, percentile, rss_bytes, write_results
+
+
+async def run(battles: int, concurrency: int, delay: float, species: int, seed: int, warm: bool = False) -> Dict:
+    fake = FakePokeApi(species=species, delay=delay)
+    client = PokeApiClient(transport=fake.transport())
+    type_chart = TypeChartCache(client)
+    await type_chart.load_all()
+    engine = BattleEngine(client, DamageService(type_chart))
+    main_module.app.state.battle_engine = engine
+    names = list(fake.pokemon)
+    if warm:
+        await engine.warmup(names)
+    rng = random.Random(seed)
+    limit = asyncio.Semaphore(concurrency)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    turns = []
+    
+    async def timed_post(http: httpx.AsyncClient, endpoint: str, url: str, body: Dict):
+        started = time.perf_counter()
+        response = await http.post(url, json=body)
+        latencies[endpoint].append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors[endpoint] += 1
+            return None
+        return response.json()
+    
+    async def battle(http: httpx.AsyncClient, i: int):
+        async with limit:
+            session = await timed_post(http, "start_session", "/api/session", {
+                "player_pokemon": names[i % len(names)], "opponent": "random", "seed": seed + i
+            })
+            if session is None:
+                return
+            move_ids = [move["id"] for move in session["player"]["moves"]]
+            url = f"/api/session/{session['session_id']}/action"
+            seen = len(session["log"])
+            for turn in range(1, 201):
+                result = await timed_post(http, "action", url, {"move_id": rng.choice(move_ids), "since": seen})
+                if result is None:
+                    return
+                seen = result["log_offset"] + len(result["state"]["log"])
+                if result["state"]["winner"]:
+                    turns.append(turn)
+                    return
+    
+    rss_before = rss_bytes()
+    transport = httpx.ASGITransport(app=main_module.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            started = time.perf_counter()
+            await asyncio.gather(*(battle(http, i) for i in range(battles)))
+            elapsed = time.perf_counter() - started
+    finally:
+        del main_module.app.state.battle_engine
+        await client.close()
+    
+    requests = sum(len(samples) for samples in latencies.values())
+    results = {
+        endpoint: {
+            "requests": len(samples),
+            "errors": errors[endpoint],
+            "rps": len(samples) / elapsed,
+            "p50": percentile(samples, 50),
+            "p99": percentile(samples, 99),
+            "mean": statistics.mean(samples),
+        }
+        for endpoint, samples in latencies.items()
+    }
+    results["total"] = {
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "rps": requests / elapsed,
+        "battles_per_second": len(turns) / elapsed,
+        "completed_battles": len(turns),
+        "mean_turns": statistics.mean(turns) if turns else 0.0,
+        "seconds": elapsed,
+        "rss_before_bytes": rss_before,
+        "rss_after_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "upstream_calls": fake.total_calls,
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--battles", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500, help="Battles in flight at once")
+    parser.add_argument("--delay", type=float, default=0.0, help="Injected upstream latency in seconds")
+    parser.add_argument("--species", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm", action="store_true", help="Preload every species first to measure steady state only")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results file to check for p99 regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p99 slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+    # Per-request client logging would dominate the profile
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    results = asyncio.run(run(args.battles, args.concurrency, args.delay, args.species, args.seed, args.warm))
+    total = results["total"]
+    print(f"battles={args.battles} concurrency={args.concurrency} delay={args.delay * 1000:.0f}ms warm={args.warm}")
+    print(
+        f"  {total['rps']:.0f} requests/s, {total['battles_per_second']:.1f} battles/s over {total['seconds']:.1f} s,"
+        f" {total['errors']} errors, {total['mean_turns']:.1f} turns per battle"
+    )
+    for endpoint in ("start_session", "action"):
+        if endpoint in results:
+            r = results[endpoint]
+            print(f"  {endpoint:<14} p50 {r['p50'] * 1000:7.2f} ms  p99 {r['p99'] * 1000:7.2f} ms  ({r['requests']} requests)")
+    print(
+        f"  RSS {total['rss_before_bytes'] / 2**20:.0f} -> {total['rss_after_bytes'] / 2**20:.0f} MiB"
+        f" (peak {total['peak_rss_bytes'] / 2**20:.0f} MiB), upstream calls {total['upstream_calls']}"
+    )
+    if args.json:
+        write_results(args.json, "load", results, vars(args))
+    if args.compare:
+        print(f"against {args.compare}:")
+        regressions = compare_results(
+            args.compare, {k: v for k, v in results.items() if k != "total"}, "p99", args.threshold
+        )
+        regressions += compare_results(args.compare, {"total": total}, "rps", args.threshold, higher_is_better=True)
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
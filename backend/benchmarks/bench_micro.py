@@ -0,0 +1,127 @@
+"""Micro-benchmarks for the per-turn hot paths, with JSON results and regression checks
+
+Run from the backend directory:
+    python -m benchmarks.bench_micro --json micro.json
+    python -m benchmarks.bench_micro --compare micro.json --threshold 0.2
+
+Each benchmark is calibrated to a loop count and timed over several rounds, as
+pytest-benchmark does; --compare exits non-zero when a timing (by default the min,
+the least noisy statistic) regresses past --threshold.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Callable, Dict
+
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.move_index import MoveIndex, build_move
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+from benchmarks.common import compare_results, measure, measure_loops, write_results
+
+
+def run_sync(coro):
+    """Drive a coroutine that never suspends (calculate_damage) without event loop overhead"""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def benchmarks(species: int, min_time: float, rounds: int) -> Dict[str, Dict[str, float]]:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    fake = FakePokeApi(species=species)
+    client = PokeApiClient(transport=fake.transport())
+    type_chart = TypeChartCache(client)
+    engine = BattleEngine(client, DamageService(type_chart))
+    loop.run_until_complete(type_chart.load_all())
+    payloads = list(fake.pokemon.values())
+    # Warm the move cache so _normalize_pokemon measures normalization, not upstream fetches
+    pokemon = loop.run_until_complete(asyncio.gather(*(engine._normalize_pokemon(data) for data in payloads)))
+    damage_service = engine.damage_service
+    index = MoveIndex(
+        {name: build_move(data) for name, data in fake.moves.items()},
+        {name: tuple(entry["move"]["name"] for entry in data["moves"]) for name, data in fake.pokemon.items()}
+    )
+    indexed = BattleEngine(client, damage_service, move_index=index)
+    
+    rng = random.Random(0)
+    pairs = [(rng.choice(pokemon), rng.choice(pokemon)) for _ in range(256)]
+    triples = [(a, d, rng.choice(a.moves)) for a, d in pairs]
+    dual = [(move.type, defender.types) for _, defender, move in triples]
+    counter = iter(range(1 << 62))
+    
+    def pick(items):
+        return items[next(counter) % len(items)]
+    
+    def type_effectiveness():
+        move_type, defender_types = pick(dual)
+        type_chart.calculate_type_effectiveness(move_type, defender_types)
+    
+    def damage_random():
+        attacker, defender, move = pick(triples)
+        run_sync(damage_service.calculate_damage(attacker, defender, move))
+    
+    def damage_fixed():
+        attacker, defender, move = pick(triples)
+        run_sync(damage_service.calculate_damage(attacker, defender, move, use_random=False))
+    
+    def normalize_loops(engine: BattleEngine) -> Callable[[int], float]:
+        def run(loops: int) -> float:
+            async def batch():
+                started = time.perf_counter()
+                for i in range(loops):
+                    await engine._normalize_pokemon(payloads[i % len(payloads)])
+                return time.perf_counter() - started
+            return loop.run_until_complete(batch())
+        return run
+    
+    try:
+        return {
+            "calculate_type_effectiveness": measure(type_effectiveness, min_time, rounds),
+            "calculate_damage": measure(damage_random, min_time, rounds),
+            "calculate_damage_fixed_roll": measure(damage_fixed, min_time, rounds),
+            "normalize_pokemon_cached_moves": measure_loops(normalize_loops(engine), min_time, rounds),
+            "normalize_pokemon_move_index": measure_loops(normalize_loops(indexed), min_time, rounds),
+        }
+    finally:
+        loop.run_until_complete(client.close())
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--species", type=int, default=200)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Target seconds per benchmark")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--metric", choices=["min", "median", "mean"], default="min", help="Statistic compared against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+    
+    results = benchmarks(args.species, args.min_time, args.rounds)
+    for name, result in results.items():
+        print(
+            f"{name:<32} median {result['median'] * 1e6:9.2f} us  min {result['min'] * 1e6:9.2f} us"
+            f"  stddev {result['stddev'] * 1e6:7.2f} us  {result['ops']:>12,.0f} ops/s"
+        )
+    if args.json:
+        write_results(args.json, "micro", results, {"species": args.species, "rounds": args.rounds})
+    if args.compare:
+        print(f"against {args.compare}:")
+        regressions = compare_results(args.compare, results, args.metric, args.threshold)
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
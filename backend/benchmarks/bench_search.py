@@ -0,0 +1,80 @@
+"""Measure search queries per second and p99 latency against a linear scan
+
+Run from the backend directory:
+    python -m benchmarks.bench_search --names 1300 --queries 20000
+"""
+import argparse
+import random
+import time
+
+from app.search_index import SearchIndex
+
+
+SYLLABLES = ["pi", "ka", "chu", "char", "man", "der", "bul", "ba", "saur", "squir", "tle", "gar", "chomp", "lu", "cario", "dra", "go", "nite", "gen", "gar", "ty", "ra", "ni", "tar", "mew", "two", "ray", "qua", "za", "me", "ta", "gross"]
+
+
+def make_names(count: int, rng: random.Random):
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(names, key=lambda _: rng.random())
+
+
+def make_queries(names, count: int, rng: random.Random):
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.6:
+            queries.append(("prefix", name[:rng.randint(1, len(name))]))
+        elif kind < 0.85:
+            start = rng.randint(0, len(name) - 2)
+            queries.append(("substring", name[start:start + rng.randint(2, 5)]))
+        else:
+            i = rng.randint(0, len(name) - 2)
+            queries.append(("typo", name[:i] + name[i + 1] + name[i] + name[i + 2:]))
+    return queries
+
+
+def linear_search(names, query: str, limit: int):
+    """The previous implementation: substring scan over every name"""
+    return [p for p in names if query.lower() in p.lower()][:limit]
+
+
+def measure(label: str, search, queries):
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"    {label:<8} {len(queries) / elapsed:>10,.0f} qps  p50 {p50:7.1f} us  p99 {p99:7.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=1300)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    names = make_names(args.names, rng)
+    queries = make_queries(names, args.queries, rng)
+    
+    started = time.perf_counter()
+    index = SearchIndex((name, i + 1) for i, name in enumerate(names))
+    print(f"names={len(names)} queries={len(queries)} index build {(time.perf_counter() - started) * 1000:.1f} ms")
+    for kind in ("all", "prefix", "substring", "typo"):
+        subset = [query for query_kind, query in queries if kind in ("all", query_kind)]
+        print(f"{kind} ({len(subset)} queries)")
+        measure("linear", lambda q: linear_search(names, q, args.limit), subset)
+        measure("index", lambda q: index.search(q, args.limit), subset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Response throughput of the session endpoints: requests/s and response bytes/s
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialize --json serialize.json
+    python -m benchmarks.bench_serialize --compare serialize.json --threshold 0.2
+
+Requests are sent one at a time over httpx's ASGI transport with every species warm,
+so the numbers are dominated by request validation, response building and JSON
+encoding rather than the engine or upstream fetches. Actions ask for new log lines
+only, as the frontend does.
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+import app.main as main_module
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+from benchmarks.common import compare_results, write_results
+
+
+def summarize(timings: List[float], sizes: List[int], requests: int) -> Dict[str, float]:
+    median = statistics.median(timings)
+    mean_bytes = statistics.mean(sizes)
+    return {
+        "min": min(timings) / requests,
+        "median": median / requests,
+        "rps": requests / median,
+        "bytes_per_response": mean_bytes,
+        "bytes_per_second": mean_bytes * requests / median,
+    }
+
+
+async def run(requests: int, rounds: int, species: int) -> Dict[str, Dict[str, float]]:
+    fake = FakePokeApi(species=species)
+    client = PokeApiClient(transport=fake.transport())
+    type_chart = TypeChartCache(client)
+    await type_chart.load_all()
+    engine = BattleEngine(client, DamageService(type_chart))
+    main_module.app.state.battle_engine = engine
+    names = list(fake.pokemon)
+    await engine.warmup(names)
+    
+    transport = httpx.ASGITransport(app=main_module.app)
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            async def start(i: int) -> httpx.Response:
+                return await http.post("/api/session", json={
+                    "player_pokemon": names[i % len(names)], "opponent": "random", "seed": i
+                })
+            
+            timings, sizes = [], []
+            for round_index in range(rounds + 1):
+                started = time.perf_counter()
+                for i in range(requests):
+                    response = await start(i)
+                    sizes.append(len(response.content))
+                # The first round warms code paths and caches
+                if round_index:
+                    timings.append(time.perf_counter() - started)
+            results["start_session"] = summarize(timings, sizes, requests)
+            
+            # Battles that end are replaced by new sessions outside the timed region
+            battles = []
+            for i in range(64):
+                session = (await start(i)).json()
+                battles.append([session["session_id"], session["player"]["moves"][0]["id"], len(session["log"])])
+            timings, sizes = [], []
+            replaced = 0
+            for round_index in range(rounds + 1):
+                elapsed = 0.0
+                for i in range(requests):
+                    battle = battles[i % len(battles)]
+                    started = time.perf_counter()
+                    response = await http.post(f"/api/session/{battle[0]}/action", json={"move_id": battle[1], "since": battle[2]})
+                    elapsed += time.perf_counter() - started
+                    body = response.json()
+                    sizes.append(len(response.content))
+                    battle[2] = body["log_offset"] + len(body["state"]["log"])
+                    if body["state"]["winner"]:
+                        session = (await start(10_000 + replaced)).json()
+                        replaced += 1
+                        battles[i % len(battles)] = [session["session_id"], session["player"]["moves"][0]["id"], len(session["log"])]
+                if round_index:
+                    timings.append(elapsed)
+            results["action"] = summarize(timings, sizes, requests)
+    finally:
+        del main_module.app.state.battle_engine
+        await client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--species", type=int, default=200)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed throughput drop, 0.2 = 20%%")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    results = asyncio.run(run(args.requests, args.rounds, args.species))
+    for endpoint, r in results.items():
+        print(
+            f"{endpoint:<14} {r['median'] * 1e6:8.1f} us/request  {r['rps']:8.0f} requests/s"
+            f"  {r['bytes_per_response']:7.0f} B/response  {r['bytes_per_second'] / 2**20:6.2f} MiB/s"
+        )
+    if args.json:
+        write_results(args.json, "serialize", results, vars(args))
+    if args.compare:
+        print(f"against {args.compare}:")
+        regressions = compare_results(args.compare, results, "bytes_per_second", args.threshold, higher_is_better=True)
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compare per-session memory and per-action serialization of the battle state representations
+
+"legacy" is the previous layout: pydantic SessionState mutated in place with a list of
+rendered log strings, the full state serialized on every action. "compact" is the
+slotted BattleSession with a packed event log, in full and turn-delta response modes.
+
+Run from the backend directory:
+    python -m benchmarks.bench_session_state --sessions 2000 --turns 20
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from app.battle_state import BattleSession, HIT, MISS, OPPONENT, PLAYER
+from app.models import ActionResponse, BattleState, Move, Pokemon, SessionState, Stats
+
+
+def make_pokemon(name: str) -> Pokemon:
+    return Pokemon(
+        name=name,
+        sprite=f"https://example.com/{name}.gif",
+        types=["normal"],
+        stats=Stats(hp=300, attack=80, defense=80, sp_attack=80, sp_defense=80, speed=80),
+        moves=[
+            Move(id=f"move-{i}", name=f"move-{i}", type="normal", power=60, class_="physical", accuracy=95)
+            for i in range(4)
+        ]
+    )
+
+
+def play(rng: random.Random, turns: int):
+    """Pre-rolled (side, slot, damage or None) sequence shared by both layouts"""
+    return [(turn % 2, rng.randrange(4), rng.randint(5, 40) if rng.random() < 0.9 else None) for turn in range(turns * 2)]
+
+
+def legacy_session(player: Pokemon, opponent: Pokemon, script) -> SessionState:
+    state = SessionState(
+        player=BattleState(hp=player.stats.hp, max_hp=player.stats.hp),
+        opponent=BattleState(hp=opponent.stats.hp, max_hp=opponent.stats.hp),
+        turn="player",
+        log=[f"Battle started! {player.name.upper()} vs {opponent.name.upper()}"]
+    )
+    for side, slot, damage in script:
+        attacker, defender = (player, state.opponent) if side == PLAYER else (opponent, state.player)
+        move = attacker.moves[slot].name.upper()
+        if damage is None:
+            state.log.append(f"{attacker.name.upper()} used {move}... But it missed!")
+        else:
+            defender.hp = max(0, defender.hp - damage)
+            state.log.append(f"{attacker.name.upper()} used {move}! It dealt {damage} damage!")
+    return state
+
+
+def compact_session(player: Pokemon, opponent: Pokemon, script) -> BattleSession:
+    session = BattleSession(player, opponent)
+    for side, slot, damage in script:
+        defender = session.side(1 - side)
+        if damage is None:
+            session.record(MISS, side, slot)
+        else:
+            defender.hp = max(0, defender.hp - damage)
+            session.record(HIT, side, slot, damage)
+    return session
+
+
+def resident_bytes(build, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return (after - before) / count
+
+
+def per_call_us(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=20, help="Turns played per session")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    
+    # Normalized Pokémon are shared through the species cache in both layouts
+    player, opponent = make_pokemon("pikachu"), make_pokemon("snorlax")
+    scripts = [play(random.Random(i), args.turns) for i in range(args.sessions)]
+    
+    legacy = resident_bytes(lambda i: legacy_session(player, opponent, scripts[i]), args.sessions)
+    compact = resident_bytes(lambda i: compact_session(player, opponent, scripts[i]), args.sessions)
+    print(f"resident bytes per session after {args.turns} turns")
+    print(f"  legacy   {legacy:>8,.0f}")
+    print(f"  compact  {compact:>8,.0f}  ({legacy / compact:.1f}x smaller)")
+    
+    state = legacy_session(player, opponent, scripts[0])
+    session = compact_session(player, opponent, scripts[0])
+    since = len(session.events) - 2
+    # What the endpoint does per action: build the response model and serialize it
+    timings = {
+        "legacy full": lambda: ActionResponse.model_validate({"state": state}).model_dump_json(),
+        "compact full": lambda: ActionResponse(state=session.to_state()).model_dump_json(),
+        "compact delta": lambda: ActionResponse(state=session.to_state(since), log_offset=since).model_dump_json(),
+    }
+    print(f"serialization per action after {args.turns} turns")
+    for label, fn in timings.items():
+        print(f"  {label:<14} {per_call_us(fn, args.repeat):>7.1f} us  {len(fn()):>6,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Measure headless battle throughput on a precomputed roster
+
+Run from the backend directory:
+    python -m benchmarks.bench_simulation --species 100 --battles 100 --workers 1
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient
+from app.simulation import Roster, run_tournament
+from app.type_chart import TypeChartCache
+
+
+async def fake_roster(species: int) -> Roster:
+    fake = FakePokeApi(species=species)
+    client = PokeApiClient(transport=fake.transport())
+    type_chart = TypeChartCache(client)
+    engine = BattleEngine(client, DamageService(type_chart))
+    pokemon = await asyncio.gather(*(engine._normalize_pokemon(data) for data in fake.pokemon.values()))
+    await client.close()
+    return Roster.from_pokemon(pokemon, type_chart)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--species", type=int, default=100)
+    parser.add_argument("--battles", type=int, default=100, help="Battles per ordered matchup")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    
+    roster = asyncio.run(fake_roster(args.species))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "roster.npz")
+        roster.save(path)
+        started = time.perf_counter()
+        run_tournament(path, args.battles, args.workers)
+        elapsed = time.perf_counter() - started
+    
+    total = len(roster) ** 2 * args.battles
+    print(f"species={len(roster)} battles={total} workers={args.workers}")
+    print(f"  {total / elapsed:,.0f} battles/s ({total / elapsed / args.workers:,.0f} per worker)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Measure start_session latency against a local fake PokeAPI with injected delay
+
+Run from the backend directory:
+    python -m benchmarks.bench_start_session --sessions 200 --concurrency 20 --delay 0.02
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.models import StartSessionRequest
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+from benchmarks.common import percentile
+
+
+async def run(sessions: int, concurrency: int, delay: float, move_concurrency: int):
+    fake = FakePokeApi(delay=delay)
+    client = PokeApiClient(transport=fake.transport())
+    engine = BattleEngine(client, DamageService(TypeChartCache(client)), move_fetch_concurrency=move_concurrency)
+    names = list(fake.pokemon)
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def one(i: int):
+        request = StartSessionRequest(player_pokemon=names[i % len(names)], opponent=names[(i * 7 + 3) % len(names)])
+        async with limit:
+            start = time.perf_counter()
+            await engine.start_session(request)
+            latencies.append(time.perf_counter() - start)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+    
+    print(f"sessions={sessions} concurrency={concurrency} delay={delay * 1000:.0f}ms move_concurrency={move_concurrency}")
+    print(f"  throughput: {sessions / elapsed:.1f} sessions/s")
+    print(f"  p50: {percentile(latencies, 50) * 1000:.1f} ms  p99: {percentile(latencies, 99) * 1000:.1f} ms  mean: {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"  upstream calls: {fake.total_calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.02, help="Injected upstream latency in seconds")
+    parser.add_argument("--move-concurrency", type=int, default=8, help="Use 1 to approximate serial move fetching")
+    args = parser.parse_args()
+    asyncio.run(run(args.sessions, args.concurrency, args.delay, args.move_concurrency))
+
+
+if __name__ == "__main__":
+    main()
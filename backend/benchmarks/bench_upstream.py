@@ -0,0 +1,98 @@
+"""Tail latency and error rate of PokeAPI fetches against a flaky fake upstream
+
+"baseline" is the previous client setup: 30 s timeout, no retries, no circuit breaker.
+"resilient" uses a short per-attempt deadline, jittered retries and the breaker. The
+outage phase then takes the upstream down and fetches a mix of stale and uncached
+endpoints to show stale fallback and fail-fast behaviour.
+
+Run from the backend directory:
+    python -m benchmarks.bench_upstream --requests 300 --concurrency 20 --error-rate 0.05 --slow-rate 0.02
+"""
+import argparse
+import asyncio
+import time
+
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient, ResponseCache
+from app.upstream import CircuitBreaker, RetryPolicy
+from benchmarks.common import percentile
+
+
+async def fetch_all(client: PokeApiClient, endpoints, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+    
+    async def one(name: str):
+        nonlocal failures
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await client.get_move(name)
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+    
+    await asyncio.gather(*(one(name) for name in endpoints))
+    return latencies, failures
+
+
+def report(label: str, latencies, failures: int):
+    ms = [latency * 1000 for latency in latencies]
+    print(
+        f"  {label:<22} p50 {percentile(ms, 50):>7.1f} ms  p95 {percentile(ms, 95):>7.1f} ms  "
+        f"p99 {percentile(ms, 99):>7.1f} ms  max {max(ms):>7.1f} ms  errors {failures / len(ms):>6.1%}"
+    )
+
+
+async def run(args):
+    clients = {
+        "baseline": dict(timeout=30.0, retry=RetryPolicy(attempts=1), breaker=CircuitBreaker(failure_threshold=10 ** 9)),
+        "resilient": dict(timeout=args.timeout, retry=RetryPolicy(attempts=args.attempts)),
+    }
+    endpoints = [f"move-{i % 300}" for i in range(args.requests)]
+    print(
+        f"requests={args.requests} concurrency={args.concurrency} delay={args.delay * 1000:.0f}ms "
+        f"error_rate={args.error_rate} slow_rate={args.slow_rate} slow_delay={args.slow_delay}s"
+    )
+    for label, options in clients.items():
+        fake = FakePokeApi(delay=args.delay, error_rate=args.error_rate, slow_rate=args.slow_rate, slow_delay=args.slow_delay)
+        # No caching, so every request reaches the upstream
+        client = PokeApiClient(transport=fake.transport(), cache=ResponseCache(max_entries=1), **options)
+        latencies, failures = await fetch_all(client, [f"{name}?r={i}" for i, name in enumerate(endpoints)], args.concurrency)
+        report(label, latencies, failures)
+        await client.close()
+    
+    fake = FakePokeApi(delay=args.delay)
+    client = PokeApiClient(
+        transport=fake.transport(),
+        cache=ResponseCache(ttl_hours=0, stale_hours=1),
+        timeout=args.timeout,
+        retry=RetryPolicy(attempts=args.attempts)
+    )
+    cached = [f"move-{i}" for i in range(100)]
+    await fetch_all(client, cached, args.concurrency)
+    fake.down = True
+    latencies, failures = await fetch_all(client, cached, args.concurrency)
+    report("outage, stale cached", latencies, failures)
+    latencies, failures = await fetch_all(client, [f"move-{i}" for i in range(100, 200)], args.concurrency)
+    report("outage, uncached", latencies, failures)
+    print(f"  upstream calls during outage: {fake.errors}  circuit: {client.breaker.state}")
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.02, help="Normal upstream latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.02)
+    parser.add_argument("--slow-delay", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=0.25, help="Per-attempt deadline of the resilient client")
+    parser.add_argument("--attempts", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
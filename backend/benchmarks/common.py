@@ -0,0 +1,109 @@
+"""Shared helpers for the benchmark scripts: percentiles, memory, JSON results and regression checks"""
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), falling back to the peak elsewhere"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.2, rounds: int = 7) -> Dict[str, float]:
+    """pytest-benchmark style timing of a synchronous callable; see ``measure_loops``"""
+    def run_loops(loops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - started
+    return measure_loops(run_loops, min_time, rounds)
+
+
+def measure_loops(run_loops: Callable[[int], float], min_time: float = 0.2, rounds: int = 7) -> Dict[str, float]:
+    """Calibrate a loop count, then time ``rounds`` rounds of it
+    
+    ``run_loops(n)`` performs n calls and returns the elapsed seconds, which lets async
+    benchmarks time a whole batch inside one event loop run. Returns per-call seconds
+    (min, median, mean, stddev) and calls per second from the median.
+    """
+    loops = 1
+    while run_loops(loops) < min_time / rounds:
+        loops *= 2
+    timings = [run_loops(loops) / loops for _ in range(rounds)]
+    median = statistics.median(timings)
+    return {
+        "min": min(timings),
+        "median": median,
+        "mean": statistics.mean(timings),
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "rounds": rounds,
+        "loops": loops,
+        "ops": 1 / median if median else float("inf"),
+    }
+
+
+def write_results(path: str, suite: str, results: Dict[str, Any], config: Optional[Dict[str, Any]] = None):
+    with open(path, "w") as f:
+        json.dump({"suite": suite, "meta": run_metadata(), "config": config or {}, "results": results}, f, indent=2)
+        f.write("\n")
+
+
+def compare_results(
+    baseline_path: str,
+    results: Dict[str, Dict[str, float]],
+    metric: str,
+    threshold: float,
+    higher_is_better: bool = False
+) -> List[str]:
+    """Names of results whose ``metric`` regressed by more than ``threshold`` (e.g. 0.2 = 20%) against a saved run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, result in results.items():
+        before, after = baseline.get(name, {}).get(metric), result.get(metric)
+        if not before or after is None:
+            continue
+        change = (before - after) / before if higher_is_better else (after - before) / before
+        marker = "REGRESSION" if change > threshold else ""
+        print(f"  {name:<36} {before:>12.6g} -> {after:>12.6g}  {change:>+7.1%} {marker}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
@@ -0,0 +1,34 @@
+from typing import List, Optional, Sequence
+from app.models import Move, Pokemon, Stats
+
+
+def make_move(name: str, type_: str = "normal", power: int = 40, class_: str = "physical", accuracy: int = 100) -> Move:
+    return Move(id=name, name=name, type=type_, power=power, class_=class_, accuracy=accuracy)
+
+
+def make_pokemon(
+    name: str,
+    types: Sequence[str] = ("normal",),
+    attack: int = 80,
+    moves: Optional[List[Move]] = None,
+    hp: int = 200,
+    defense: int = 80,
+    sp_attack: Optional[int] = None,
+    sp_defense: Optional[int] = None,
+    speed: int = 80
+) -> Pokemon:
+    """Test Pokémon; special stats default to the physical ones and moves to a lone tackle"""
+    return Pokemon(
+        name=name,
+        sprite="test.png",
+        types=list(types),
+        stats=Stats(
+            hp=hp,
+            attack=attack,
+            defense=defense,
+            sp_attack=attack if sp_attack is None else sp_attack,
+            sp_defense=defense if sp_defense is None else sp_defense,
+            speed=speed
+        ),
+        moves=moves or [make_move("tackle")]
+    )
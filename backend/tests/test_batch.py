@@ -0,0 +1,97 @@
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.battle_engine import BattleEngine
+from app.battle_log import BattleLogWriter, iter_battles, replay
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.models import MultiActionRequest, StartSessionRequest
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+
+
+@pytest.fixture
+def fake():
+    return FakePokeApi()
+
+
+@pytest.fixture
+def engine(fake):
+    client = PokeApiClient(transport=fake.transport())
+    return BattleEngine(client, DamageService(TypeChartCache(client)))
+
+
+@pytest.fixture
+def api(engine):
+    main.app.state.battle_engine = engine
+    yield TestClient(main.app)
+    del main.app.state.battle_engine
+
+
+def test_batch_sessions_share_species(api, engine, fake):
+    """Test a batch resolves each species once and reports bad entries without failing the rest"""
+    batch = [{"player_pokemon": "pikachu", "opponent": "snorlax", "seed": i} for i in range(50)]
+    batch.append({"player_pokemon": "missingno", "opponent": "snorlax"})
+    response = api.post("/api/session/batch", json={"sessions": batch})
+    assert response.status_code == 200
+    body = response.json()
+    
+    created = body["sessions"][:50]
+    assert all(entry["session_id"] and entry["error"] is None for entry in created)
+    assert [entry["seed"] for entry in created] == list(range(50))
+    assert set(body["pokemon"]) == {"pikachu", "snorlax"}
+    assert fake.calls["pokemon/pikachu"] == 1 and fake.calls["pokemon/snorlax"] == 1
+    assert "not found" in body["sessions"][50]["error"]
+    assert engine.sessions[created[0]["session_id"]].player.pokemon.name == "pikachu"
+    
+    assert api.post("/api/session/batch", json={"sessions": []}).status_code == 422
+
+
+def test_unknown_difficulty_is_rejected_before_fetching(api, fake):
+    """Test a bad difficulty is a 422 from request validation, without fetching either species"""
+    bad = {"player_pokemon": "pikachu", "opponent": "snorlax", "difficulty": "expert"}
+    assert api.post("/api/session", json=bad).status_code == 422
+    assert api.post("/api/session/batch", json={"sessions": [bad]}).status_code == 422
+    assert not fake.calls["pokemon/pikachu"] and not fake.calls["pokemon/snorlax"]
+
+
+def test_multi_action_moves_then_autopilot(api, engine):
+    """Test listed moves are played in order, then the autopilot finishes the battle"""
+    started = api.post("/api/session", json={"player_pokemon": "pikachu", "opponent": "snorlax", "seed": 3}).json()
+    url = f"/api/session/{started['session_id']}/actions"
+    move_id = started["player"]["moves"][0]["id"]
+    
+    assert api.post(url, json={"moves": [move_id, "not-a-move"]}).status_code == 404
+    assert api.post(url, json={"moves": [move_id], "since": -1}).status_code == 422
+    assert api.post(url, json={"moves": [move_id], "auto": True, "player_difficulty": "expert"}).status_code == 422
+    session = engine.sessions[started["session_id"]]
+    assert len(session.events) == 1
+    
+    played = api.post(url, json={"moves": [move_id], "since": 0}).json()
+    assert played["turns_played"] == 1 and played["log"] == session.log()
+    assert played["log"][1].startswith("PIKACHU used")
+    
+    finished = api.post(url, json={"auto": True, "player_difficulty": "hard"}).json()
+    assert finished["winner"] in ("player", "opponent") and finished["log"] is None
+    assert finished["player"]["hp"] == session.player.hp and finished["opponent"]["hp"] == session.opponent.hp
+    assert api.post(url, json={"auto": True}).json()["detail"] == "Battle has already ended"
+
+
+@pytest.mark.asyncio
+async def test_autopilot_battles_replay(engine, tmp_path):
+    """Test autopilot picks leave the session stream intact, so the seed still replays the battle"""
+    engine.battle_log = BattleLogWriter(str(tmp_path / "battles.pkb"))
+    batch = await engine.start_sessions([
+        StartSessionRequest(player_pokemon="random", opponent="random", difficulty=difficulty, seed=seed)
+        for seed in range(5) for difficulty in ("easy", "normal")
+    ])
+    for entry in batch.sessions:
+        result = await engine.perform_actions(entry.session_id, MultiActionRequest(auto=True, player_difficulty="easy"))
+        assert result.winner is not None
+    engine.battle_log.close()
+    
+    records = list(iter_battles([engine.battle_log.path]))
+    assert [record.session_id for record in records] == [entry.session_id for entry in batch.sessions]
+    for record in records:
+        _, problems = replay(record, engine.damage_service)
+        assert problems == []
@@ -0,0 +1,73 @@
+import time
+import pytest
+from app.battle_ai import BattleAI
+from app.battle_state import BattleSession, PLAYER
+from app.damage_service import DamageService
+from app.type_chart import TypeChartCache
+from tests.conftest import make_move, make_pokemon
+
+
+@pytest.fixture
+def ai():
+    return BattleAI(DamageService(TypeChartCache(None)), node_budget=200)
+
+
+def test_greedy_prefers_sure_knockout(ai):
+    """Test normal difficulty caps damage at remaining HP, preferring an accurate finisher"""
+    player = make_pokemon("player", moves=[make_move("tackle", "normal", 40)])
+    opponent = make_pokemon("opponent", moves=[make_move("quick-attack", "normal", 40), make_move("mega-kick", "normal", 120, accuracy=50)])
+    session = BattleSession(player, opponent, "normal")
+    assert ai.choose_move(session) == 1
+    
+    session.player.hp = 5
+    assert ai.choose_move(session) == 0
+
+
+def test_choose_move_for_player_side(ai):
+    """Test the autopilot scores the player's moves against the opponent, at the given difficulty"""
+    player = make_pokemon("player", moves=[make_move("quick-attack", "normal", 40), make_move("mega-kick", "normal", 120, accuracy=50)])
+    opponent = make_pokemon("opponent", moves=[make_move("tackle", "normal", 40)])
+    session = BattleSession(player, opponent, "easy")
+    assert ai.choose_move(session, PLAYER, "normal") == 1
+    
+    session.opponent.hp = 5
+    assert ai.choose_move(session, PLAYER, "normal") == 0
+    assert ai.choose_move(session, PLAYER, "hard") == 0
+
+
+def test_hard_search_within_budget(ai):
+    """Test hard difficulty avoids a ghost-immune move and returns within its time budget"""
+    player = make_pokemon("player", moves=[make_move("tackle", "normal", 40)])
+    player = player.model_copy(update={"types": ["ghost"]})
+    opponent = make_pokemon("opponent", moves=[make_move("body-slam", "normal", 85), make_move("shadow-ball", "ghost", 80)])
+    session = BattleSession(player, opponent, "hard")
+    
+    started = time.perf_counter()
+    assert ai.choose_move(session) == 1
+    assert time.perf_counter() - started < 0.05
+    assert ai.last_depth >= 1
+
+
+def test_hard_search_is_bounded_by_work_not_time(ai):
+    """Test the hard AI's choice and depth depend only on the position and node budget, so seeds replay"""
+    player = make_pokemon("player", moves=[make_move("tackle", "normal", 40), make_move("mega-kick", "normal", 120, accuracy=75)])
+    opponent = make_pokemon("opponent", moves=[make_move("body-slam", "normal", 85), make_move("mega-punch", "normal", 80, accuracy=85)])
+    session = BattleSession(player, opponent, "hard")
+    results = set()
+    for _ in range(3):
+        slot = ai.choose_move(session)
+        results.add((slot, ai.last_depth))
+    assert len(results) == 1
+    
+    shallow = BattleAI(ai.damage_service, node_budget=1)
+    shallow.choose_move(session)
+    assert shallow.last_depth < ai.last_depth
+
+
+def test_seed_must_survive_javascript():
+    """Test seeds above 2**53 - 1 are rejected rather than silently losing precision in clients"""
+    from pydantic import ValidationError
+    from app.models import StartSessionRequest
+    assert StartSessionRequest(player_pokemon="pikachu", seed=2**53 - 1).seed == 2**53 - 1
+    with pytest.raises(ValidationError):
+        StartSessionRequest(player_pokemon="pikachu", seed=2**53)
@@ -0,0 +1,106 @@
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app import main
+from app.battle_channel import CLOSE_IDLE, CLOSE_INTERNAL_ERROR, CLOSE_SESSION_NOT_FOUND, BattleChannel
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+
+
+@pytest.fixture
+def engine():
+    client = PokeApiClient(transport=FakePokeApi().transport())
+    return BattleEngine(client, DamageService(TypeChartCache(client)))
+
+
+@pytest.fixture
+def api(engine):
+    # Skip the lifespan (it talks to PokeAPI) and inject an engine backed by the fake
+    main.app.state.battle_engine = engine
+    yield TestClient(main.app)
+    del main.app.state.battle_engine
+
+
+def test_socket_turn_deltas(api, engine):
+    """Test each move is answered with that turn's events only, matching the full log"""
+    started = api.post("/api/session", json={"player_pokemon": "pikachu", "opponent": "snorlax"}).json()
+    move_id = started["player"]["moves"][0]["id"]
+    
+    with api.websocket_connect(f"/api/session/{started['session_id']}/ws") as ws:
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "state" and snapshot["state"]["log"] == started["log"]
+        log = list(snapshot["state"]["log"])
+        
+        ws.send_json({"type": "move", "move_id": "not-a-move"})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+        
+        while True:
+            ws.send_json({"type": "move", "move_id": move_id})
+            turn = ws.receive_json()
+            assert turn["type"] == "turn" and turn["log_offset"] == len(log)
+            assert turn["events"][0]["kind"] in ("hit", "miss") and turn["events"][0]["side"] == "player"
+            log.extend(event["text"] for event in turn["events"])
+            if turn["winner"]:
+                break
+        ws.send_json({"type": "move", "move_id": move_id})
+        assert ws.receive_json()["detail"] == "Battle has already ended"
+    
+    session = engine.sessions[started["session_id"]]
+    assert log == session.log()
+    assert turn["player_hp"] == session.player.hp and turn["opponent_hp"] == session.opponent.hp
+
+
+def test_socket_unknown_session(api):
+    """Test connecting to a missing session closes with a not-found code"""
+    with api.websocket_connect("/api/session/missing/ws") as ws:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == CLOSE_SESSION_NOT_FOUND
+
+
+def test_socket_internal_error_closes_and_logs(api, engine, monkeypatch, caplog):
+    """Test a bug while playing a move is logged and closes the socket with 1011"""
+    started = api.post("/api/session", json={"player_pokemon": "pikachu", "opponent": "snorlax"}).json()
+    
+    async def broken(session_id, move_id):
+        raise RuntimeError("boom")
+    
+    monkeypatch.setattr(engine, "play_move", broken)
+    with api.websocket_connect(f"/api/session/{started['session_id']}/ws") as ws:
+        assert ws.receive_json()["type"] == "state"
+        ws.send_json({"type": "move", "move_id": started["player"]["moves"][0]["id"]})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == CLOSE_INTERNAL_ERROR
+    assert any(record.exc_info and "boom" in str(record.exc_info[1]) for record in caplog.records)
+
+
+def test_socket_heartbeat_timeout(engine):
+    """Test the server pings and drops clients that never answer"""
+    app = FastAPI()
+    
+    @app.websocket("/ws/{session_id}")
+    async def socket(websocket: WebSocket, session_id: str):
+        await BattleChannel(websocket, engine, session_id, heartbeat_interval=0.02, idle_timeout=0.1).run()
+    
+    @app.post("/start")
+    async def start():
+        from app.models import StartSessionRequest
+        return await engine.start_session(StartSessionRequest(player_pokemon="pikachu"))
+    
+    client = TestClient(app)
+    session_id = client.post("/start").json()["session_id"]
+    with client.websocket_connect(f"/ws/{session_id}") as ws:
+        assert ws.receive_json()["type"] == "state"
+        messages = []
+        with pytest.raises(WebSocketDisconnect) as closed:
+            while True:
+                messages.append(ws.receive_json())
+    assert closed.value.code == CLOSE_IDLE
+    assert messages and all(message == {"type": "ping"} for message in messages)
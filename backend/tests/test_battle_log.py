@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+from app import battle_log
+from app.battle_engine import BattleEngine
+from app.battle_log import BattleLogWriter, damage_service_for, iter_battles, main, replay
+from app.battle_state import HIT, pack_event, unpack_event
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.models import ActionRequest, StartSessionRequest
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+
+
+async def play_battles(engine: BattleEngine, count: int, opponent: str = "random"):
+    session_ids = []
+    for i in range(count):
+        started = await engine.start_session(StartSessionRequest(player_pokemon="pikachu", opponent=opponent, difficulty="easy"))
+        move_id = started.player.moves[0].id
+        while not engine.sessions[started.session_id].winner:
+            await engine.perform_action(started.session_id, ActionRequest(move_id=move_id))
+        session_ids.append(started.session_id)
+    return session_ids
+
+
+@pytest.fixture
+async def logged_engine(tmp_path):
+    client = PokeApiClient(transport=FakePokeApi().transport())
+    type_chart = TypeChartCache(client)
+    log = BattleLogWriter(str(tmp_path / "battles.pkb"), type_chart)
+    engine = BattleEngine(client, DamageService(type_chart), battle_log=log)
+    yield engine, log
+    log.close()
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_log_and_replay(logged_engine):
+    """Test finished battles stream back from disk and replay to the same log"""
+    engine, log = logged_engine
+    session_ids = await play_battles(engine, 5)
+    log.flush()
+    
+    records = list(iter_battles([log.path]))
+    assert [record.session_id for record in records] == session_ids
+    for record in records:
+        session, problems = replay(record, engine.damage_service)
+        assert problems == []
+        live = engine.sessions[record.session_id]
+        assert session.log() == live.log()
+        assert (session.player.hp, session.opponent.hp) == (live.player.hp, live.opponent.hp)
+    
+    main(["verify", log.path])
+
+
+@pytest.mark.asyncio
+async def test_replay_detects_tampering_and_survives_torn_writes(logged_engine):
+    """Test replays flag wrong damage, and a torn tail record is dropped on reopen"""
+    engine, log = logged_engine
+    await play_battles(engine, 1)
+    log.flush()
+    record = next(iter_battles([log.path]))
+    index = next(i for i, event in enumerate(record.events) if unpack_event(event)[0] == HIT)
+    kind, side, slot, damage, roll = unpack_event(record.events[index])
+    record.events[index] = pack_event(kind, side, slot, damage + 1, roll)
+    _, problems = replay(record, engine.damage_service)
+    assert problems and "formula gives" in problems[0]
+    
+    log.close()
+    with open(log.path, "ab") as f:
+        f.write(b"B\x10\x00")  # crash mid-record
+    engine.battle_log = BattleLogWriter(log.path, engine.damage_service.type_chart)
+    session_ids = await play_battles(engine, 1)
+    engine.battle_log.close()
+    assert len(list(iter_battles([log.path]))) == 2
+    
+    # Opening happens on the writer thread; a file that isn't a log drops battles instead of blocking
+    not_a_log = log.path + ".txt"
+    with open(not_a_log, "w") as f:
+        f.write("hello")
+    broken = BattleLogWriter(not_a_log)
+    with pytest.raises(ValueError):
+        broken.flush()
+    broken.append(session_ids[0], engine.sessions[session_ids[0]])
+    broken.close()
+    assert broken.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_seeded_battles_reproduce(logged_engine):
+    """Test a seed replays the same matchup, rolls and AI choices, and replay checks the stream"""
+    engine, log = logged_engine
+    request = StartSessionRequest(player_pokemon="random", difficulty="easy", seed=1234)
+    logs = []
+    for _ in range(2):
+        started = await engine.start_session(request)
+        assert started.seed == 1234
+        move_id = started.player.moves[0].id
+        while not engine.sessions[started.session_id].winner:
+            await engine.perform_action(started.session_id, ActionRequest(move_id=move_id))
+        logs.append(engine.sessions[started.session_id].log())
+    assert logs[0] == logs[1]
+    log.flush()
+    
+    record = next(iter_battles([log.path]))
+    assert record.seed == 1234
+    assert replay(record, engine.damage_service)[1] == []
+    record.seed = 4321
+    _, problems = replay(record, engine.damage_service)
+    assert any("seed" in problem for problem in problems)
+
+
+@pytest.mark.asyncio
+async def test_replay_uses_the_logged_type_chart(logged_engine):
+    """Test battles replay on the chart the server fought them with, not the bundled one"""
+    engine, log = logged_engine
+    type_chart = engine.damage_service.type_chart
+    bundled = type_chart.fingerprint
+    type_chart.load_matrix(np.where(type_chart.matrix > 0, type_chart.matrix * 2, 0.0))
+    await play_battles(engine, 3)
+    log.flush()
+    
+    records = list(iter_battles([log.path]))
+    assert {record.chart for record in records} == {type_chart.fingerprint} != {bundled}
+    assert np.array_equal(records[0].type_matrix, type_chart.matrix)
+    services = {}
+    assert all(replay(record, damage_service_for(record, services))[1] == [] for record in records)
+    assert len(services) == 1
+    _, problems = replay(records[0], DamageService(TypeChartCache(None)))
+    assert problems and "type chart" in problems[0]
+    main(["verify", log.path])
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_counted_and_cut_back(logged_engine, monkeypatch):
+    """Test a failed write drops its battles, leaves no torn record and later battles still log"""
+    engine, log = logged_engine
+    await play_battles(engine, 1)
+    log.flush()
+    
+    def full_disk(f, data):
+        f.write(data[:len(data) // 2])
+        raise OSError(28, "No space left on device")
+    
+    monkeypatch.setattr(battle_log, "_write_all", full_disk)
+    await play_battles(engine, 2, opponent="snorlax")
+    log.flush()
+    monkeypatch.undo()
+    assert log.metrics() == {"written": 1, "dropped": 2, "pending": 0}
+    
+    # Species first written in the failed batch are written again
+    session_ids = await play_battles(engine, 1, opponent="snorlax")
+    log.flush()
+    assert [record.session_id for record in iter_battles([log.path])][-1] == session_ids[0]
+    assert log.metrics()["written"] == 2
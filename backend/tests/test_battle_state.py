@@ -0,0 +1,61 @@
+import pytest
+from app.battle_engine import BattleEngine
+from app.battle_state import BattleSession, FAINT, HIT, MISS, OPPONENT, PLAYER
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.models import ActionRequest, Pokemon, StartSessionRequest
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+from tests.conftest import make_move, make_pokemon
+
+
+def electric(name: str) -> Pokemon:
+    return make_pokemon(
+        name, ["electric"], attack=55, hp=180, defense=40, sp_attack=50, sp_defense=50, speed=90,
+        moves=[make_move("thunderbolt", "electric", 90, "special"), make_move("quick-attack")]
+    )
+
+
+def test_log_rendering_and_round_trip():
+    """Test packed events render to the same log text and survive serialization"""
+    session = BattleSession(electric("pikachu"), electric("raichu"))
+    session.record(HIT, PLAYER, 1, 37)
+    session.record(MISS, OPPONENT, 0)
+    session.record(FAINT, OPPONENT)
+    
+    assert session.log() == [
+        "Battle started! PIKACHU vs RAICHU",
+        "PIKACHU used QUICK-ATTACK! It dealt 37 damage!",
+        "RAICHU used THUNDERBOLT... But it missed!",
+        "RAICHU fainted! PIKACHU wins!",
+    ]
+    assert session.log(since=3) == ["RAICHU fainted! PIKACHU wins!"]
+    
+    session.rng.randrange(16)
+    restored = BattleSession.from_dict(session.to_dict())
+    assert restored.log() == session.log()
+    assert restored.rng.next64() == session.rng.next64()
+    assert restored.to_state() == session.to_state()
+
+
+@pytest.mark.asyncio
+async def test_turn_delta_mode():
+    """Test delta responses carry only new log lines and agree with the full log"""
+    client = PokeApiClient(transport=FakePokeApi().transport())
+    engine = BattleEngine(client, DamageService(TypeChartCache(client)))
+    try:
+        started = await engine.start_session(StartSessionRequest(player_pokemon="pikachu", opponent="snorlax"))
+        move_id = started.player.moves[0].id
+        log = list(started.log)
+        while True:
+            response = await engine.perform_action(started.session_id, ActionRequest(move_id=move_id, since=len(log)))
+            assert response.log_offset == len(log)
+            log.extend(response.state.log)
+            if response.state.winner:
+                break
+        
+        session = engine.sessions[started.session_id]
+        assert log == session.log()
+        assert response.state.player.hp == session.player.hp
+    finally:
+        await client.close()
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from app.battle_engine import BattleEngine, SpeciesCache
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.fast_json import PokemonJson
+from app.models import StartSessionRequest
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+
+
+@pytest.fixture
+async def fake_engine():
+    fake = FakePokeApi(delay=0.01)
+    client = PokeApiClient(transport=fake.transport())
+    engine = BattleEngine(client, DamageService(TypeChartCache(client)))
+    yield fake, engine
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_single_flight(fake_engine):
+    """Test concurrent fetches of one endpoint share a single upstream call"""
+    fake, engine = fake_engine
+    results = await asyncio.gather(*(engine.pokeapi_client.get_move("move-1") for _ in range(10)))
+    
+    assert all(result["name"] == "move-1" for result in results)
+    assert fake.calls["move/move-1"] == 1
+
+
+@pytest.mark.asyncio
+async def test_moves_keep_listing_order(fake_engine):
+    """Test the first four damaging moves are chosen and fetching stops early"""
+    fake, engine = fake_engine
+    data = fake.pokemon["pikachu"]
+    candidates = [entry["move"]["name"] for entry in data["moves"][:BattleEngine.MOVE_CANDIDATES]]
+    expected = [name for name in candidates if fake.moves[name]["power"]][:BattleEngine.MAX_MOVES]
+    
+    pokemon = await engine._normalize_pokemon(data)
+    
+    assert [move.id for move in pokemon.moves] == expected
+    # Nothing is fetched past the concurrency window after the fourth damaging move
+    last = candidates.index(expected[-1])
+    fetched = {path.split("/", 1)[1] for path in fake.calls if path.startswith("move/")}
+    assert fetched <= set(candidates[:last + 1 + engine.move_fetch_concurrency])
+
+
+@pytest.mark.asyncio
+async def test_species_cache(fake_engine):
+    """Test sessions for a cached species do no upstream I/O"""
+    fake, engine = fake_engine
+    first, second = await asyncio.gather(
+        engine._resolve_pokemon("Pikachu", "missing"),
+        engine._resolve_pokemon("pikachu", "missing")
+    )
+    assert first is second
+    calls = fake.total_calls
+    
+    await engine.start_session(StartSessionRequest(player_pokemon="pikachu", opponent="pikachu"))
+    assert fake.total_calls == calls
+    assert fake.calls["pokemon/pikachu"] == 1
+    
+    with pytest.raises(ValueError, match="missing"):
+        await engine._resolve_pokemon("missingno", "missing")
+
+
+@pytest.mark.asyncio
+async def test_species_cache_is_bounded(fake_engine):
+    """Test the species cache and its encoded JSON evict the least recently used species"""
+    fake, engine = fake_engine
+    engine.pokemon_cache = SpeciesCache(max_entries=2)
+    engine.pokemon_json = PokemonJson(max_entries=2)
+    names = list(fake.pokemon)[:3]
+    for name in names:
+        engine.pokemon_json.get(await engine._resolve_pokemon(name, "missing"))
+    assert names[0] not in engine.pokemon_cache and names[2] in engine.pokemon_cache
+    assert len(engine.pokemon_json) == 2 and engine.pokemon_cache.metrics()["evictions"] == 1
+    
+    # Other request keys alias the canonical entry instead of holding a copy
+    pokemon = engine.pokemon_cache[names[2]]
+    engine.pokemon_cache.put(pokemon, alias="25")
+    assert engine.pokemon_cache.get("25") is pokemon and len(engine.pokemon_cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_warmup(fake_engine):
+    """Test warmup loads the random pool so random sessions are served from cache"""
+    fake, engine = fake_engine
+    assert await engine.warmup() == len(engine.pokeapi_client.POPULAR_POKEMON)
+    calls = fake.total_calls
+    
+    for _ in range(5):
+        await engine.start_session(StartSessionRequest(player_pokemon="random"))
+    assert fake.total_calls == calls
@@ -1,8 +1,10 @@
+import numpy as np
 import pytest
 from app.models import Pokemon, Stats, Move
 from app.type_chart import TypeChartCache
 from app.pokeapi_client import PokeApiClient
 from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
 
 
 @pytest.fixture
@@ -79,3 +81,116 @@ async def test_type_effectiveness(damage_service):
     
     assert damage > 0
 
+
+
+@pytest.fixture
+def offline_damage_service():
+    return DamageService(TypeChartCache(PokeApiClient()))
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_scalar(offline_damage_service):
+    """Test batched damage is identical to the scalar formula in deterministic mode"""
+    service = offline_damage_service
+    chart = service.type_chart
+    rng = np.random.default_rng(7)
+    type_names = ["fire", "water", "grass", "electric", "ground", "ghost", "normal"]
+    
+    rows = []
+    for _ in range(300):
+        stats = [Stats(hp=100, **{k: int(v) for k, v in zip(
+            ["attack", "defense", "sp_attack", "sp_defense", "speed"], rng.integers(5, 200, size=5)
+        )}) for _ in range(2)]
+        types = [list(rng.choice(type_names, size=int(rng.integers(1, 3)), replace=False)) for _ in range(2)]
+        move = Move(
+            id="m", name="m", type=str(rng.choice(type_names)), power=int(rng.choice([0, 40, 90, 150])),
+            class_=str(rng.choice(["physical", "special"])), accuracy=100
+        )
+        attacker = create_test_pokemon("a", types[0], stats[0], [move])
+        defender = create_test_pokemon("d", types[1], stats[1], [])
+        rows.append((attacker, defender, move, await service.calculate_damage(attacker, defender, move, use_random=False)))
+    
+    damage = service.calculate_damage_batch(
+        attack=np.array([a.stats.attack for a, _, _, _ in rows]),
+        sp_attack=np.array([a.stats.sp_attack for a, _, _, _ in rows]),
+        defense=np.array([d.stats.defense for _, d, _, _ in rows]),
+        sp_defense=np.array([d.stats.sp_defense for _, d, _, _ in rows]),
+        power=np.array([m.power for _, _, m, _ in rows]),
+        special=np.array([m.class_ == "special" for _, _, m, _ in rows]),
+        move_types=np.array([chart.intern(m.type) for _, _, m, _ in rows]),
+        defender_types=np.array([chart.intern_types(d.types) for _, d, _, _ in rows]),
+        stab=np.array([m.type in a.types for a, _, m, _ in rows]),
+    )
+    
+    assert damage.tolist() == [expected for _, _, _, expected in rows]
+
+
+def test_batch_random_rolls(offline_damage_service):
+    """Test seeded random factor and accuracy rolls"""
+    service = offline_damage_service
+    n = 10000
+    args = dict(
+        attack=np.full(n, 100), sp_attack=np.full(n, 100), defense=np.full(n, 100), sp_defense=np.full(n, 100),
+        power=np.full(n, 80), special=np.zeros(n, dtype=bool), move_types=np.zeros(n, dtype=int),
+        defender_types=np.full((n, 2), service.type_chart.intern("normal")), stab=np.zeros(n, dtype=bool),
+    )
+    low = ((2 * 50 / 5 + 2) * 80 * 1.0) / 50 + 2
+    
+    damage = service.calculate_damage_batch(**args, rng=np.random.default_rng(1))
+    assert damage.min() >= int(low * 0.85) and damage.max() <= int(low)
+    assert np.array_equal(damage, service.calculate_damage_batch(**args, rng=np.random.default_rng(1)))
+    
+    damage = service.calculate_damage_batch(**args, accuracy=np.full(n, 70), rng=np.random.default_rng(2))
+    assert 0.65 < np.count_nonzero(damage) / n < 0.75
+
+
+def test_damage_distribution_and_ko_chances(offline_damage_service):
+    """Test the exact distribution over rolls and accuracy, and KO chances against brute force"""
+    service = offline_damage_service
+    stats = Stats(hp=200, attack=80, defense=80, sp_attack=80, sp_defense=80, speed=80)
+    move = Move(id="slam", name="slam", type="normal", power=80, class_="physical", accuracy=75)
+    attacker = create_test_pokemon("a", ["normal"], stats, [move])
+    defender = create_test_pokemon("d", ["fire"], stats, [])
+    
+    rolls = service.damage_rolls(attacker, defender, move)
+    distribution = service.damage_distribution(attacker, defender, move)
+    assert len(rolls) == 16 and list(rolls) == sorted(rolls)
+    assert sum(p for _, p in distribution) == pytest.approx(1.0)
+    assert dict(distribution)[0] == pytest.approx(0.25)
+    assert service.damage_distribution(attacker, defender, move) is distribution
+    
+    # Every sequence of two outcomes, weighted
+    hp = rolls[-1] + rolls[0] // 2
+    brute = sum(p * q for d1, p in distribution for d2, q in distribution if d1 >= hp or d1 + d2 >= hp)
+    one, two, three = service.ko_chances(distribution, hp, 3)
+    assert one == 0.0
+    assert two == pytest.approx(brute)
+    assert two < three < 1.0
+    assert service.ko_chances(distribution, service.MAX_HP, 3) == [0.0, 0.0, 0.0]
+    with pytest.raises(ValueError):
+        service.ko_chances(distribution, service.MAX_HP + 1, 3)
+
+
+@pytest.mark.asyncio
+async def test_damage_calc_endpoint_function():
+    """Test the engine resolves species and moves by name and reports monotonic KO chances"""
+    from app.battle_engine import BattleEngine
+    
+    client = PokeApiClient(transport=FakePokeApi().transport())
+    engine = BattleEngine(client, DamageService(TypeChartCache(client)))
+    try:
+        pikachu = await engine._resolve_pokemon("pikachu", "missing")
+        result = await engine.damage_calc("Pikachu", "snorlax", pikachu.moves[0].id, hits=5)
+        assert result.move == pikachu.moves[0]
+        assert len(result.rolls) == 16 and len(result.ko_chance) == 5
+        assert result.ko_chance == sorted(result.ko_chance)
+        
+        # Moves outside the attacker's moveset are fetched by name
+        other = await engine.damage_calc("pikachu", "snorlax", "move-250", defender_hp=1)
+        assert other.move.id == "move-250"
+        assert other.ko_chance[0] == pytest.approx(other.hit_chance if other.move.power else 0.0)
+        
+        with pytest.raises(ValueError, match="not found"):
+            await engine.damage_calc("pikachu", "snorlax", "no-such-move")
+    finally:
+        await client.close()
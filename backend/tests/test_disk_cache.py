@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Set
+import pytest
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.disk_cache import DiskCache
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient, ResponseCache
+from app.type_chart import TypeChartCache
+
+
+def load_species(path: str, names: List[str]) -> Set[str]:
+    """Load species through a fresh client and engine in this process, returning the endpoints fetched upstream"""
+    async def run():
+        fake = FakePokeApi()
+        client = PokeApiClient(transport=fake.transport(), disk_cache=DiskCache(path))
+        engine = BattleEngine(client, DamageService(TypeChartCache(client)))
+        try:
+            for name in names:
+                await engine._resolve_pokemon(name, f"{name} not found")
+        finally:
+            await client.close()
+        return set(fake.calls)
+    return asyncio.run(run())
+
+
+def test_second_process_reuses_stored_entries(tmp_path):
+    """Test workers share the disk cache: concurrent writers, then a cold process that refetches nothing they stored"""
+    path = str(tmp_path / "pokeapi.db")
+    names = list(FakePokeApi().pokemon)[:40]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=3, mp_context=context) as pool:
+        # Overlapping halves, so both writers race on the shared species and moves
+        warm = [pool.submit(load_species, path, names[:25]), pool.submit(load_species, path, names[15:])]
+        fetched = set().union(*(future.result() for future in warm))
+        cold = pool.submit(load_species, path, names).result()
+    # Disk reads yield to the event loop, so a move prefetched past the early stop can differ
+    # between runs; anything a writer stored is never fetched again
+    assert fetched and not cold & fetched
+    assert all(endpoint.startswith("move/") for endpoint in cold)
+    
+    cache = DiskCache(path)
+    metrics = cache.metrics()
+    cache.close()
+    assert metrics["entries"] >= len(names)
+    assert metrics["blobs"] <= metrics["entries"]
+
+
+@pytest.mark.asyncio
+async def test_conditional_revalidation(tmp_path):
+    """Test expired disk entries are revalidated with If-None-Match and refetched only when changed"""
+    now = [1000.0]
+    path = str(tmp_path / "pokeapi.db")
+    fake = FakePokeApi()
+    
+    def client():
+        return PokeApiClient(
+            transport=fake.transport(),
+            cache=ResponseCache(ttl_hours=1, stale_hours=24),
+            disk_cache=DiskCache(path, clock=lambda: now[0])
+        )
+    
+    first = client()
+    tackle = await first.get_move("move-0")
+    await first.close()
+    assert fake.calls["move/move-0"] == 1
+    
+    # Fresh on disk: a restarted worker serves it without asking
+    second = client()
+    assert await second.get_move("move-0") == tackle
+    await second.close()
+    assert fake.calls["move/move-0"] == 1
+    
+    # Expired: one conditional request, answered 304, and the entry counts as fresh again
+    now[0] += 2 * 3600
+    third = client()
+    assert await third.get_move("move-0") == tackle
+    assert fake.not_modified == 1 and third.disk_cache.revalidated == 1
+    await third.close()
+    assert DiskCache(path, clock=lambda: now[0]).get("move/move-0").fetched_at == now[0]
+    
+    # Changed upstream: the 200 replaces the payload and its validator
+    now[0] += 2 * 3600
+    fake.moves["move-0"] = dict(fake.moves["move-0"], power=999)
+    fourth = client()
+    assert (await fourth.get_move("move-0"))["power"] == 999
+    await fourth.close()
+    assert fake.calls["move/move-0"] == 3 and fake.not_modified == 1
+    
+    # Outage: the expired copy is served within the stale window
+    now[0] += 2 * 3600
+    fake.down = True
+    fifth = client()
+    assert (await fifth.get_move("move-0"))["power"] == 999
+    await fifth.close()
+    
+    cache = DiskCache(path, clock=lambda: now[0])
+    assert cache.sweep(max_age=3 * 3600) == 0 and cache.metrics()["blobs"] == 1
+    now[0] += 2 * 3600
+    assert cache.sweep(max_age=3 * 3600) == 1 and cache.metrics()["blobs"] == 0
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_busy_database_falls_back_to_upstream(tmp_path):
+    """Test a write lock held by another process skips disk writes instead of stalling requests"""
+    import sqlite3
+    path = str(tmp_path / "pokeapi.db")
+    fake = FakePokeApi()
+    client = PokeApiClient(transport=fake.transport(), disk_cache=DiskCache(path, busy_timeout=0.05))
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        assert (await client.get_move("move-0"))["name"] == "move-0"
+        assert client.disk_cache.metrics()["busy"] == 1 and client.disk_cache.metrics()["writes"] == 0
+        assert client.disk_cache.sweep(max_age=0) == 0
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+        await client.close()
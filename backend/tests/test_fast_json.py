@@ -0,0 +1,63 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.fast_json import encode_action, encode_start_session
+from app.models import ActionRequest, StartSessionRequest
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+
+
+@pytest.fixture
+def engine():
+    client = PokeApiClient(transport=FakePokeApi().transport())
+    return BattleEngine(client, DamageService(TypeChartCache(client)))
+
+
+@pytest.mark.asyncio
+async def test_encoded_responses_match_models(engine):
+    """Test the fast path encodes exactly what the response models would"""
+    response = await engine.start_session(StartSessionRequest(player_pokemon="pikachu", opponent="snorlax", seed=2**53 - 1))
+    assert json.loads(encode_start_session(response, engine.pokemon_json)) == response.model_dump(mode="json")
+    
+    session = engine.sessions[response.session_id]
+    await engine.play_move(response.session_id, response.player.moves[0].id)
+    for since in (0, 1, 5):
+        model = await engine.perform_action(response.session_id, ActionRequest(move_id=response.player.moves[0].id, since=since))
+        assert json.loads(encode_action(session, since)) == model.model_dump(mode="json")
+
+
+@pytest.mark.asyncio
+async def test_species_bytes_are_cached_per_instance(engine):
+    """Test each species is encoded once and re-encoded only when its normalized object changes"""
+    first = await engine.start_session(StartSessionRequest(player_pokemon="pikachu", opponent="snorlax", seed=1))
+    second = await engine.start_session(StartSessionRequest(player_pokemon="pikachu", opponent="pikachu", seed=2))
+    encode_start_session(first, engine.pokemon_json)
+    encoded = engine.pokemon_json.get(first.player)
+    encode_start_session(second, engine.pokemon_json)
+    assert engine.pokemon_json.get(second.player) is encoded and len(engine.pokemon_json) == 2
+    
+    renamed = first.player.model_copy(update={"sprite": "other.png"})
+    assert b"other.png" in engine.pokemon_json.get(renamed)
+
+
+def test_session_endpoints_use_fast_path(engine):
+    """Test the HTTP endpoints still honour their documented schemas"""
+    main.app.state.battle_engine = engine
+    try:
+        api = TestClient(main.app)
+        started = api.post("/api/session", json={"player_pokemon": "pikachu", "opponent": "snorlax", "seed": 4})
+        assert started.status_code == 200 and started.headers["content-type"] == "application/json"
+        body = started.json()
+        assert body["seed"] == 4 and body["player"]["name"] == "pikachu" and body["log"]
+        
+        url = f"/api/session/{body['session_id']}/action"
+        played = api.post(url, json={"move_id": body["player"]["moves"][0]["id"], "since": len(body["log"])}).json()
+        assert played["log_offset"] == len(body["log"]) and played["state"]["player"]["max_hp"] == body["player"]["stats"]["hp"]
+        assert api.post(url, json={"move_id": "not-a-move"}).status_code == 404
+        assert api.post(url, json={"move_id": body["player"]["moves"][0]["id"], "since": -3}).status_code == 422
+    finally:
+        del main.app.state.battle_engine
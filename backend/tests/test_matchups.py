@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.matchups import NO_KO, MatchupMatrix, build_matrix, turns_to_ko
+from app.simulation import Roster
+from app.type_chart import TypeChartCache
+from tests.conftest import make_move, make_pokemon
+
+
+def make_roster(pokemon):
+    return Roster.from_pokemon(pokemon, TypeChartCache(None))
+
+
+@pytest.fixture
+def pokemon():
+    return [
+        make_pokemon("charizard", ["fire"], 110, [make_move("flamethrower", "fire", 90, "special")]),
+        make_pokemon("blastoise", ["water"], 90, [make_move("surf", "water", 90, "special")]),
+        make_pokemon("venusaur", ["grass"], 90, [make_move("energy-ball", "grass", 90, "special")]),
+        make_pokemon("gengar", ["ghost"], 120, [make_move("shadow-ball", "ghost", 80, "special")]),
+        make_pokemon("snorlax", ["normal"], 110, [make_move("body-slam", "normal", 85)], hp=430),
+    ]
+
+
+def test_counters_follow_type_matchups(pokemon, tmp_path):
+    """Test the water type tops charizard's counters and a species never counters itself"""
+    path = str(tmp_path / "matchups")
+    assert build_matrix(make_roster(pokemon), path) == {"species": 5, "recomputed": 5, "kept": 0}
+    matrix = MatchupMatrix.load(path)
+    assert isinstance(matrix.damage.base, np.memmap)
+    
+    counters = matrix.counters("charizard", k=10)
+    assert len(counters) == 4 and counters[0]["name"] == "blastoise"
+    assert "charizard" not in [c["name"] for c in counters]
+    assert counters[0]["turns_to_ko"] < counters[0]["turns_survived"]
+    # Against an immunity only the 1-damage floor is left, as in battles
+    snorlax, gengar = matrix.index["snorlax"], matrix.index["gengar"]
+    assert matrix.damage[snorlax, gengar] == 1 and matrix.turns[snorlax, gengar] == 200
+    assert list(turns_to_ko(np.array([0.0, 45.5]), np.array([200.0, 200.0]))) == [NO_KO, 5]
+    with pytest.raises(ValueError):
+        matrix.counters("missingno")
+
+
+def test_incremental_update_matches_full_rebuild(pokemon, tmp_path):
+    """Test changing, adding and reordering species recomputes only their rows and columns"""
+    path = str(tmp_path / "matchups")
+    build_matrix(make_roster(pokemon), path)
+    assert build_matrix(make_roster(pokemon), path)["recomputed"] == 0
+    
+    # Same species list: a worker that mapped the old files keeps seeing the old matrix
+    serving = MatchupMatrix.load(path)
+    before = serving.damage.copy()
+    pokemon[1] = make_pokemon("blastoise", ["water"], 150, [make_move("hydro-pump", "water", 110, "special", 80)])
+    assert build_matrix(make_roster(pokemon), path) == {"species": 5, "recomputed": 1, "kept": 4}
+    assert np.array_equal(serving.damage, before)
+    assert not np.array_equal(MatchupMatrix.load(path).damage, before)
+    
+    # New species and a different order: the kept block is remapped
+    changed = [make_pokemon("pikachu", ["electric"], 90, [make_move("thunderbolt", "electric", 90, "special")])]
+    changed += pokemon[::-1]
+    assert build_matrix(make_roster(changed), path) == {"species": 6, "recomputed": 1, "kept": 5}
+    
+    full = str(tmp_path / "full")
+    build_matrix(make_roster(changed), full)
+    updated, rebuilt = MatchupMatrix.load(path), MatchupMatrix.load(full)
+    assert updated.names == rebuilt.names
+    assert np.array_equal(updated.damage, rebuilt.damage) and np.array_equal(updated.turns, rebuilt.turns)
+
+
+def test_counters_endpoint(pokemon, tmp_path):
+    """Test the endpoint serves counters from the loaded matrix"""
+    api = TestClient(main.app)
+    main.app.state.matchups = None
+    assert api.get("/api/pokemon/charizard/counters").status_code == 503
+    
+    path = str(tmp_path / "matchups")
+    build_matrix(make_roster(pokemon), path)
+    main.app.state.matchups = MatchupMatrix.load(path)
+    try:
+        response = api.get("/api/pokemon/Charizard/counters", params={"k": 2})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["species"] == "charizard" and [c["name"] for c in body["counters"]][0] == "blastoise"
+        assert len(body["counters"]) == 2
+        assert api.get("/api/pokemon/missingno/counters").status_code == 404
+    finally:
+        del main.app.state.matchups
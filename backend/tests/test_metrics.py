@@ -0,0 +1,62 @@
+import time
+from fastapi.testclient import TestClient
+from app import main
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.metrics import Registry
+from app.pokeapi_client import PokeApiClient
+from app.profiler import SamplingProfiler
+from app.type_chart import TypeChartCache
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    """Test histograms render cumulative buckets with +Inf, sum and count per label set"""
+    registry = Registry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=(0.1, 1.0))
+    fast = latency.labels("fast")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        fast.observe(value)
+    registry.counter("calls_total", "Calls").inc(2)
+    
+    text = registry.render()
+    assert 'stage_seconds_bucket{stage="fast",le="0.1"} 2' in text
+    assert 'stage_seconds_bucket{stage="fast",le="1.0"} 3' in text
+    assert 'stage_seconds_bucket{stage="fast",le="+Inf"} 4' in text
+    assert 'stage_seconds_count{stage="fast"} 4' in text
+    assert "# TYPE calls_total counter\ncalls_total 2" in text
+
+
+def test_metrics_endpoint_reports_stages_and_component_counters():
+    """Test /metrics exposes stage histograms plus cache, upstream and session counters"""
+    client = PokeApiClient(transport=FakePokeApi().transport())
+    main.app.state.battle_engine = BattleEngine(client, DamageService(TypeChartCache(client)))
+    try:
+        api = TestClient(main.app)
+        started = api.post("/api/session", json={"player_pokemon": "pikachu", "opponent": "snorlax"}).json()
+        api.post(f"/api/session/{started['session_id']}/action", json={"move_id": started["player"]["moves"][0]["id"]})
+        
+        text = api.get("/metrics").text
+        for stage in ("start_session", "perform_action", "ai_turn", "serialize", "normalize", "upstream_fetch"):
+            assert f'battle_stage_seconds_count{{stage="{stage}"}}' in text
+        assert 'pokeapi_upstream_attempts_total{outcome="2xx"}' in text
+        assert "session_store_resident_sessions 1" in text
+        assert "pokeapi_cache_misses_total" in text
+        assert 'pokeapi_circuit_state{state="closed"} 1' in text
+    finally:
+        del main.app.state.battle_engine
+
+
+def test_sampling_profiler_collects_folded_stacks():
+    """Test the profiler attributes samples to the function running on the profiled thread"""
+    def busy_loop():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+    
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy_loop()
+    profiler.stop()
+    assert profiler.samples > 0
+    assert "busy_loop (test_metrics.py" in profiler.collapsed()
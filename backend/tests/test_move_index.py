@@ -0,0 +1,86 @@
+import pytest
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.models import Move, StartSessionRequest, Stats
+from app.move_index import MoveIndex, build_index, rank_moveset
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+
+
+def move(name: str, type_: str, power: int, class_: str = "physical", accuracy: int = 100) -> Move:
+    return Move(id=name, name=name, type=type_, power=power, class_=class_, accuracy=accuracy, damage_class=class_)
+
+
+def test_rank_moveset_prefers_stab_power_and_coverage():
+    """Test ranking weighs STAB, accuracy and the matching attack stat, then spreads types"""
+    stats = Stats(hp=200, attack=100, defense=80, sp_attack=50, sp_defense=80, speed=90)
+    learnset = [
+        move("ember", "fire", 40, "special"),
+        move("flamethrower", "fire", 90, "special"),
+        move("fire-punch", "fire", 75),
+        move("earthquake", "ground", 100),
+        move("stone-edge", "rock", 100, accuracy=80),
+        move("hyper-beam", "normal", 150),
+        move("tackle", "normal", 40),
+        move("growl", "normal", 0, "status"),
+    ]
+    ranked = rank_moveset(["fire"], stats, learnset)
+    # A second fire move (flamethrower, special off a low sp_attack) loses to tackle
+    assert [m.id for m in ranked] == ["fire-punch", "earthquake", "stone-edge", "tackle"]
+    assert rank_moveset(["fire"], stats, learnset[-1:]) == []
+
+
+@pytest.mark.asyncio
+async def test_build_resumes_without_refetching(tmp_path):
+    """Test an interrupted build keeps what it committed and the next run fetches only the rest"""
+    path = str(tmp_path / "move_index.db")
+    fake = FakePokeApi()
+    
+    first = PokeApiClient(transport=fake.transport())
+    get_move = first.get_move
+    
+    async def flaky(name: str):
+        if name.endswith("7"):
+            raise RuntimeError("connection reset")
+        return await get_move(name)
+    
+    first.get_move = flaky
+    counts = await build_index(path, client=first, chunk=64)
+    await first.close()
+    assert counts["failed"] == 30 and counts["moves"] == 270 and counts["species"] == 200
+    
+    fake.calls.clear()
+    second = PokeApiClient(transport=fake.transport())
+    counts = await build_index(path, client=second, chunk=64)
+    await second.close()
+    assert counts == {"moves": 300, "species": 200, "fetched": 30, "failed": 0}
+    # The two listings plus the moves that failed the first time
+    assert sum(fake.calls.values()) == 32
+    
+    index = MoveIndex.load(path)
+    assert index.metrics() == {"moves": 300, "species": 200}
+    assert index.moves["move-0"].accuracy == (fake.moves["move-0"]["accuracy"] or 100)
+    assert list(index.learnsets["pikachu"]) == [m["move"]["name"] for m in fake.pokemon["pikachu"]["moves"]]
+
+
+@pytest.mark.asyncio
+async def test_sessions_start_without_move_fetches(tmp_path):
+    """Test an engine with an index builds movesets from the index alone"""
+    path = str(tmp_path / "move_index.db")
+    fake = FakePokeApi()
+    client = PokeApiClient(transport=fake.transport())
+    await build_index(path, client=client)
+    await client.close()
+    index = MoveIndex.load(path)
+    
+    fake.calls.clear()
+    client = PokeApiClient(transport=fake.transport())
+    engine = BattleEngine(client, DamageService(TypeChartCache(client)), move_index=index)
+    response = await engine.start_session(StartSessionRequest(player_pokemon="pikachu", opponent="snorlax", seed=1))
+    await client.close()
+    
+    assert not [path for path in fake.calls if path.startswith("move/")]
+    pikachu = response.player
+    expected = rank_moveset(pikachu.types, pikachu.stats, (index.moves[name] for name in index.learnsets["pikachu"]))
+    assert pikachu.moves == expected and len(pikachu.moves) == 4
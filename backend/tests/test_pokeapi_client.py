@@ -0,0 +1,150 @@
+import asyncio
+import httpx
+import pytest
+from app.fake_pokeapi import FakePokeApi
+from app.payloads import extract_sprite, project_payload
+from app.pokeapi_client import PokeApiClient, ResponseCache
+from app.upstream import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+def test_cache_byte_cap_and_ttl():
+    """Test LRU eviction under the byte cap and TTL expiry counters"""
+    cache = ResponseCache(max_bytes=120)
+    cache.put("a", {"blob": "x" * 40})
+    cache.put("b", {"blob": "y" * 40})
+    assert cache.get("a") is not None  # "b" becomes least recently used
+    cache.put("c", {"blob": "z" * 40})
+    
+    assert cache.get("b") is None
+    assert cache.bytes <= 120
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1 and metrics["misses"] == 1 and metrics["evictions_lru"] == 1
+    
+    expiring = ResponseCache(ttl_hours=0)
+    expiring.put("a", {"x": 1})
+    assert expiring.get("a") is None
+    assert expiring.metrics()["evictions_expired"] == 1 and expiring.bytes == 0
+
+
+def test_projection_keeps_what_the_engine_reads():
+    """Test projected Pokémon payloads drop unused trees but keep stats, types, sprites and moves"""
+    raw = FakePokeApi().pokemon["pikachu"]
+    raw = dict(raw, game_indices=[{"game_index": i} for i in range(50)], held_items=[{"item": {"name": "x"}}])
+    raw["moves"] = [dict(entry, version_group_details=[{"level_learned_at": 1}] * 20) for entry in raw["moves"]]
+    
+    projected = project_payload("pokemon/pikachu", raw)
+    
+    assert "game_indices" not in projected and "held_items" not in projected
+    assert [m["move"]["name"] for m in projected["moves"]] == [m["move"]["name"] for m in raw["moves"]]
+    assert "version_group_details" not in projected["moves"][0]
+    assert projected["stats"] == raw["stats"]
+    assert extract_sprite(projected) == extract_sprite(raw)
+
+
+@pytest.mark.asyncio
+async def test_client_caches_projected_payloads():
+    """Test repeated fetches hit the bounded cache"""
+    fake = FakePokeApi()
+    client = PokeApiClient(transport=fake.transport(), cache=ResponseCache(max_entries=2))
+    try:
+        for name in ["move-1", "move-2", "move-1", "move-3", "move-2"]:
+            await client.get_move(name)
+        
+        assert fake.calls["move/move-1"] == 1
+        assert fake.calls["move/move-2"] == 2  # evicted by move-3
+        assert set(client.cache.metrics()) >= {"hits", "misses", "bytes", "evictions_lru"}
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_public_details_are_unprojected():
+    """Test /api/moves and /api/types get the complete payload while the engine's copy stays projected"""
+    fake = FakePokeApi()
+    fake.moves["move-1"]["pp"] = 15
+    fake.moves["move-1"]["effect_entries"] = [{"short_effect": "Hits."}]
+    client = PokeApiClient(transport=fake.transport())
+    try:
+        assert "pp" not in await client.get_move("move-1")
+        details = await client.get_move_details("Move-1")
+        assert details["pp"] == 15 and details["effect_entries"] == [{"short_effect": "Hits."}]
+        assert await client.get_move_details("move-1") is details and fake.calls["move/move-1"] == 2
+        assert (await client.get_type_details("fire"))["name"] == "fire"
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_retries_breaker_and_stale_fallback():
+    """Test transient 503s are retried, an outage opens the circuit and stale entries keep serving"""
+    fake = FakePokeApi()
+    client = PokeApiClient(
+        transport=fake.transport(),
+        cache=ResponseCache(ttl_hours=0, stale_hours=1),
+        retry=RetryPolicy(attempts=3, base_delay=0),
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    )
+    try:
+        fake.error_rate = 1.0
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.get_move("move-1")
+        assert fake.calls["move/move-1"] == 3
+        assert client.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            await client.get_move("move-2")
+        assert fake.calls["move/move-2"] == 0
+        
+        client.breaker.record_success()
+        fake.error_rate = 0.0
+        data = await client.get_move("move-3")
+        fake.down = True
+        # Expired but within the stale window: served without waiting on the failing upstream
+        assert await client.get_move("move-3") is data
+        await asyncio.gather(*client._background, return_exceptions=True)
+        assert client.cache.metrics()["stale_hits"] == 1
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_ahead_revalidates_in_background():
+    """Test entries close to expiry are served from cache and refetched once in the background"""
+    fake = FakePokeApi()
+    client = PokeApiClient(transport=fake.transport(), cache=ResponseCache(refresh_ahead=1.0))
+    try:
+        await client.get_move("move-1")
+        await asyncio.gather(client.get_move("move-1"), client.get_move("move-1"))
+        await asyncio.gather(*client._background)
+        assert fake.calls["move/move-1"] == 2
+    finally:
+        await client.close()
+
+
+def test_open_circuit_is_503_on_every_upstream_endpoint():
+    """Test endpoints that need PokeAPI answer 503 with Retry-After, not 400 or 404, during an outage"""
+    from fastapi.testclient import TestClient
+    from app import main
+    from app.battle_engine import BattleEngine
+    from app.damage_service import DamageService
+    from app.type_chart import TypeChartCache
+    
+    client = PokeApiClient(transport=FakePokeApi().transport(), breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30))
+    client.breaker.record_failure()
+    main.app.state.pokeapi_client = client
+    main.app.state.battle_engine = BattleEngine(client, DamageService(TypeChartCache(None)))
+    try:
+        api = TestClient(main.app)
+        for url in (
+            "/api/moves/move-1",
+            "/api/types/fire",
+            "/api/damage?attacker=pikachu&defender=snorlax&move=move-1",
+            "/api/pokemon/search?q=pi",
+        ):
+            response = api.get(url)
+            assert response.status_code == 503, url
+            assert 1 <= int(response.headers["retry-after"]) <= 30
+        response = api.post("/api/session", json={"player_pokemon": "pikachu", "opponent": "snorlax"})
+        assert response.status_code == 503 and "retry-after" in response.headers
+    finally:
+        del main.app.state.pokeapi_client
+        del main.app.state.battle_engine
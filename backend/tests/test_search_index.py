@@ -0,0 +1,42 @@
+import pytest
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient
+from app.search_index import SearchIndex, sprite_for_id
+
+
+@pytest.fixture
+def index():
+    names = ["bulbasaur", "charmander", "charmeleon", "charizard", "pikachu", "raichu", "pichu", "chimchar", "garchomp"]
+    return SearchIndex((name, i + 1) for i, name in enumerate(names))
+
+
+def test_ranking(index):
+    """Test exact, prefix, substring and typo matches are ranked in that order"""
+    assert index.search("pichu") == ["pichu"]
+    assert index.search("char") == ["charizard", "charmander", "charmeleon", "chimchar"]
+    assert index.search("chu") == ["pichu", "raichu", "pikachu"]
+    assert index.search("char", limit=2) == ["charizard", "charmander"]
+    assert index.search("pikahcu") == ["pikachu"]
+    assert index.search("garchmop")[0] == "garchomp"
+    assert index.search("zzz") == []
+
+
+def test_sprites(index):
+    """Test the precomputed sprite table and overrides"""
+    assert index.search_with_sprites("bulba") == [{"name": "bulbasaur", "sprite": sprite_for_id(1)}]
+    index.set_sprite("bulbasaur", "real.png")
+    assert index.search_with_sprites("bulba")[0]["sprite"] == "real.png"
+
+
+@pytest.mark.asyncio
+async def test_search_with_sprites_fetches_only_the_list():
+    """Test sprite search answers without per-result Pokémon fetches"""
+    fake = FakePokeApi()
+    client = PokeApiClient(transport=fake.transport())
+    try:
+        results = await client.search_pokemon_with_sprites("species-1", limit=10)
+        assert len(results) == 10
+        assert all(result["sprite"] for result in results)
+        assert fake.total_calls == 1
+    finally:
+        await client.close()
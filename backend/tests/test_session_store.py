@@ -0,0 +1,136 @@
+import pytest
+from app.battle_engine import BattleSession
+from app.session_store import MemorySessionStore, SessionStore, SqliteSessionStore
+from tests.conftest import make_move, make_pokemon
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def make_session():
+    pokemon = make_pokemon(
+        "pikachu", ["electric"], attack=55, hp=180, defense=40, sp_attack=50, sp_defense=50, speed=90,
+        moves=[make_move("thunderbolt", "electric", 90, "special")]
+    )
+    return BattleSession(pokemon, pokemon)
+
+
+def test_lru_and_idle_eviction():
+    """Test entry cap LRU eviction and idle TTL expiry"""
+    clock = FakeClock()
+    store = MemorySessionStore(idle_ttl=60, max_entries=2, clock=clock)
+    store.put("a", make_session())
+    store.put("b", make_session())
+    assert store.get("a") is not None  # "b" is now least recently used
+    store.put("c", make_session())
+    
+    assert "b" not in store
+    assert "a" in store and "c" in store
+    
+    clock.now += 61
+    assert store.get("a") is None
+    assert store.sweep() == 1
+    assert store.metrics()["evictions_lru"] == 1
+    assert store.metrics()["evictions_idle"] == 2
+    assert len(store) == 0
+
+
+def test_finished_grace_and_byte_cap():
+    """Test finished battles expire after the grace period and the byte cap holds"""
+    clock = FakeClock()
+    session = make_session()
+    store = MemorySessionStore(finished_ttl=10, max_bytes=3 * session.approx_size(), clock=clock)
+    for i in range(5):
+        store.put(str(i), make_session())
+    assert len(store) == 3
+    assert store.metrics()["resident_bytes"] <= 3 * session.approx_size()
+    
+    finished = store.get("4")
+    finished.winner = "player"
+    store.put("4", finished)
+    clock.now += 5
+    store.put("4", finished)  # writes after the battle ends keep the original end time
+    clock.now += 6
+    assert store.get("4") is None
+    assert store.metrics()["evictions_finished"] == 1
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    """Test sessions persist across store instances and expire by TTL"""
+    clock = FakeClock()
+    path = str(tmp_path / "sessions.db")
+    store = SqliteSessionStore(path, idle_ttl=60, clock=clock)
+    session = make_session()
+    session.opponent.hp = 42
+    store.put("a", session)
+    store.close()
+    
+    reopened = SqliteSessionStore(path, idle_ttl=60, clock=clock)
+    restored = reopened.get("a")
+    assert restored.opponent.hp == 42
+    assert restored.player_pokemon == session.player_pokemon
+    assert reopened.metrics()["resident_sessions"] == 1
+    
+    clock.now += 61
+    assert reopened.get("a") is None
+    assert len(reopened) == 0
+    reopened.close()
+
+
+def test_sqlite_store_writes_behind(tmp_path):
+    """Test a worker reads its own queued writes, and other workers see them once committed"""
+    clock = FakeClock()
+    path = str(tmp_path / "sessions.db")
+    store = SqliteSessionStore(path, idle_ttl=60, clock=clock)
+    other = SqliteSessionStore(path, idle_ttl=60, clock=clock)
+    session = make_session()
+    for hp in (100, 90, 80):
+        session.opponent.hp = hp
+        store.put("a", session)
+    assert store.get("a").opponent.hp == 80
+    
+    store.flush()
+    assert other.get("a").opponent.hp == 80
+    # Resident counts are refreshed by sweeps, not by every metrics() call
+    assert store.metrics()["resident_sessions"] == 0
+    store.sweep()
+    assert store.metrics()["resident_sessions"] == 1
+    store.delete("a")
+    assert store.get("a") is None
+    store.flush()
+    assert other.get("a") is None
+    store.close()
+    other.close()
+    
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_sqlite_store_reuses_decoded_sessions(tmp_path, monkeypatch):
+    """Test reads skip decoding while the stored revision is unchanged, and see other workers' writes"""
+    clock = FakeClock()
+    path = str(tmp_path / "sessions.db")
+    store = SqliteSessionStore(path, idle_ttl=60, clock=clock)
+    other = SqliteSessionStore(path, idle_ttl=60, clock=clock)
+    session = make_session()
+    store.put("a", session)
+    store.flush()
+    
+    decoded = []
+    original = BattleSession.from_dict
+    monkeypatch.setattr(BattleSession, "from_dict", staticmethod(lambda data: decoded.append(data) or original(data)))
+    assert store.get("a") is session and store.get("a") is session
+    assert decoded == [] and store.metrics()["cache_hits"] == 2
+    
+    theirs = other.get("a")
+    theirs.opponent.hp = 7
+    other.put("a", theirs)
+    other.flush()
+    assert store.get("a").opponent.hp == 7 and len(decoded) == 2
+    store.close()
+    other.close()
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from app.damage_service import DamageService
+from app.simulation import LOSS, WIN, Roster, Simulator, run_tournament
+from app.type_chart import TypeChartCache
+from tests.conftest import make_move, make_pokemon
+
+
+@pytest.fixture
+def roster():
+    pokemon = [
+        make_pokemon("strong", ["normal"], attack=250),
+        make_pokemon("weak", ["normal"], attack=10),
+        make_pokemon("ghostly", ["ghost"], attack=80, moves=[
+            make_move("shadow-ball", "ghost", 80, "special", accuracy=90),
+            make_move("hex", "ghost", 65, "special"),
+        ]),
+    ]
+    return Roster.from_pokemon(pokemon, TypeChartCache(None))
+
+
+@pytest.mark.asyncio
+async def test_damage_table_matches_formula(roster):
+    """Test the simulator's pre-random damage reproduces DamageService exactly"""
+    simulator = Simulator(roster)
+    service = DamageService(TypeChartCache(None))
+    table = simulator.damage_table(np.arange(3), np.arange(3))
+    rolled = simulator.damage_service.roll_damage_batch(table, roster.move_power[:, None, :], 0.95)
+    
+    ghost_move = make_move("hex", "ghost", 65, "special")
+    attacker = make_pokemon("ghostly", ["ghost"], attack=80, moves=[ghost_move])
+    defender = make_pokemon("strong", ["normal"], attack=250)
+    
+    assert rolled[2, 0, 1] == await service.calculate_damage(attacker, defender, ghost_move, use_random=False)
+
+
+def test_attacks_use_the_engine_rolls(roster):
+    """Test simulated hits land on exactly the 16 damage values /api/damage reports"""
+    simulator = Simulator(roster)
+    attacker, defender = make_pokemon("strong", ["normal"], attack=250), make_pokemon("weak", ["normal"], attack=10)
+    expected = set(DamageService(TypeChartCache(None)).damage_rolls(attacker, defender, attacker.moves[0]))
+    table = simulator.damage_table(np.array([0]), np.array([1]))
+    species = np.zeros(5000, dtype=np.intp)
+    damage = simulator._attack(table, species, species, species, np.random.default_rng(0))
+    assert set(damage.tolist()) == expected
+
+
+def test_simulate_outcomes(roster):
+    """Test lopsided matchups and determinism under a seed"""
+    simulator = Simulator(roster)
+    first = np.zeros(500, dtype=int)
+    
+    assert (simulator.simulate(first, np.ones(500, dtype=int), np.random.default_rng(0)) == WIN).all()
+    assert (simulator.simulate(first + 1, first, np.random.default_rng(0)) == LOSS).all()
+    
+    a = simulator.simulate(first + 2, first, np.random.default_rng(3))
+    b = simulator.simulate(first + 2, first, np.random.default_rng(3))
+    assert np.array_equal(a, b)
+
+
+def test_tournament(roster, tmp_path):
+    """Test the win-rate matrix round-trips through a roster file"""
+    path = str(tmp_path / "roster.npz")
+    roster.save(path)
+    
+    loaded, rates = run_tournament(path, battles=50, workers=1, seed=1, shard_size=2)
+    
+    assert list(loaded.names) == ["strong", "weak", "ghostly"]
+    assert rates.shape == (3, 3)
+    assert rates[0, 1] == 1.0 and rates[1, 0] == 0.0
+    _, again = run_tournament(path, battles=50, workers=1, seed=1, shard_size=2)
+    assert np.array_equal(rates, again)
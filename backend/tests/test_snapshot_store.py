@@ -0,0 +1,57 @@
+import json
+import httpx
+import pytest
+from app.pokeapi_client import PokeApiClient
+from app.snapshot_store import SnapshotStore, build_snapshot
+
+
+def write_resource(root, resource, payload):
+    path = root / "data" / "api" / "v2" / resource / str(payload["id"])
+    path.mkdir(parents=True)
+    (path / "index.json").write_text(json.dumps(payload))
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    dump = tmp_path / "api-data"
+    write_resource(dump, "pokemon", {"id": 25, "name": "pikachu", "types": [{"type": {"name": "electric"}}]})
+    write_resource(dump, "pokemon", {"id": 1, "name": "bulbasaur", "types": [{"type": {"name": "grass"}}]})
+    write_resource(dump, "move", {"id": 85, "name": "thunderbolt", "power": 90})
+    write_resource(dump, "type", {"id": 13, "name": "electric", "damage_relations": {}})
+    path = tmp_path / "pokeapi.snapshot"
+    build_snapshot(str(dump), str(path))
+    return str(path)
+
+
+def test_snapshot_lookup(snapshot_path):
+    """Test lookups by name, id and list endpoint"""
+    store = SnapshotStore(snapshot_path)
+    try:
+        assert store.get("pokemon/pikachu")["id"] == 25
+        assert store.get("pokemon/25")["name"] == "pikachu"
+        assert store.get("move/thunderbolt")["power"] == 90
+        assert store.get("type/electric")["name"] == "electric"
+        assert store.get("move/surf") is None
+        
+        listing = store.get("pokemon?limit=1000")
+        assert listing["count"] == 2
+        assert [p["name"] for p in listing["results"]] == ["bulbasaur", "pikachu"]
+        assert len(store.get("pokemon?limit=1")["results"]) == 1
+    finally:
+        store.close()
+
+
+@pytest.mark.asyncio
+async def test_offline_client(snapshot_path):
+    """Test the client serves from the snapshot without network"""
+    client = PokeApiClient(snapshot=SnapshotStore(snapshot_path), offline=True)
+    try:
+        pokemon = await client.get_pokemon("Pikachu")
+        assert pokemon["name"] == "pikachu"
+        assert await client.search_pokemon("chu") == ["pikachu"]
+        
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            await client.get_move("surf")
+        assert error.value.response.status_code == 404
+    finally:
+        await client.close()
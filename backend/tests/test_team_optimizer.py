@@ -0,0 +1,113 @@
+import asyncio
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.simulation import Roster
+from app.team_optimizer import JobsBusyError, TeamJobs, TeamOptimizer, team_scores
+from app.type_chart import TypeChartCache
+from tests.conftest import make_move, make_pokemon
+
+
+def attacker(name, types, attack, move_type, power=90):
+    return make_pokemon(name, types, attack, [make_move(f"{move_type}-move", move_type, power, "special")], hp=250)
+
+
+@pytest.fixture
+def roster_path(tmp_path):
+    pokemon = [
+        attacker("charizard", ["fire"], 100, "fire"),
+        attacker("blastoise", ["water"], 100, "water"),
+        attacker("venusaur", ["grass"], 100, "grass"),
+        attacker("golem", ["rock"], 100, "rock"),
+    ]
+    pokemon += [attacker(f"filler-{i}", ["normal"], 40, "normal", power=40) for i in range(12)]
+    path = str(tmp_path / "roster.npz")
+    Roster.from_pokemon(pokemon, TypeChartCache(None)).save(path)
+    return path
+
+
+def test_team_scores_take_the_best_member():
+    """Test a team covers each opponent with whichever member does best against it"""
+    rates = np.array([[1.0, 0.0], [0.0, 0.5], [0.2, 0.2]])
+    assert team_scores(rates, np.array([[0, 1], [1, 2]])).tolist() == [0.75, 0.35]
+
+
+def test_optimizer_finds_type_counters(roster_path):
+    """Test the search covers fire and grass opponents with water and fire, the same for any worker count"""
+    optimizer = TeamOptimizer(roster_path, workers=1)
+    stages = []
+    result = optimizer.optimize(
+        ["charizard", "venusaur"], size=2, candidates=64, battles=8, top=3, progress=lambda stage, fraction: stages.append(fraction)
+    )
+    best = result["teams"][0]
+    assert set(best["members"]) == {"golem", "charizard"} or set(best["members"]) == {"blastoise", "charizard"}
+    assert best["score"] >= result["teams"][-1]["score"]
+    assert result["rounds"] > 1 and result["battles"] > 0 and result["evaluations_per_second"] > 0
+    assert stages == sorted(stages) and stages[-1] == 1.0
+    
+    pooled = TeamOptimizer(roster_path, workers=2)
+    try:
+        # The pool is kept across jobs
+        for _ in range(2):
+            parallel = pooled.optimize(["charizard", "venusaur"], size=2, candidates=64, battles=8, top=3)
+            assert [team["members"] for team in parallel["teams"]] == [team["members"] for team in result["teams"]]
+            assert [team["score"] for team in parallel["teams"]] == [team["score"] for team in result["teams"]]
+        assert pooled.pool._mp_context.get_start_method() == "forkserver"
+    finally:
+        pooled.close()
+    with pytest.raises(ValueError):
+        optimizer.optimize(["missingno"])
+
+
+@pytest.mark.asyncio
+async def test_jobs_report_progress_and_result(roster_path):
+    """Test a job moves from queued to done and keeps its result for polling"""
+    jobs = TeamJobs(TeamOptimizer(roster_path))
+    job = jobs.submit(["golem"], size=1, candidates=16, battles=4)
+    assert job["status"] == "queued" and jobs.get(job["job_id"]) is job
+    while job["status"] in ("queued", "running"):
+        await asyncio.sleep(0.01)
+    assert job["status"] == "done" and job["progress"] == 1.0
+    assert job["result"]["teams"][0]["members"] == ["venusaur"] or job["result"]["teams"][0]["members"] == ["blastoise"]
+    with pytest.raises(ValueError):
+        jobs.submit(["missingno"])
+
+
+@pytest.mark.asyncio
+async def test_jobs_refuse_while_busy_and_stop(roster_path):
+    """Test one job at a time, and that stopped, evicted and overdue jobs end as cancelled"""
+    jobs = TeamJobs(TeamOptimizer(roster_path), max_jobs=1)
+    job = jobs.submit(["golem"], size=1, candidates=16, battles=4)
+    with pytest.raises(JobsBusyError):
+        jobs.submit(["golem"])
+    jobs.stop(job["job_id"])
+    while job["status"] in ("queued", "running"):
+        await asyncio.sleep(0.01)
+    assert job["status"] == "cancelled" and job["result"] is None
+    
+    jobs.timeout = 0.0
+    overdue = jobs.submit(["golem"], size=1, candidates=16, battles=4)
+    assert jobs.get(job["job_id"]) is None
+    while overdue["status"] in ("queued", "running"):
+        await asyncio.sleep(0.01)
+    assert overdue["status"] == "cancelled" and "timed out" in overdue["error"]
+
+
+def test_team_endpoints(roster_path):
+    """Test the job endpoints validate requests before queuing"""
+    api = TestClient(main.app)
+    main.app.state.team_jobs = None
+    assert api.post("/api/teams/optimize", json={"opponents": ["golem"]}).status_code == 503
+    
+    main.app.state.team_jobs = TeamJobs(TeamOptimizer(roster_path))
+    try:
+        assert api.post("/api/teams/optimize", json={"opponents": ["missingno"]}).status_code == 404
+        assert api.post("/api/teams/optimize", json={"opponents": []}).status_code == 422
+        assert api.post("/api/teams/optimize", json={"opponents": ["golem"], "seed": -1}).status_code == 422
+        assert api.post("/api/teams/optimize", json={"opponents": ["golem"], "seed": 2**53}).status_code == 422
+        oversized = {"opponents": ["golem"] * 50, "candidates": 4096, "top": 1, "battles": 1000}
+        assert api.post("/api/teams/optimize", json=oversized).status_code == 422
+        assert api.get("/api/teams/jobs/not-a-job").status_code == 404
+    finally:
+        del main.app.state.team_jobs
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from app.fake_pokeapi import FakePokeApi
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import NO_TYPE, TYPE_NAMES, TypeChartCache
+
+
+@pytest.fixture
+async def fake_chart():
+    fake = FakePokeApi()
+    client = PokeApiClient(transport=fake.transport())
+    yield fake, TypeChartCache(client)
+    await client.close()
+
+
+def test_bundled_chart(fake_chart):
+    """Test the chart is populated without any fetch"""
+    _, chart = fake_chart
+    assert chart.calculate_type_effectiveness("electric", ["water", "flying"]) == 4.0
+    assert chart.calculate_type_effectiveness("electric", ["ground"]) == 0.0
+    assert chart.calculate_type_effectiveness("fire", ["water", "rock"]) == 0.25
+    assert chart.calculate_type_effectiveness("fire", ["grass"]) == 2.0
+    assert chart.calculate_type_effectiveness("normal", ["normal"]) == 1.0
+    assert chart.calculate_type_effectiveness("shadow", ["water"]) == 1.0
+
+
+def test_batch_matches_scalar(fake_chart):
+    """Test the vectorized lookup agrees with single lookups"""
+    _, chart = fake_chart
+    rng = np.random.default_rng(0)
+    move_ids = rng.integers(0, NO_TYPE, size=500)
+    defender_ids = rng.integers(0, NO_TYPE + 1, size=(500, 2))
+    defender_ids[:, 1] = np.where(defender_ids[:, 1] == defender_ids[:, 0], NO_TYPE, defender_ids[:, 1])
+    
+    batch = chart.calculate_type_effectiveness_batch(move_ids, defender_ids)
+    
+    for move_id, (first, second), value in zip(move_ids, defender_ids, batch):
+        names = [TYPE_NAMES[t] for t in (first, second) if t != NO_TYPE]
+        assert chart.calculate_type_effectiveness(TYPE_NAMES[move_id], names) == value
+
+
+@pytest.mark.asyncio
+async def test_load_all(fake_chart):
+    """Test loading every type concurrently at startup"""
+    fake, chart = fake_chart
+    bundled = chart.matrix.copy()
+    
+    assert await chart.load_all() == len(TYPE_NAMES)
+    assert fake.total_calls == len(TYPE_NAMES)
+    assert np.array_equal(chart.matrix, bundled)
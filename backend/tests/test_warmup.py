@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.battle_engine import BattleEngine
+from app.damage_service import DamageService
+from app.fake_pokeapi import FakePokeApi
+from app.models import StartSessionRequest
+from app.pokeapi_client import PokeApiClient
+from app.type_chart import TypeChartCache
+from app.warmup import Warmup, collect_bundle, write_bundle
+
+
+def make_engine(fake: FakePokeApi):
+    client = PokeApiClient(transport=fake.transport())
+    type_chart = TypeChartCache(client)
+    return BattleEngine(client, DamageService(type_chart)), type_chart
+
+
+@pytest.mark.asyncio
+async def test_bundle_warms_a_worker_without_upstream_calls(tmp_path):
+    """Test a worker started from a bundle serves the roster, types and search without fetching"""
+    builder, builder_types = make_engine(FakePokeApi())
+    path = str(tmp_path / "roster_bundle.json.gz")
+    write_bundle(await collect_bundle(builder, builder_types), path)
+    await builder.pokeapi_client.close()
+    
+    fake = FakePokeApi()
+    engine, type_chart = make_engine(fake)
+    warmup = Warmup(engine, type_chart, bundle_path=path)
+    try:
+        warmup.load_bundle()
+        await warmup.run()
+        assert warmup.status == "ready"
+        assert warmup.bundle["species"] == len(engine.pokeapi_client.POPULAR_POKEMON)
+        
+        started = await engine.start_session(StartSessionRequest(player_pokemon="pikachu", seed=3))
+        assert started.player == builder.pokemon_cache["pikachu"]
+        assert engine.pokeapi_client.search_index.search("pika") == ["pikachu"]
+        assert fake.total_calls == 0
+    finally:
+        await engine.pokeapi_client.close()
+
+
+@pytest.mark.asyncio
+async def test_readiness_tracks_warmup_progress_and_deadline():
+    """Test the readiness probe is 503 until warmup finishes, and a slow upstream ends it degraded"""
+    engine, type_chart = make_engine(FakePokeApi(delay=0.5))
+    warmup = Warmup(engine, type_chart, deadline=0.05)
+    main.app.state.warmup = warmup
+    api = TestClient(main.app)
+    try:
+        assert api.get("/api/ready").status_code == 503
+        await warmup.run()
+        response = api.get("/api/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "degraded"
+        assert response.json()["roster"]["loaded"] < response.json()["roster"]["total"]
+    finally:
+        del main.app.state.warmup
+        await engine.pokeapi_client.close()
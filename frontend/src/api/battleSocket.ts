@@ -0,0 +1,47 @@
+import { API_BASE_URL } from './client'
+import { TurnMessage } from '../types'
+
+interface BattleSocketHandlers {
+  onTurn: (turn: TurnMessage) => void
+  onError: (detail: string) => void
+  onClose?: () => void
+}
+
+// One WebSocket per battle: moves go up, only each turn's events come back
+export class BattleSocket {
+  private socket: WebSocket
+  
+  constructor(sessionId: string, private handlers: BattleSocketHandlers) {
+    const url = `${API_BASE_URL.replace(/^http/, 'ws')}/api/session/${sessionId}/ws`
+    this.socket = new WebSocket(url)
+    this.socket.onmessage = (event) => this.handleMessage(JSON.parse(event.data))
+    this.socket.onclose = () => this.handlers.onClose?.()
+  }
+  
+  get isOpen() {
+    return this.socket.readyState === WebSocket.OPEN
+  }
+  
+  sendMove(moveId: string) {
+    this.socket.send(JSON.stringify({ type: 'move', move_id: moveId }))
+  }
+  
+  close() {
+    this.socket.close()
+  }
+  
+  private handleMessage(message: any) {
+    switch (message.type) {
+      case 'turn':
+        this.handlers.onTurn(message)
+        break
+      case 'error':
+        this.handlers.onError(message.detail)
+        break
+      case 'ping':
+        // Server heartbeat: answer so the connection isn't dropped as idle
+        this.socket.send(JSON.stringify({ type: 'pong' }))
+        break
+    }
+  }
+}
@@ -1,6 +1,7 @@
 import axios from 'axios'
+import { ActionResponse } from '../types'
 
-const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
+export const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
 export const api = axios.create({
   baseURL: API_BASE_URL,
@@ -18,8 +19,8 @@ export const pokemonApi = {
   startSession: (data: { player_pokemon: string; opponent?: string; difficulty?: string }) =>
     api.post<{ session_id: string; player: any; opponent: any; turn: string; log: string[] }>('/api/session', data),
   
-  performAction: (sessionId: string, moveId: string) =>
-    api.post(`/api/session/${sessionId}/action`, { move_id: moveId }),
+  performAction: (sessionId: string, moveId: string, since?: number) =>
+    api.post<ActionResponse>(`/api/session/${sessionId}/action`, { move_id: moveId, since }),
   
   getMove: (name: string) => api.get(`/api/moves/${name}`),
   
@@ -31,27 +31,30 @@ interface MovePadProps {
 }
 
 export default function MovePad({ moves, disabled }: MovePadProps) {
-  const { sessionId, sessionState, updateSessionState } = useBattleStore()
+  const { sessionId, sessionState, applyAction, sendMove, movePending } = useBattleStore()
   
   const mutation = useMutation({
     mutationFn: async (moveId: string) => {
       if (!sessionId) throw new Error('No session')
-      return await pokemonApi.performAction(sessionId, moveId)
+      return await pokemonApi.performAction(sessionId, moveId, sessionState?.log.length)
     },
     onSuccess: (response) => {
-      updateSessionState(response.data.state)
+      applyAction(response.data)
     },
   })
   
+  const isPending = mutation.isPending || movePending
+  
   const handleMoveClick = React.useCallback((moveId: string) => {
-    if (disabled || mutation.isPending) return
-    mutation.mutate(moveId)
-  }, [disabled, mutation])
+    if (disabled || isPending) return
+    // Prefer the battle socket; fall back to a plain request if it isn't connected
+    if (!sendMove(moveId)) mutation.mutate(moveId)
+  }, [disabled, isPending, sendMove, mutation])
   
   // Add keyboard shortcuts
   React.useEffect(() => {
     const handleKeyDown = (e: KeyboardEvent) => {
-      const isDisabledNow = disabled || mutation.isPending
+      const isDisabledNow = disabled || isPending
       if (isDisabledNow) return
       if (e.key >= '1' && e.key <= '4') {
         const index = parseInt(e.key) - 1
@@ -63,10 +66,10 @@ export default function MovePad({ moves, disabled }: MovePadProps) {
     
     window.addEventListener('keydown', handleKeyDown)
     return () => window.removeEventListener('keydown', handleKeyDown)
-  }, [moves, disabled, mutation.isPending, handleMoveClick])
+  }, [moves, disabled, isPending, handleMoveClick])
   
   const isOpponentTurn = sessionState?.turn === 'opponent'
-  const isDisabled = disabled || mutation.isPending || isOpponentTurn || sessionState?.winner
+  const isDisabled = disabled || isPending || isOpponentTurn || sessionState?.winner
   
   return (
     <div className="grid grid-cols-2 gap-5">
@@ -81,7 +84,7 @@ export default function MovePad({ moves, disabled }: MovePadProps) {
               ? 'opacity-50 cursor-not-allowed border-gray-300 bg-gray-100' 
               : 'hover:border-yellow-400 hover:shadow-2xl active:scale-95 border-gray-400 hover:bg-gradient-to-br hover:from-yellow-50 hover:to-orange-50 hover:scale-105 hover:rotate-1'
             }
-            ${mutation.isPending ? 'cursor-wait' : 'cursor-pointer'}
+            ${isPending ? 'cursor-wait' : 'cursor-pointer'}
           `}
           title={`Press ${index + 1} to use ${move.name}`}
         >
@@ -1,13 +1,19 @@
 import { create } from 'zustand'
-import { Pokemon, SessionState, StartSessionResponse } from '../types'
+import { BattleSocket } from '../api/battleSocket'
+import { ActionResponse, Pokemon, SessionState, StartSessionResponse, TurnMessage } from '../types'
 
 interface BattleStore {
   sessionId: string | null
   player: Pokemon | null
   opponent: Pokemon | null
   sessionState: SessionState | null
+  socket: BattleSocket | null
+  movePending: boolean
   setSession: (data: StartSessionResponse) => void
   updateSessionState: (state: SessionState) => void
+  applyAction: (response: ActionResponse) => void
+  applyTurn: (turn: TurnMessage) => void
+  sendMove: (moveId: string) => boolean
   reset: () => void
 }
 
@@ -16,23 +22,67 @@ export const useBattleStore = create<BattleStore>((set, get) => ({
   player: null,
   opponent: null,
   sessionState: null,
+  socket: null,
+  movePending: false,
   
-  setSession: (data) => set({
-    sessionId: data.session_id,
-    player: data.player,
-    opponent: data.opponent,
-    sessionState: {
-      player: { hp: data.player.stats.hp, max_hp: data.player.stats.hp },
-      opponent: { hp: data.opponent.stats.hp, max_hp: data.opponent.stats.hp },
-      turn: data.turn,
-      log: data.log,
-    },
-  }),
+  setSession: (data) => {
+    get().socket?.close()
+    const socket = new BattleSocket(data.session_id, {
+      onTurn: (turn) => get().applyTurn(turn),
+      onError: () => set({ movePending: false }),
+      // Moves fall back to HTTP once the socket is gone
+      onClose: () => set((state) => (state.socket === socket ? { socket: null, movePending: false } : {})),
+    })
+    set({
+      sessionId: data.session_id,
+      player: data.player,
+      opponent: data.opponent,
+      sessionState: {
+        player: { hp: data.player.stats.hp, max_hp: data.player.stats.hp },
+        opponent: { hp: data.opponent.stats.hp, max_hp: data.opponent.stats.hp },
+        turn: data.turn,
+        log: data.log,
+      },
+      socket,
+      movePending: false,
+    })
+  },
   
   updateSessionState: (state) => {
     set({ sessionState: state })
   },
   
-  reset: () => set({ sessionId: null, player: null, opponent: null, sessionState: null }),
+  applyAction: ({ state, log_offset }) => {
+    // The server only sends log lines from log_offset on
+    const previous = get().sessionState?.log ?? []
+    set({ sessionState: { ...state, log: previous.slice(0, log_offset).concat(state.log) } })
+  },
+  
+  applyTurn: (turn) => {
+    const current = get().sessionState
+    if (!current) return
+    set({
+      movePending: false,
+      sessionState: {
+        player: { ...current.player, hp: turn.player_hp },
+        opponent: { ...current.opponent, hp: turn.opponent_hp },
+        turn: turn.turn,
+        winner: turn.winner,
+        log: current.log.slice(0, turn.log_offset).concat(turn.events.map((event) => event.text)),
+      },
+    })
+  },
+  
+  sendMove: (moveId) => {
+    const { socket } = get()
+    if (!socket?.isOpen) return false
+    set({ movePending: true })
+    socket.sendMove(moveId)
+    return true
+  },
+  
+  reset: () => {
+    get().socket?.close()
+    set({ sessionId: null, player: null, opponent: null, sessionState: null, socket: null, movePending: false })
+  },
 }))
-
@@ -42,10 +42,12 @@ export interface StartSessionRequest {
   player_pokemon: string
   opponent?: string
   difficulty?: string
+  seed?: number
 }
 
 export interface StartSessionResponse {
   session_id: string
+  seed: number
   player: Pokemon
   opponent: Pokemon
   turn: string
@@ -54,9 +56,29 @@ export interface StartSessionResponse {
 
 export interface ActionRequest {
   move_id: string
+  since?: number
 }
 
 export interface ActionResponse {
   state: SessionState
+  log_offset: number
+}
+
+export interface BattleEvent {
+  kind: 'start' | 'hit' | 'miss' | 'faint'
+  side: 'player' | 'opponent'
+  move?: string
+  damage?: number
+  text: string
+}
+
+export interface TurnMessage {
+  type: 'turn'
+  log_offset: number
+  events: BattleEvent[]
+  player_hp: number
+  opponent_hp: number
+  turn: string
+  winner?: string | null
 }
 